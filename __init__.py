@@ -2,12 +2,20 @@
 
 from . import engine
 
-from .engine.event import SignalEvent
+from .engine.event import SignalEvent, TargetEvent
 from .engine.data import *
-from .engine.strategy import Strategy
-from .engine.portfolio import BasicPortfolioHandler
-from .engine.execution import SimulatedExecutionHandler
+from .engine.strategy import Strategy, CrossSectionalStrategy, LaneStrategy
+from .engine.portfolio import BasicPortfolioHandler, FuturesPortfolioHandler
+from .engine.account import ContractSpec
+from .engine.risk import RiskManager, BasicRiskManager
+from .engine.execution import SimulatedExecutionHandler, VolumeShareExecutionHandler, LatencyExecutionHandler
+from .engine.execution import TickExecutionHandler, AsyncExecutionHandler
 from .engine.backtest import Backtest
+from .engine.vectorized import VectorizedBacktest
+from .engine.lanes import LaneBacktest, param_grid
+from .engine.sweep import SweepRunner
+from .engine.optimize import Optimizer, Pruner
+from .engine.walkforward import WalkForward
 from .engine.constant import *
 
 
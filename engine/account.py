@@ -0,0 +1,211 @@
+# -*- coding: utf-8 -*-
+
+"""
+Futures Account Model
+Contract-spec-aware accounting: mark-to-market, margin usage and daily settlement
+
+@author: Jesse J. Hsu
+@email: jessexu117@outlook.com
+@version: 0.1
+"""
+
+import numpy as np
+
+from .kernels import NUMBA_AVAILABLE, apply_fills_loop, mark_to_market_loop
+from ..utils.symbol import get_symbol_info
+
+
+def apply_deals(position, basis, index, quantities, prices, multiplier):
+    """
+    Apply deals of distinct symbols to position and basis arrays in place (average cost method)
+    :param position: position array
+    :param basis: average open price array
+    :param index: symbol index array, no duplicates
+    :param quantities: signed deal quantity array
+    :param prices: deal price array
+    :param multiplier: contract multiplier array aligned with index
+    :return: realized pnl array aligned with index
+    """
+    pos = position[index]
+    old_basis = basis[index]
+    new_pos = pos + quantities
+
+    closing = pos * quantities < 0
+    closed = np.minimum(np.abs(quantities), np.abs(pos))
+    realized = np.where(closing, np.sign(pos) * closed * (prices - old_basis) * multiplier, 0.0)
+
+    average = np.divide(old_basis * pos + prices * quantities, new_pos,
+                        out=np.zeros(len(index)), where=new_pos != 0)
+    closed_basis = np.where(new_pos == 0, 0.0, np.where(new_pos * pos < 0, prices, old_basis))
+    basis[index] = np.where(closing, closed_basis, np.where(new_pos != 0, average, old_basis))
+    position[index] = new_pos
+
+    return realized
+
+
+class ContractSpec(object):
+    """
+    Contract specification of a future
+    """
+
+    def __init__(self, multiplier=1.0, tick_size=1.0, margin_rate=1.0):
+        """
+        Constructor
+        :param multiplier: contract multiplier, eg. 10 ton per lot for RU
+        :param tick_size: minimal price change
+        :param margin_rate: margin ratio of notional value
+        """
+        self.multiplier = float(multiplier)
+        self.tick_size = float(tick_size)
+        self.margin_rate = float(margin_rate)
+
+    @classmethod
+    def from_registry(cls, symbol):
+        """
+        Contract specification from symbol registry, default spec for unknown symbol
+        :param symbol: symbol of future
+        :return: ContractSpec
+        """
+        record = get_symbol_info(symbol)
+        if record is None:
+            return cls()
+        return cls(record.multiplier, record.tick_size, record.margin_rate)
+
+    def __repr__(self):
+        return '{class_name}(multiplier={mult}, tick_size={tick}, margin_rate={margin})'.format(
+            class_name=self.__class__.__name__, mult=self.multiplier, tick=self.tick_size, margin=self.margin_rate)
+
+
+class FuturesAccount(object):
+    """
+    Futures account with per symbol state kept in arrays aligned with symbol list
+    Mark-to-market, margin and available cash are calculated for all symbols in one array operation
+    """
+
+    def __init__(self, symbol_list, initial_capital, contract_specs=None):
+        """
+        Constructor
+        :param symbol_list: symbol list
+        :param initial_capital: initial capital
+        :param contract_specs: dictionary, key: symbol value: ContractSpec, spec from symbol registry for missing symbol
+        """
+        contract_specs = contract_specs or {}
+        specs = [contract_specs.get(s) or ContractSpec.from_registry(s) for s in symbol_list]
+
+        self.symbol_list = list(symbol_list)
+        self.symbol_index = {s: i for i, s in enumerate(self.symbol_list)}
+
+        self.multiplier = np.array([spec.multiplier for spec in specs], dtype=np.float64)
+        self.tick_size = np.array([spec.tick_size for spec in specs], dtype=np.float64)
+        self.margin_rate = np.array([spec.margin_rate for spec in specs], dtype=np.float64)
+
+        n = len(self.symbol_list)
+        self.position = np.zeros(n, dtype=np.float64)
+        self.basis = np.zeros(n, dtype=np.float64)  # average open price or last settlement price
+        self.last_price = np.zeros(n, dtype=np.float64)
+
+        self.market_value = np.zeros(n, dtype=np.float64)
+        self.unrealized = np.zeros(n, dtype=np.float64)
+        self.margin = np.zeros(n, dtype=np.float64)
+
+        self.balance = float(initial_capital)  # static equity after realized pnl, commission and settlement
+        self.commission = 0.0
+
+    def round_to_tick(self, prices):
+        """
+        Round prices to the tick size of every symbol
+        :param prices: price array aligned with symbol list
+        :return: rounded price array
+        """
+        return np.round(np.asarray(prices, dtype=np.float64) / self.tick_size) * self.tick_size
+
+    def apply_fill(self, symbol, quantity, price, commission=0.0):
+        """
+        Update position, open basis and balance from a deal
+        :param symbol: deal symbol
+        :param quantity: signed deal quantity, positive for BUY and negative for SELL
+        :param price: deal price
+        :param commission: fee
+        :return: realized pnl of the deal
+        """
+        i = self.symbol_index[symbol]
+        pos = self.position[i]
+        new_pos = pos + quantity
+        realized = 0.0
+
+        if pos * quantity < 0:
+            # close (part of) the position, realize pnl against the basis
+            closed = min(abs(quantity), abs(pos))
+            realized = np.sign(pos) * closed * (price - self.basis[i]) * self.multiplier[i]
+            if new_pos == 0:
+                self.basis[i] = 0.0
+            elif new_pos * pos < 0:
+                self.basis[i] = price  # reverse position
+        elif new_pos != 0:
+            self.basis[i] = (self.basis[i] * pos + price * quantity) / new_pos
+
+        self.position[i] = new_pos
+        self.balance += realized - commission
+        self.commission += commission
+
+        return realized
+
+    def apply_fills(self, index, quantities, prices, commissions):
+        """
+        Update position, open basis and balance from a batch of deals
+        :param index: symbol index array
+        :param quantities: signed deal quantity array
+        :param prices: deal price array
+        :param commissions: fee array
+        :return: total realized pnl
+        """
+        index = np.asarray(index)
+        if len(np.unique(index)) < len(index):
+            # repeated symbols are applied in order
+            realized = apply_fills_loop(self.position, self.basis, self.multiplier, index,
+                                        np.asarray(quantities, dtype=np.float64),
+                                        np.asarray(prices, dtype=np.float64)).sum()
+        else:
+            realized = apply_deals(self.position, self.basis, index, quantities, prices,
+                                   self.multiplier[index]).sum()
+        commission = np.sum(commissions)
+        self.balance += realized - commission
+        self.commission += commission
+
+        return realized
+
+    def mark_to_market(self, prices):
+        """
+        Mark all the positions to market
+        :param prices: latest price array aligned with symbol list
+        :return: tuple (equity, margin, available cash)
+        """
+        self.last_price = np.asarray(prices, dtype=np.float64)
+        if NUMBA_AVAILABLE:
+            unrealized, margin = mark_to_market_loop(self.position, self.basis, self.last_price, self.multiplier,
+                                                     self.margin_rate, self.market_value, self.unrealized,
+                                                     self.margin)
+            equity = self.balance + unrealized
+        else:
+            self.market_value = self.position * self.last_price * self.multiplier
+            self.unrealized = self.position * (self.last_price - self.basis) * self.multiplier
+            self.margin = np.abs(self.market_value) * self.margin_rate
+
+            equity = self.balance + self.unrealized.sum()
+            margin = self.margin.sum()
+
+        return equity, margin, equity - margin
+
+    def settle(self, prices=None):
+        """
+        Daily settlement: move floating pnl into balance, and reset the basis to settlement price
+        :param prices: settlement price array aligned with symbol list, default last marked price
+        :return: settled pnl
+        """
+        prices = self.last_price if prices is None else self.round_to_tick(prices)
+        pnl = (self.position * (prices - self.basis) * self.multiplier).sum()
+
+        self.balance += pnl
+        self.basis = np.where(self.position != 0, prices, 0.0)
+
+        return pnl
@@ -0,0 +1,227 @@
+# -*- coding: utf-8 -*-
+
+"""
+PnL Attribution
+Running realized/unrealized pnl, turnover and commission per symbol and per strategy
+
+@author: Jesse J. Hsu
+@email: jessexu117@outlook.com
+@version: 0.1
+"""
+
+import numpy as np
+
+from .account import apply_deals
+
+# column index of a book
+POSITION, BASIS, REALIZED, UNREALIZED, TURNOVER, COMMISSION = range(6)
+BOOK_FIELDS = ('position', 'basis', 'realized', 'unrealized', 'turnover', 'commission')
+
+
+def _book_deal(book, i, quantity, price, multiplier):
+    """
+    Update a book row (average cost method) from a deal
+    :param book: book array, shape (symbols, fields)
+    :param i: symbol index
+    :param quantity: signed deal quantity
+    :param price: deal price
+    :param multiplier: contract multiplier
+    """
+    pos = book[i, POSITION]
+    new_pos = pos + quantity
+
+    if pos * quantity < 0:
+        closed = min(abs(quantity), abs(pos))
+        book[i, REALIZED] += np.sign(pos) * closed * (price - book[i, BASIS]) * multiplier
+        if new_pos == 0:
+            book[i, BASIS] = 0.0
+        elif new_pos * pos < 0:
+            book[i, BASIS] = price
+    elif new_pos != 0:
+        book[i, BASIS] = (book[i, BASIS] * pos + price * quantity) / new_pos
+
+    book[i, POSITION] = new_pos
+    book[i, TURNOVER] += abs(quantity) * price * multiplier
+
+
+class PnLAttribution(object):
+    """
+    PnL attribution per symbol and per strategy_id
+    A book is an array with one row per symbol, a fill updates one row in O(1), a mark updates all rows in one
+    array operation
+    """
+
+    def __init__(self, symbol_list, multipliers=None):
+        """
+        Constructor
+        :param symbol_list: symbol list
+        :param multipliers: contract multiplier array aligned with symbol list, default 1
+        """
+        self.symbol_list = list(symbol_list)
+        self.symbol_index = {s: i for i, s in enumerate(self.symbol_list)}
+        n = len(self.symbol_list)
+
+        self.multiplier = np.ones(n) if multipliers is None else np.asarray(multipliers, dtype=np.float64)
+        self.last_price = np.zeros(n)
+
+        self.symbol_book = np.zeros((n, len(BOOK_FIELDS)))
+        self.strategy_ids = []
+        self.strategy_index = {}
+        self.strategy_books = np.zeros((0, n, len(BOOK_FIELDS)))
+
+        self.datetimes = []
+        self._symbol_series = []
+        self._strategy_series = []
+
+    def _strategy_book(self, strategy_id):
+        """
+        Get the book of a strategy, create it on first use
+        :param strategy_id:
+        :return: book array, shape (symbols, fields)
+        """
+        k = self.strategy_index.get(strategy_id)
+        if k is None:
+            k = self.strategy_index[strategy_id] = len(self.strategy_ids)
+            self.strategy_ids.append(strategy_id)
+            self.strategy_books = np.concatenate([self.strategy_books, np.zeros((1,) + self.symbol_book.shape)])
+        return self.strategy_books[k]
+
+    def on_fill(self, symbol, quantity, price, commission, strategy_id=None):
+        """
+        Book a deal
+        :param symbol: deal symbol
+        :param quantity: signed deal quantity, positive for BUY and negative for SELL
+        :param price: deal price
+        :param commission: fee
+        :param strategy_id: strategy_id of the deal, or dictionary key: strategy_id value: signed quantity
+                            for a netted order
+        """
+        i = self.symbol_index[symbol]
+
+        if quantity != 0:
+            _book_deal(self.symbol_book, i, quantity, price, self.multiplier[i])
+            self.symbol_book[i, COMMISSION] += commission
+
+        self._allocate(i, quantity, price, commission, strategy_id)
+
+    def _allocate(self, i, quantity, price, commission, strategy_id):
+        """
+        Book a deal into strategy books
+        """
+        mult = self.multiplier[i]
+        allocation = strategy_id if isinstance(strategy_id, dict) else {strategy_id: quantity}
+        total = sum(allocation.values())
+        if total != quantity and total != 0:
+            # partially filled netted order
+            allocation = {k: v * quantity / total for k, v in allocation.items()}
+        elif total == 0 and quantity != 0:
+            allocation = {None: quantity}
+
+        gross = sum(abs(v) for v in allocation.values())
+        for k, v in allocation.items():
+            if v == 0:
+                continue
+            book = self._strategy_book(k)
+            _book_deal(book, i, v, price, mult)
+            book[i, COMMISSION] += commission * abs(v) / gross
+
+    def on_batch_fill(self, index, quantities, prices, commissions, strategy_ids):
+        """
+        Book a batch of deals, deals of distinct symbols and one plain strategy_id are booked in array operations
+        :param index: symbol index array
+        :param quantities: signed deal quantity array
+        :param prices: deal price array
+        :param commissions: fee array
+        :param strategy_ids: strategy_id list, see on_fill()
+        """
+        if len(np.unique(index)) < len(index):
+            for i, q, p, c, k in zip(index, quantities, prices, commissions, strategy_ids):
+                self.on_fill(self.symbol_list[i], q, p, c, k)
+            return
+
+        self._book_deals(self.symbol_book, index, quantities, prices, commissions)
+
+        k = strategy_ids[0] if len(strategy_ids) else None
+        if not isinstance(k, dict) and all(s == k for s in strategy_ids):
+            self._book_deals(self._strategy_book(k), index, quantities, prices, commissions)
+        else:
+            for i, q, p, c, k in zip(index, quantities, prices, commissions, strategy_ids):
+                self._allocate(i, q, p, c, k)
+
+    def _book_deals(self, book, index, quantities, prices, commissions):
+        """
+        Update book rows of distinct symbols from deals
+        """
+        mult = self.multiplier[index]
+        position, basis = book[:, POSITION], book[:, BASIS]
+        book[index, REALIZED] += apply_deals(position, basis, index, quantities, prices, mult)
+        book[index, TURNOVER] += np.abs(quantities) * prices * mult
+        book[index, COMMISSION] += commissions
+
+    def mark(self, datetime, prices):
+        """
+        Mark all the books to market and record pnl series
+        :param datetime: mark time
+        :param prices: latest price array aligned with symbol list
+        """
+        self.last_price = np.asarray(prices, dtype=np.float64)
+
+        book = self.symbol_book
+        book[:, UNREALIZED] = book[:, POSITION] * (self.last_price - book[:, BASIS]) * self.multiplier
+        books = self.strategy_books
+        books[:, :, UNREALIZED] = books[:, :, POSITION] * (self.last_price - books[:, :, BASIS]) * self.multiplier
+
+        symbol_pnl = book[:, REALIZED] + book[:, UNREALIZED] - book[:, COMMISSION]
+        strategy_pnl = (books[:, :, REALIZED] + books[:, :, UNREALIZED] - books[:, :, COMMISSION]).sum(axis=1)
+
+        if self.datetimes and self.datetimes[-1] == datetime:
+            self._symbol_series[-1] = symbol_pnl
+            self._strategy_series[-1] = strategy_pnl
+        else:
+            self.datetimes.append(datetime)
+            self._symbol_series.append(symbol_pnl)
+            self._strategy_series.append(strategy_pnl)
+
+    def exit_allocations(self):
+        """
+        Allocation of closing all the positions
+        :return: list aligned with symbol list, element is dictionary key: strategy_id value: signed quantity
+        """
+        allocations = [{} for _ in self.symbol_list]
+        for k, j in self.strategy_index.items():
+            position = self.strategy_books[j, :, POSITION]
+            for i in np.flatnonzero(position):
+                allocations[i][k] = -position[i]
+        return allocations
+
+    def symbol_pnl(self):
+        """
+        Live counters per symbol
+        :return: dictionary, key: symbol value: dictionary of book fields
+        """
+        return {s: dict(zip(BOOK_FIELDS, self.symbol_book[i].tolist())) for s, i in self.symbol_index.items()}
+
+    def strategy_pnl(self):
+        """
+        Live counters per strategy, summed over symbols
+        :return: dictionary, key: strategy_id value: dictionary of book fields
+        """
+        totals = self.strategy_books.sum(axis=1)
+        return {k: dict(zip(BOOK_FIELDS[2:], totals[j, 2:].tolist())) for j, k in enumerate(self.strategy_ids)}
+
+    def symbol_series(self):
+        """
+        Net pnl series per symbol
+        :return: tuple (datetime list, array with shape (times, symbols))
+        """
+        return self.datetimes, np.array(self._symbol_series).reshape(-1, len(self.symbol_list))
+
+    def strategy_series(self):
+        """
+        Net pnl series per strategy, strategy columns ordered as strategy_ids
+        :return: tuple (datetime list, array with shape (times, strategies))
+        """
+        series = np.zeros((len(self._strategy_series), len(self.strategy_ids)))
+        for t, row in enumerate(self._strategy_series):
+            series[t, :len(row)] = row
+        return self.datetimes, series
@@ -16,7 +16,7 @@ import matplotlib.pyplot as plt
 import seaborn
 
 from .constant import EVENT_TICK, EVENT_BAR, EVENT_SIGNAL, EVENT_ORDER, EVENT_FILL, EMPTY_STRING
-from .event import SignalEvent
+from .constant import EVENT_TARGET, EVENT_BATCH_ORDER, EVENT_BATCH_FILL, EVENT_CANCEL
 from ..utils.logger import simple_logger
 
 seaborn.set_style('whitegrid')
@@ -32,7 +32,8 @@ class Backtest(object):
                  heartbeat, start_date, end_date, data_handler,
                  execution_handler, portfolio_handler, strategy,
                  commission_type='default', slippage_type='fixed',
-                 **kwargs):
+                 portfolio_params=None, execution_params=None, headless=False, monitor=None,
+                 periods=252 * 4 * 60, **kwargs):
         """
         Initial Setting for Back-testing
         :param data_dir:
@@ -47,6 +48,12 @@ class Backtest(object):
         :param strategy:
         :param commission_type:
         :param slippage_type:
+        :param portfolio_params: portfolio handler parameter dictionary, eg. contract_specs
+        :param execution_params: execution handler parameter dictionary, eg. cost_config
+        :param headless: no printing and plotting of the outcome, for batch runs
+        :param monitor: function called with the Backtest object after every timestamp,
+                        may read running_metrics() and call request_stop()
+        :param periods: backtest time scale of Sharpe ratio, period = 252 (day) or 252*4*60 (minute)
         :param kwargs: strategy parameter dictionary
         """
         self.data_dir = data_dir
@@ -63,6 +70,22 @@ class Backtest(object):
 
         self.commission_type = commission_type
         self.slippage_type = slippage_type
+        self.portfolio_params = portfolio_params or {}
+        self.execution_params = execution_params or {}
+
+        self.headless = headless
+        self.metrics = {}  # performance of the last simulation
+        self.monitor = monitor
+        self.periods = periods
+        self.stop_reason = None  # set by request_stop()
+
+        # running performance over holding records, updated in O(1) per timestamp
+        self.bar_count = 0  # timestamps run
+        self._records = 1
+        self._total = self._peak = float(initial_capital)
+        self._mean = self._m2 = 0.0
+        self._returns = 0
+        self._max_dd = 0.0
 
         self.events = queue.Queue()
 
@@ -73,6 +96,8 @@ class Backtest(object):
         self.fills = 0
 
         self.lst_bar_date = EMPTY_STRING
+        self.lst_tick_minute = None
+        self.lst_tick_session = None
 
         self._generate_trading_instances()
 
@@ -85,23 +110,67 @@ class Backtest(object):
         self.data_handler = self.data_handler_cls(self.events, self.symbol_list,
                                                   self.start_date, self.end_date, self.data_dir)
         self.portfolio_handler = self.portfolio_handler_cls(self.data_handler, self.events,
-                                                            self.start_date, self.initial_capital)
+                                                            self.start_date, self.initial_capital,
+                                                            **self.portfolio_params)
         self.execution_handler = self.execution_handler_cls(self.data_handler, self.events,
                                                             slippage_type=self.slippage_type,
-                                                            commission_type=self.commission_type)
+                                                            commission_type=self.commission_type,
+                                                            **self.execution_params)
         self.strategy = self.strategy_cls(self.data_handler, self.portfolio_handler, self.events, **self.kwargs)
 
+        declarations = self.strategy.declare_indicators()
+        if declarations:
+            self.data_handler.precompute_indicators(declarations)
+
+    def request_stop(self, reason='stop'):
+        """
+        Stop the simulation after the current timestamp, positions are closed as at the end of data
+        :param reason: stop reason recorded in metrics
+        """
+        self.stop_reason = reason
+
+    def _update_running_metrics(self):
+        """
+        Update running performance with the new holding records
+        """
+        holdings = self.portfolio_handler.all_holdings
+        if len(holdings) == self._records:
+            return
+        self._records = len(holdings)
+
+        total = holdings[-1]['total']
+        r = total / self._total - 1.0
+        self._total = total
+        self._returns += 1
+        delta = r - self._mean
+        self._mean += delta / self._returns
+        self._m2 += delta * (r - self._mean)
+
+        self._peak = max(self._peak, total)
+        self._max_dd = min(self._max_dd, total / self._peak - 1.0)
+
+    def running_metrics(self):
+        """
+        Performance up to the latest timestamp, same definitions as _output_performance()
+        :return: dictionary, key: 'bars', 'total', 'return', 'sharpe', 'max_drawdown'
+        """
+        std = np.sqrt(self._m2 / self._returns) if self._returns else 0.0
+        return {'bars': self.bar_count, 'total': self._total, 'return': self._total / self.initial_capital - 1.0,
+                'sharpe': np.sqrt(self.periods) * self._mean / std if std > 0 else np.nan,
+                'max_drawdown': self._max_dd}
+
     def _run_backtest(self):
         """
         Run backtest
         :return:
         """
-        # TODO: TICK TYPE + calculate_signals
         while True:
             # update bars
             bars = self.data_handler
-            if bars.continue_backtest:
+            if bars.continue_backtest and self.stop_reason is None:
                 bars.update_bars()
+                if bars.continue_backtest:
+                    self.execution_handler.update_market()
             else:
                 break
 
@@ -111,12 +180,23 @@ class Backtest(object):
                 try:
                     event = self.events.get(block=False)
                 except queue.Empty:
+                    if self.portfolio_handler.flush_signals() or self.execution_handler.flush_orders():
+                        continue
                     break
                 else:
                     if event is not None:
                         if event.type == EVENT_TICK:
-                            # TODO: TICK IMPLEMENT
-                            pass
+                            # holdings are recorded at the first tick of every minute, integer keys per tick
+                            tick_minute = event.minute
+                            new_minute = tick_minute != self.lst_tick_minute
+                            if new_minute and event.session != self.lst_tick_session:
+                                self.lst_tick_session = event.session
+                                self.strategy.before_trading(event)
+
+                            self.strategy.calculate_signals(event)
+                            if new_minute:
+                                self.lst_tick_minute = tick_minute
+                                self.portfolio_handler.update_time_index()
 
                         elif event.type == EVENT_BAR:
                             logger.debug(' '.join([event.bar[0], event.bar[1].strftime('%Y-%m-%d %H:%M:%S'),
@@ -134,40 +214,86 @@ class Backtest(object):
                             self.signals += 1
                             self.portfolio_handler.update_signal(event)
 
+                        elif event.type == EVENT_TARGET:
+                            logger.info(' '.join(['Create Target:', event.datetime.strftime('%Y-%m-%d %H:%M:%S')]))
+                            self.signals += 1
+                            self.portfolio_handler.update_target(event)
+
                         elif event.type == EVENT_ORDER:
                             self.orders += 1
                             self.execution_handler.execute_order(event)
 
+                        elif event.type == EVENT_BATCH_ORDER:
+                            self.orders += len(event)
+                            self.execution_handler.execute_order(event)
+
                         elif event.type == EVENT_FILL:
                             self.fills += 1
                             self.portfolio_handler.update_fill(event)
 
+                        elif event.type == EVENT_BATCH_FILL:
+                            self.fills += len(event)
+                            self.portfolio_handler.update_fill(event)
+
+                        elif event.type == EVENT_CANCEL:
+                            logger.info(' '.join(['Cancel Order:', str(event.order_id), event.symbol,
+                                                  str(event.quantity), str(event.reason)]))
+                            self.portfolio_handler.update_cancel(event)
+
+            if bars.continue_backtest:
+                self.bar_count += 1
+                self._update_running_metrics()
+                if self.monitor is not None:
+                    self.monitor(self)
+
     def _force_close(self):
         """
         Force to close position when backtest is over
+        Working orders are filled or cancelled first, then the close-out is filled at the last bar
         :return:
         """
-        for s in self.symbol_list:
-            self.portfolio_handler.update_signal(SignalEvent(s, self.portfolio_handler.current_datetime, 'EXIT'))
-            event = self.events.get()
-            if event is not None:
-                assert event.type == EVENT_ORDER
-                self.execution_handler.execute_order(event)
-                event = self.events.get()
-                assert event.type == EVENT_FILL
-                self.portfolio_handler.update_fill(event)
-                self.portfolio_handler.update_time_index()
-                logger.info(
-                    ' '.join(['Force Clear:', self.portfolio_handler.current_datetime.strftime('%Y-%m-%d %H:%M:%S'),
-                              s, 'EXIT']))
+        self.execution_handler.close_orders()
+        self._drain_events()
+        self.portfolio_handler.exit_all()
+        self._drain_events()
+        self.portfolio_handler.update_time_index()
+
+    def _drain_events(self):
+        """
+        Handle the events left in Events queue after data ends
+        """
+        while True:
+            try:
+                event = self.events.get(block=False)
+            except queue.Empty:
+                if self.portfolio_handler.flush_signals() or self.execution_handler.flush_orders():
+                    continue
+                break
+            else:
+                if event is not None:
+                    if event.type in (EVENT_ORDER, EVENT_BATCH_ORDER):
+                        self.orders += len(event) if event.type == EVENT_BATCH_ORDER else 1
+                        self.execution_handler.execute_order(event)
+                    elif event.type in (EVENT_FILL, EVENT_BATCH_FILL):
+                        self.fills += len(event) if event.type == EVENT_BATCH_FILL else 1
+                        self.portfolio_handler.update_fill(event)
+                        symbols = event.symbols if event.type == EVENT_BATCH_FILL else [event.symbol]
+                        for symbol in symbols:
+                            logger.info(
+                                ' '.join(['Force Clear:', self.portfolio_handler.current_datetime.strftime(
+                                    '%Y-%m-%d %H:%M:%S'), symbol, 'EXIT']))
+                    elif event.type == EVENT_CANCEL:
+                        self.portfolio_handler.update_cancel(event)
 
     @staticmethod
-    def _output_performance(total_series, periods=252 * 4 * 60):
+    def _output_performance(total_series, periods=252 * 4 * 60, verbose=True):
         """
         Print the performance of backtest
         including Money Curve, Sharpe ratio and Max-drawdown
         :param total_series: Account Money series
         :param periods: backtest time scale, period = 252 (day) or 252*24*60 (minute)
+        :param verbose: print the performance
+        :return: dictionary, key: 'return', 'sharpe', 'max_drawdown'
         """
         perform = total_series.to_frame(name='total')
         perform['return'] = perform['total'].pct_change()
@@ -179,9 +305,12 @@ class Backtest(object):
         perform['drawdown'] = perform['curve'] / perform['cum_max'] - 1
         max_dd = perform['drawdown'].min()
 
-        print('Return Rate: {}'.format(ret))
-        print('Sharpe Ratio: {}'.format(sharpe_ratio))
-        print('Maximal Drawdown: {}'.format(max_dd))
+        if verbose:
+            print('Return Rate: {}'.format(ret))
+            print('Sharpe Ratio: {}'.format(sharpe_ratio))
+            print('Maximal Drawdown: {}'.format(max_dd))
+
+        return {'return': ret, 'sharpe': sharpe_ratio, 'max_drawdown': max_dd}
 
     @staticmethod
     def _plot_curve(total_series):
@@ -235,8 +364,9 @@ class Backtest(object):
         start = time.time()
         logger.info('Start Backtest...')
         self._run_backtest()
-        logger.info('Summary: Signals (%s), Orders (%s), Fills (%s)' % (self.signals, self.orders, self.fills))
         self._force_close()
+        logger.info('Summary: Signals (%s), Orders (%s), Fills (%s)' % (self.signals, self.orders, self.fills))
+        self.execution_handler.close()
         end = time.time()
         timing = round(end - start, 2)
         logger.info('Backtest took %s seconds!' % timing)
@@ -246,9 +376,13 @@ class Backtest(object):
         holdings = pd.DataFrame(self.portfolio_handler.all_holdings).drop_duplicates(subset='datetime',
                                                                                      keep='last').set_index('datetime')
 
-        Backtest._output_performance(total_series=holdings['total'])
+        self.metrics = Backtest._output_performance(total_series=holdings['total'], periods=self.periods,
+                                                    verbose=not self.headless)
+        self.metrics.update(final_total=holdings['total'].iloc[-1], signals=self.signals, orders=self.orders,
+                            fills=self.fills, seconds=timing, bars=self.bar_count, stop_reason=self.stop_reason)
 
-        Backtest._plot_curve(total_series=holdings['total'])
+        if not self.headless:
+            Backtest._plot_curve(total_series=holdings['total'])
         # Backtest._plot_curve_min(money_list=self.portfolio_handler.money_day_list)
 
         return positions, holdings
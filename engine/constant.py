@@ -26,8 +26,13 @@ ORDER_SELL = 'SELL'
 # order type
 MARKET_ORDER = 'MKT'
 LIMITED_ORDER = 'LMT'
+STOP_ORDER = 'STP'
 
 # order status type
+STATUS_ACTIVE = 'ACTIVE'
+STATUS_PARTIAL = 'PARTIAL'
+STATUS_FILLED = 'FILLED'
+STATUS_CANCELLED = 'CANCELLED'
 
 # event type
 EVENT_TICK = 'TICK'
@@ -35,3 +40,7 @@ EVENT_BAR = 'BAR'
 EVENT_SIGNAL = 'SIGNAL'
 EVENT_ORDER = 'ORDER'
 EVENT_FILL = 'FILL'
+EVENT_TARGET = 'TARGET'
+EVENT_BATCH_ORDER = 'BATCH_ORDER'
+EVENT_BATCH_FILL = 'BATCH_FILL'
+EVENT_CANCEL = 'CANCEL'
@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+
+"""
+Cost Model Table
+Commission and slippage parameters resolved once per symbol
+
+@author: Jesse J. Hsu
+@email: jessexu117@outlook.com
+@version: 0.1
+"""
+
+from collections import namedtuple
+
+import numpy as np
+
+from ..utils.symbol import get_symbol_info, get_exchange, get_product
+
+# commission scheme
+COMMISSION_MONEY = 'money'  # rate of trade cost
+COMMISSION_LOT = 'lot'  # fee per lot
+
+# fee schedule comes from the symbol registry, configuration is merged over it
+# in the order: default, exchange, product, symbol
+DEFAULT_COST_CONFIG = {
+    'default': {'slippage_percent': 0.1},
+}
+
+
+CostModel = namedtuple('CostModel', ('per_lot', 'rate', 'min_commission', 'slippage_rate', 'multiplier'))
+
+
+def resolve_cost_model(symbol, cost_config=None, commission_type='default', slippage_type='fixed'):
+    """
+    Resolve the cost model of a symbol
+    :param symbol: symbol of future
+    :param cost_config: dictionary, key: 'default', exchange, product or symbol value: parameter dictionary
+    :param commission_type: commission model, zero or default
+    :param slippage_type: slippage model, fixed or zero
+    :return: CostModel
+    """
+    cost_config = DEFAULT_COST_CONFIG if cost_config is None else cost_config
+
+    params = {'commission': COMMISSION_MONEY, 'rate': 0.0, 'min_commission': 0.0, 'slippage_percent': 0.1,
+              'multiplier': 1.0}
+    record = get_symbol_info(symbol)
+    if record is not None:
+        params.update(commission=record.commission, rate=record.commission_rate,
+                      min_commission=record.min_commission, multiplier=record.multiplier)
+
+    for key in ('default', get_exchange(symbol), get_product(symbol), symbol):
+        params.update(cost_config.get(key, {}))
+
+    if commission_type != 'default':
+        params.update(rate=0.0, min_commission=0.0)
+    if slippage_type != 'fixed':
+        params.update(slippage_percent=0.0)
+
+    assert params['commission'] in (COMMISSION_MONEY, COMMISSION_LOT), 'commission scheme error!'
+    return CostModel(params['commission'] == COMMISSION_LOT, float(params['rate']),
+                     float(params['min_commission']), params['slippage_percent'] / 100.0, float(params['multiplier']))
+
+
+class CostTable(object):
+    """
+    Cost models of all the symbols, as a dictionary for single orders and as arrays for batch orders
+    """
+
+    def __init__(self, symbol_list, cost_config=None, commission_type='default', slippage_type='fixed'):
+        """
+        Constructor
+        :param symbol_list: symbol list
+        :param cost_config: dictionary, see resolve_cost_model()
+        :param commission_type: commission model, zero or default
+        :param slippage_type: slippage model, fixed or zero
+        """
+        self.symbol_index = {s: i for i, s in enumerate(symbol_list)}
+        self.models = {s: resolve_cost_model(s, cost_config, commission_type, slippage_type) for s in symbol_list}
+
+        models = [self.models[s] for s in symbol_list]
+        self.per_lot = np.array([m.per_lot for m in models], dtype=bool)
+        self.rate = np.array([m.rate for m in models], dtype=np.float64)
+        self.min_commission = np.array([m.min_commission for m in models], dtype=np.float64)
+        self.slippage_rate = np.array([m.slippage_rate for m in models], dtype=np.float64)
+        self.multiplier = np.array([m.multiplier for m in models], dtype=np.float64)
+
+    def __getitem__(self, symbol):
+        return self.models[symbol]
+
+    def fill(self, symbol, price, quantity, sign):
+        """
+        Fill price and commission of a single order
+        :param symbol: symbol of future
+        :param price: order price
+        :param quantity: order quantity
+        :param sign: 1 for BUY and -1 for SELL
+        :return: tuple (fill price, commission)
+        """
+        fill_price = price * (1.0 + sign * self.models[symbol].slippage_rate)
+        return fill_price, self.commission(symbol, fill_price, quantity)
+
+    def commission(self, symbol, price, quantity):
+        """
+        Commission of a deal without slippage
+        :param symbol: symbol of future
+        :param price: deal price
+        :param quantity: deal quantity
+        :return: commission
+        """
+        model = self.models[symbol]
+        fee = quantity * model.rate if model.per_lot else price * quantity * model.multiplier * model.rate
+        return max(fee, model.min_commission)
+
+    def fill_batch(self, index, prices, quantities, signs):
+        """
+        Fill prices and commissions of a batch of orders
+        :param index: symbol index array
+        :param prices: order price array
+        :param quantities: order quantity array
+        :param signs: 1 for BUY and -1 for SELL array
+        :return: tuple (fill price array, commission array)
+        """
+        fill_prices = prices * (1.0 + signs * self.slippage_rate[index])
+        return fill_prices, self.commission_batch(index, fill_prices, quantities)
+
+    def commission_batch(self, index, prices, quantities):
+        """
+        Commissions of a batch of deals without slippage
+        :param index: symbol index array
+        :param prices: deal price array
+        :param quantities: deal quantity array
+        :return: commission array
+        """
+        fees = np.where(self.per_lot[index], quantities, prices * quantities * self.multiplier[index]) * \
+            self.rate[index]
+        return np.maximum(fees, self.min_commission[index])
@@ -8,11 +8,17 @@ DataHandler Abstract Base Class
 @version: 0.1
 """
 import os
+import numpy as np
 import pandas as pd
 from datetime import *
 from abc import ABCMeta, abstractmethod
 from collections import namedtuple
 
+try:
+    from multiprocessing import shared_memory
+except ImportError:  # Python < 3.8
+    shared_memory = None
+
 try:
     from WindPy import *
 except ImportError:
@@ -21,7 +27,213 @@ else:
     w.start()
     w.isconnected()
 
-from .event import BarEvent
+from .event import BarEvent, TickEvent
+from .indicator import WINDOW_INDICATORS, shared_indicator_cache
+from ..utils.symbol import get_symbol_info
+
+
+# parsed csv files shared by the data handlers of a process, key: file path value: DataFrame
+# filled by preload_csv_data(), so backtests of a sweep or forked workers never parse a file again
+csv_data_cache = {}
+
+
+def _parse_bar_csv(path):
+    return pd.read_csv(path, header=0, index_col=0, parse_dates=True,
+                       names=['datetime', 'open', 'high', 'low', 'close', 'volume']).dropna().sort_index()
+
+
+def read_bar_csv(path):
+    """
+    Read a bar csv file, from csv data cache when preloaded
+    :param path: csv file path
+    :return: DataFrame with datetime index, read only
+    """
+    frame = csv_data_cache.get(os.path.abspath(path))
+    return _parse_bar_csv(path) if frame is None else frame
+
+
+def preload_csv_data(data_dir, symbol_list):
+    """
+    Parse the bar csv files of symbols into csv data cache
+    :param data_dir: data directory
+    :param symbol_list: symbol list
+    :return: dictionary, key: file path value: DataFrame
+    """
+    frames = {}
+    for s in symbol_list:
+        path = os.path.abspath(os.path.join(data_dir, '%s.csv' % s))
+        frame = csv_data_cache.get(path)
+        frames[path] = csv_data_cache[path] = _parse_bar_csv(path) if frame is None else frame
+    return frames
+
+
+def night_session_start(record):
+    """
+    Start of the night session of a symbol
+    :param record: SymbolRecord of the symbol, or None
+    :return: minutes of day, None without night session
+    """
+    # 夜盘：晚上开始的交易时段，如 2100-0100
+    starts = [start.hour * 60 + start.minute for start, _ in (record.sessions if record is not None else ())
+              if start.hour >= 18]
+    return min(starts) if starts else None
+
+
+def trading_days(times, record=None):
+    """
+    Trading day of datetimes by the sessions of a symbol
+    Datetimes from the start of a night session on, after midnight included, belong to the next trading day;
+    weekends are skipped, holidays are not known
+    :param times: datetime64 array
+    :param record: SymbolRecord of the symbol, None or without night session for calendar day
+    :return: days since epoch array
+    """
+    times = np.asarray(times, dtype='datetime64[ns]')
+    days = times.astype('datetime64[D]')
+    night = night_session_start(record)
+    if night is None:
+        return days.astype(np.int64)
+    minutes = (times - days).astype('timedelta64[m]').astype(np.int64)
+    days = days + (minutes >= night).astype(np.int64)
+    return np.busday_offset(days, 0, roll='forward').astype(np.int64)
+
+
+def trading_day(time, record=None):
+    """
+    Trading day of a datetime, scalar version of trading_days()
+    :param time: datetime
+    :param record: SymbolRecord of the symbol
+    :return: days since epoch
+    """
+    day = np.datetime64(time.date(), 'D')
+    night = night_session_start(record)
+    if night is None:
+        return int(day.astype(np.int64))
+    if time.hour * 60 + time.minute >= night:
+        day += 1
+    return int(np.busday_offset(day, 0, roll='forward').astype(np.int64))
+
+
+def trading_day_record(symbol_list):
+    """
+    Symbol record deciding the trading day of a portfolio, the symbol with the earliest night session,
+    so a new trading day starts when any symbol starts trading
+    :param symbol_list: symbol list
+    :return: SymbolRecord, None when no symbol has a night session
+    """
+    records = [r for r in map(get_symbol_info, symbol_list) if night_session_start(r) is not None]
+    return min(records, key=night_session_start) if records else None
+
+
+# shared memory bar data known to the process, key: (data directory, symbol tuple) value: SharedBarSpec
+# filled by publish_bar_data() in the publishing process, inherited by forked workers or passed to spawned ones
+shared_bar_specs = {}
+_shared_bar_stores = {}  # published stores owned by the process, key: same as shared_bar_specs
+_shared_segments = {}  # shared memory segments mapped in the process, key: segment name value: SharedMemory
+
+SharedBarSpec = namedtuple('SharedBarSpec', ('name', 'times', 'symbols'))
+
+
+def _shared_bar_key(data_dir, symbol_list):
+    return os.path.abspath(data_dir), tuple(symbol_list)
+
+
+def _bar_views(buffer, times, symbols):
+    """
+    Arrays over a shared memory buffer: datetime int64 (ns) array with shape (times,),
+    followed by bar matrix with shape (times, symbols, fields)
+    """
+    index = np.ndarray((times,), dtype=np.int64, buffer=buffer)
+    matrix = np.ndarray((times, symbols, 5), dtype=np.float64, buffer=buffer, offset=times * 8)
+    return index, matrix
+
+
+class SharedBarStore(object):
+    """
+    Bar data of symbols published once into a shared memory segment
+    The whole csv files are aligned on the datetime of the first symbol, as CSVDataHandler does for a date range.
+    The store is reference counted by its users, the segment is unlinked when the last one releases it
+    """
+
+    def __init__(self, data_dir, symbol_list):
+        """
+        Constructor
+        :param data_dir: data directory
+        :param symbol_list: symbol list
+        """
+        assert shared_memory is not None, AssertionError('shared memory requires Python 3.8+!')
+        frames = [read_bar_csv(os.path.join(data_dir, '%s.csv' % s)) for s in symbol_list]
+        comb_index = frames[0].index
+        times = len(comb_index)
+
+        self.key = _shared_bar_key(data_dir, symbol_list)
+        self.refcount = 0
+        self.shm = shared_memory.SharedMemory(create=True, size=max(times * (8 + len(symbol_list) * 5 * 8), 1))
+        index, matrix = _bar_views(self.shm.buf, times, len(symbol_list))
+        index[:] = comb_index.values.astype('datetime64[ns]').view(np.int64)
+        for j, frame in enumerate(frames):
+            matrix[:, j] = frame.reindex(index=comb_index, method='pad')[['open', 'high', 'low', 'close',
+                                                                           'volume']].values
+        del index, matrix
+        self.spec = SharedBarSpec(self.shm.name, times, len(symbol_list))
+
+    def acquire(self):
+        self.refcount += 1
+        return self
+
+    def release(self):
+        """
+        Drop a reference, unlink the segment with the last one
+        """
+        self.refcount -= 1
+        if self.refcount > 0:
+            return
+        shared_bar_specs.pop(self.key, None)
+        _shared_bar_stores.pop(self.key, None)
+        _shared_segments.pop(self.spec.name, None)
+        try:
+            self.shm.close()
+        except BufferError:
+            pass  # views of live data handlers, the mapping goes away with them
+        self.shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.release()
+
+
+def publish_bar_data(data_dir, symbol_list):
+    """
+    Publish the bar data of symbols into shared memory, or take a reference of the store already published
+    :param data_dir: data directory
+    :param symbol_list: symbol list
+    :return: SharedBarStore, call release() or use it as a context manager when done
+    """
+    key = _shared_bar_key(data_dir, symbol_list)
+    store = _shared_bar_stores.get(key)
+    if store is None:
+        store = _shared_bar_stores[key] = SharedBarStore(data_dir, symbol_list)
+        shared_bar_specs[key] = store.spec
+        _shared_segments[store.spec.name] = store.shm
+    return store.acquire()
+
+
+def attach_bar_data(data_dir, symbol_list):
+    """
+    Attach to the published bar data of symbols, a segment is mapped once per process
+    :return: tuple (datetime int64 array, bar matrix), read only views, None if not published
+    """
+    spec = shared_bar_specs.get(_shared_bar_key(data_dir, symbol_list))
+    if spec is None:
+        return None
+    shm = _shared_segments.get(spec.name)
+    if shm is None:
+        shm = _shared_segments[spec.name] = shared_memory.SharedMemory(name=spec.name)
+    index, matrix = _bar_views(shm.buf, spec.times, spec.symbols)
+    index.flags.writeable = matrix.flags.writeable = False
+    return index, matrix
 
 
 class DataHandler(object):
@@ -31,6 +243,10 @@ class DataHandler(object):
     There is no difference between historical and real-time data
     """
     Bar = namedtuple('Bar', ('symbol', 'datetime', 'open', 'high', 'low', 'close', 'volume'))
+    BarArrays = namedtuple('BarArrays', ('datetime', 'open', 'high', 'low', 'close', 'volume'))
+    Tick = namedtuple('Tick', ('symbol', 'datetime', 'bid', 'ask', 'bid_size', 'ask_size', 'last', 'volume'))
+    Session = namedtuple('Session', ('symbol', 'date', 'open', 'high', 'low', 'close', 'volume', 'vwap',
+                                     'prev_open', 'prev_high', 'prev_low', 'prev_close'))
 
     __metaclass__ = ABCMeta
 
@@ -51,6 +267,120 @@ class DataHandler(object):
         """
         raise NotImplementedError('function update_bars() is not implemented!')
 
+    def get_symbol_info(self, symbol):
+        """
+        Get the symbol information from symbol registry
+        :param symbol: symbol of bar
+        :return: SymbolRecord, None for unknown symbol
+        """
+        return get_symbol_info(symbol)
+
+    def precompute_indicators(self, declarations, check_lookahead=True):
+        """
+        Compute declared indicators over the whole history before backtest
+        :param declarations: dictionary, key: indicator name value: function of BarArrays returning an array
+                             with shape (times, symbols)
+        :param check_lookahead: check that every indicator only uses past bars
+        """
+        raise NotImplementedError('function precompute_indicators() is not implemented!')
+
+    def get_session(self, symbol):
+        """
+        Get the running statistics of the current session and the OHLC of the prior session
+        :param symbol: symbol of bar
+        :return: Session tuple, prior session fields are NaN in the first session
+        """
+        raise NotImplementedError('function get_session() is not implemented!')
+
+
+class SessionStats(object):
+    """
+    Running session statistics of all symbols in arrays aligned with symbol index, updated in O(1) per bar
+    A session is a trading day, see trading_days(); when a bar of a new trading day arrives, the current session
+    becomes the prior session
+    """
+
+    def __init__(self, n):
+        """
+        Constructor
+        :param n: number of symbols
+        """
+        self.session = np.full(n, np.iinfo(np.int64).min)  # trading day, days since epoch
+        self.open = np.full(n, np.nan)
+        self.high = np.full(n, np.nan)
+        self.low = np.full(n, np.nan)
+        self.close = np.full(n, np.nan)
+        self.volume = np.zeros(n)
+        self.turnover = np.zeros(n)  # sum of price * volume, for vwap
+
+        self.prev_open = np.full(n, np.nan)
+        self.prev_high = np.full(n, np.nan)
+        self.prev_low = np.full(n, np.nan)
+        self.prev_close = np.full(n, np.nan)
+
+    def update(self, i, session, open_price, high, low, close, volume):
+        """
+        Update with new bars
+        :param i: symbol index, or slice / index array of symbols
+        :param session: trading day of the bars, scalar or array aligned with i
+        :param open_price: bar open, scalar or array aligned with i
+        :param high: bar high
+        :param low: bar low
+        :param close: bar close
+        :param volume: bar volume
+        """
+        new = self.session[i] != session
+        if np.any(new):
+            j = np.arange(len(self.session))[i][new] if np.ndim(new) else i
+            self.prev_open[j] = self.open[j]
+            self.prev_high[j] = self.high[j]
+            self.prev_low[j] = self.low[j]
+            self.prev_close[j] = self.close[j]
+
+            self.session[j] = session[new] if np.ndim(session) else session
+            self.open[j] = open_price[new] if np.ndim(open_price) else open_price
+            self.high[j] = np.nan
+            self.low[j] = np.nan
+            self.volume[j] = 0.0
+            self.turnover[j] = 0.0
+
+        self.high[i] = np.fmax(self.high[i], high)
+        self.low[i] = np.fmin(self.low[i], low)
+        self.close[i] = close
+        self.volume[i] += volume
+        self.turnover[i] += close * volume
+
+    def update_price(self, i, session, price, volume):
+        """
+        Update a symbol with a new trade price, scalar fast path for ticks
+        :param i: symbol index
+        :param session: trading day of the trade
+        :param price: trade price
+        :param volume: trade volume
+        """
+        if self.session[i] != session:
+            self.update(i, session, price, price, price, price, volume)
+            return
+        if price > self.high[i]:
+            self.high[i] = price
+        elif price < self.low[i]:
+            self.low[i] = price
+        self.close[i] = price
+        self.volume[i] += volume
+        self.turnover[i] += price * volume
+
+    def get(self, i, symbol=None):
+        """
+        Session tuple of a symbol, vwap is weighted by close price
+        :param i: symbol index
+        :param symbol: symbol of the tuple
+        """
+        volume = self.volume[i]
+        return DataHandler.Session(symbol, np.datetime64(int(self.session[i]), 'D').astype(object),
+                                   self.open[i], self.high[i], self.low[i], self.close[i], volume,
+                                   self.turnover[i] / volume if volume > 0 else self.close[i],
+                                   self.prev_open[i], self.prev_high[i], self.prev_low[i], self.prev_close[i])
+
 
 class CSVDataHandler(DataHandler):
     """
@@ -76,7 +406,21 @@ class CSVDataHandler(DataHandler):
         self.latest_symbol_data = {}
         self.continue_backtest = True
 
+        self.symbol_index = {s: i for i, s in enumerate(self.symbol_list)}
+        self.bar_matrix = None  # array with shape (times, symbols, fields), fields: open, high, low, close, volume
+        self.bar_arrays = None  # BarArrays, field views of bar_matrix with shape (times, symbols)
+        self.indicators = {}  # key: indicator name value: array with shape (times, symbols)
+        self.cursor = -1  # time index of the latest bar
+        self.trading_days = None  # array with shape (times, symbols), trading day of every bar
+        self.session_stats = SessionStats(len(symbol_list))
+
+        # window indicators are shared by the data handlers of the same data
+        self.indicator_cache = shared_indicator_cache
+        self.cache_scope = (os.path.abspath(dir), tuple(symbol_list), start_date, end_date)
+
         self._open_convert_csv_files()
+        self.trading_days = np.stack([trading_days(self.bar_arrays.datetime.values, self.get_symbol_info(s))
+                                      for s in self.symbol_list], axis=1)
 
     def _open_convert_csv_files(self):
         """
@@ -86,11 +430,7 @@ class CSVDataHandler(DataHandler):
         """
         comb_index = None
         for s in self.symbol_list:
-            self.symbol_data[s] = pd.read_csv(
-                os.path.join(self.csv_dir, '%s.csv' % s),
-                header=0, index_col=0, parse_dates=True,
-                names=['datetime', 'open', 'high', 'low', 'close', 'volume']
-            ).dropna().sort_index()[self.start_date:self.end_date]
+            self.symbol_data[s] = read_bar_csv(os.path.join(self.csv_dir, '%s.csv' % s))[self.start_date:self.end_date]
 
             if comb_index is None:
                 comb_index = self.symbol_data[s].index
@@ -98,8 +438,92 @@ class CSVDataHandler(DataHandler):
                 comb_index.union(self.symbol_data[s].index)
             self.latest_symbol_data[s] = []
 
-        for s in self.symbol_list:
-            self.symbol_data[s] = self.symbol_data[s].reindex(index=comb_index, method='pad').iterrows()
+        frames = [self.symbol_data[s].reindex(index=comb_index, method='pad') for s in self.symbol_list]
+        self.bar_matrix = np.stack([f[['open', 'high', 'low', 'close', 'volume']].values.astype(np.float64)
+                                    for f in frames], axis=1)
+        self.bar_arrays = DataHandler.BarArrays(comb_index, *[self.bar_matrix[:, :, k] for k in range(5)])
+
+        for s, frame in zip(self.symbol_list, frames):
+            self.symbol_data[s] = frame.iterrows()
+
+    def precompute_indicators(self, declarations, check_lookahead=True):
+        """
+        Compute declared indicators over the whole history before backtest
+        Values are read by cursor during backtest, so a bar never sees the values of later bars
+        :param declarations: dictionary, key: indicator name value: function of BarArrays returning an array
+                             with shape (times, symbols)
+        :param check_lookahead: recompute on the first half of history, the values must be the same
+        """
+        data = self.bar_arrays
+        half = DataHandler.BarArrays(*[x[:len(data.datetime) // 2] for x in data])
+        for name, func in declarations.items():
+            values = np.asarray(func(data), dtype=np.float64)
+            assert values.shape == data.close.shape, AssertionError('indicator %s shape error!' % name)
+            if check_lookahead and len(half.datetime) > 0:
+                if not np.allclose(np.asarray(func(half), dtype=np.float64), values[:len(half.datetime)],
+                                   equal_nan=True):
+                    raise ValueError('indicator %s uses future bars!' % name)
+            self.indicators[name] = values
+
+    def get_indicator(self, name, symbol=None):
+        """
+        Get the indicator value of the latest bar
+        :param name: indicator name
+        :param symbol: symbol, None for all symbols
+        :return: value, or value array aligned with symbol list
+        """
+        row = self.indicators[name][self.cursor]
+        return row if symbol is None else row[self.symbol_index[symbol]]
+
+    def get_indicator_history(self, name, symbol=None, n=1):
+        """
+        Get the indicator values of the latest n bars
+        :param name: indicator name
+        :param symbol: symbol, None for all symbols
+        :param n: amount of bars
+        :return: array with shape (n,) or (n, symbols)
+        """
+        rows = self.indicators[name][max(self.cursor - n + 1, 0):self.cursor + 1]
+        return rows if symbol is None else rows[:, self.symbol_index[symbol]]
+
+    def get_bar_slice(self):
+        """
+        Get the latest bars of all the symbols
+        :return: array view with shape (symbols, fields), fields: open, high, low, close, volume
+        """
+        return self.bar_matrix[self.cursor]
+
+    def get_history(self, n=1):
+        """
+        Get the latest n bars of all the symbols
+        :param n: amount of bars, less bars at the beginning
+        :return: array view with shape (bars, symbols, fields), the last bar is the latest
+        """
+        return self.bar_matrix[max(self.cursor - n + 1, 0):self.cursor + 1]
+
+    def get_window_indicator(self, symbol, name, n, func=None):
+        """
+        Get an indicator over the latest n bars of a symbol, computed once per bar via indicator cache
+        :param symbol:
+        :param name: indicator name, key of WINDOW_INDICATORS if func is None
+        :param n: window, amount of bars
+        :param func: function of BarArrays of the window, its result must only depend on name and n
+        :return: indicator value, NaN if less than n bars
+        """
+        if self.cursor + 1 < n:
+            return np.nan
+        func = WINDOW_INDICATORS[name] if func is None else func
+        key = (self.cache_scope, symbol, name, n, self.cursor)
+        return self.indicator_cache.get(key, lambda: func(self._window(symbol, n)))
+
+    def _window(self, symbol, n):
+        """
+        BarArrays of the latest n bars of a symbol
+        """
+        j = self.symbol_index[symbol]
+        start, end = self.cursor - n + 1, self.cursor + 1
+        data = self.bar_arrays
+        return DataHandler.BarArrays(data.datetime[start:end], *[x[start:end, j] for x in data[1:]])
 
     def get_bar(self, symbol, _date):
         """
@@ -174,6 +598,7 @@ class CSVDataHandler(DataHandler):
 
         :return:
         """
+        self.cursor += 1
         for s in self.symbol_list:
             try:
                 bar = next(self._get_new_bar(s))
@@ -184,6 +609,186 @@ class CSVDataHandler(DataHandler):
                     self.latest_symbol_data[s].append(bar)
                     self.events.put(BarEvent(bar))
 
+        if self.continue_backtest:
+            self.session_stats.update(slice(None), self.trading_days[self.cursor], *self.bar_matrix[self.cursor].T)
+
+    def get_session(self, symbol):
+        return self.session_stats.get(self.symbol_index[symbol], symbol)
+
+
+class SharedCSVDataHandler(CSVDataHandler):
+    """
+    CSV data handler on bar data published in shared memory by publish_bar_data()
+    Bar matrix and bar arrays are read only views of the shared segment, nothing is copied per process.
+    Symbols are aligned over the whole files, so a symbol without a bar at start date is padded by its earlier bar.
+    Reads the csv files as CSVDataHandler when the data is not published
+    """
+
+    def _open_convert_csv_files(self):
+        views = attach_bar_data(self.csv_dir, self.symbol_list)
+        if views is None:
+            return super(SharedCSVDataHandler, self)._open_convert_csv_files()
+
+        times, matrix = views
+        # same date bounds as the DataFrame slice of CSVDataHandler, a date-only end date includes that day
+        rows = pd.DatetimeIndex(times.view('datetime64[ns]')).slice_indexer(self.start_date, self.end_date)
+        comb_index = pd.DatetimeIndex(times[rows].view('datetime64[ns]'))
+        self.bar_matrix = matrix[rows]
+        self.bar_arrays = DataHandler.BarArrays(comb_index, *[self.bar_matrix[:, :, k] for k in range(5)])
+
+        for j, s in enumerate(self.symbol_list):
+            self.symbol_data[s] = zip(comb_index, self.bar_matrix[:, j])
+            self.latest_symbol_data[s] = []
+
+
+class TickStore(object):
+    """
+    Tick data of all symbols in arrays, one array per field and symbol
+    The merged timeline of all symbols is precomputed, the latest tick of every symbol is a row cursor
+    """
+    FIELDS = ('bid', 'ask', 'bid_size', 'ask_size', 'last', 'volume')
+
+    def __init__(self, symbol_list, frames):
+        """
+        Constructor
+        :param symbol_list: symbol list
+        :param frames: dictionary, key: symbol value: DataFrame with datetime index and FIELDS columns
+        """
+        self.symbol_list = list(symbol_list)
+        self.datetime = [frames[s].index.values for s in self.symbol_list]
+        # trading day, days since epoch
+        self.session = [trading_days(t, get_symbol_info(s)) for s, t in zip(self.symbol_list, self.datetime)]
+        self.minute = [t.astype('datetime64[m]').astype(np.int64) for t in self.datetime]  # minutes since epoch
+        for field in TickStore.FIELDS:
+            setattr(self, field, [frames[s][field].values.astype(np.float64) for s in self.symbol_list])
+
+        # merged timeline, ticks at the same time ordered by symbol list
+        lengths = [len(t) for t in self.datetime]
+        times = np.concatenate(self.datetime) if lengths else np.zeros(0, dtype='datetime64[ns]')
+        order = np.argsort(times, kind='stable')
+        self.timeline_symbol = np.repeat(np.arange(len(lengths)), lengths)[order]
+        self.timeline_row = np.concatenate([np.arange(n) for n in lengths] or [np.zeros(0, dtype=np.int64)])[order]
+
+        self.position = np.full(len(self.symbol_list), -1, dtype=np.int64)  # row of the latest tick
+
+    def __len__(self):
+        return len(self.timeline_symbol)
+
+    def timestamp(self, i, row=None):
+        """
+        Datetime of a tick
+        :param i: symbol index
+        :param row: tick row, default the latest tick
+        """
+        return pd.Timestamp(self.datetime[i][self.position[i] if row is None else row])
+
+    def tick(self, i, row=None):
+        """
+        Tick tuple (symbol, datetime, bid, ask, bid_size, ask_size, last, volume)
+        :param i: symbol index
+        :param row: tick row, default the latest tick
+        """
+        row = self.position[i] if row is None else row
+        return DataHandler.Tick(self.symbol_list[i], self.timestamp(i, row), self.bid[i][row], self.ask[i][row],
+                                self.bid_size[i][row], self.ask_size[i][row], self.last[i][row],
+                                self.volume[i][row])
+
+
+class CSVTickDataHandler(DataHandler):
+    """
+    Tick data handler via csv file
+    Column index: 'datetime', 'bid', 'ask', 'bid_size', 'ask_size', 'last', 'volume'
+    A tick of one symbol is released at each update_bars() call; ticks before every symbol has a quote
+    only set the initial quotes. Bars are made from the last price, for the portfolio to mark to market
+    """
+
+    def __init__(self, events, symbol_list, start_date, end_date, dir):
+        """
+        Constructor
+        :param events: queue
+        :param symbol_list:
+        :param start_date:
+        :param end_date:
+        :param dir: data directory
+        """
+        self.events = events
+        self.symbol_list = symbol_list
+        self.start_date = start_date
+        self.end_date = end_date
+        self.csv_dir = dir
+        self.symbol_index = {s: i for i, s in enumerate(symbol_list)}
+
+        frames = {}
+        for s in self.symbol_list:
+            frames[s] = pd.read_csv(
+                os.path.join(self.csv_dir, '%s.csv' % s),
+                header=0, index_col=0, parse_dates=True,
+                names=['datetime'] + list(TickStore.FIELDS)
+            ).dropna().sort_index()[self.start_date:self.end_date]
+        self.store = TickStore(self.symbol_list, frames)
+
+        self.tick_events = [TickEvent(store=self.store, symbol_index=i) for i in range(len(self.symbol_list))]
+        self.latest_symbol_index = None
+        self.cursor = 0
+        self.session_stats = SessionStats(len(symbol_list))
+
+        # initial quotes
+        seen = set()
+        while self.cursor < len(self.store) and len(seen) < len(self.symbol_list):
+            seen.add(self._advance())
+        self.continue_backtest = len(seen) == len(self.symbol_list)
+
+    def _advance(self):
+        """
+        Move the cursor to the next tick
+        :return: symbol index of the tick
+        """
+        i = self.store.timeline_symbol[self.cursor]
+        row = self.store.position[i] = self.store.timeline_row[self.cursor]
+        self.cursor += 1
+
+        self.session_stats.update_price(i, self.store.session[i][row], self.store.last[i][row],
+                                        self.store.volume[i][row])
+        return i
+
+    def update_bars(self):
+        """
+        Release the next tick
+        """
+        if self.cursor >= len(self.store):
+            self.continue_backtest = False
+            return
+        i = self.latest_symbol_index = self._advance()
+        self.events.put(self.tick_events[i])
+
+    def get_latest_tick(self, symbol):
+        """
+        Get the latest tick tuple of a symbol
+        """
+        return self.store.tick(self.symbol_index[symbol])
+
+    def get_latest_bars(self, symbol, n=1):
+        """
+        Latest n ticks as bars, OHLC are the last price
+        :param symbol:
+        :param n:
+        :return:
+        """
+        i = self.symbol_index[symbol]
+        p = self.store.position[i]
+        last, volume = self.store.last[i], self.store.volume[i]
+        return [DataHandler.Bar(symbol, self.store.timestamp(i, row), last[row], last[row], last[row], last[row],
+                                volume[row]) for row in range(max(p - n + 1, 0), p + 1)]
+
+    def get_latest_bar(self, symbol):
+        return self.get_latest_bars(symbol)[-1]
+
+    def get_latest_bar_datetime(self, symbol):
+        return self.store.timestamp(self.symbol_index[symbol])
+
+    def get_session(self, symbol):
+        return self.session_stats.get(self.symbol_index[symbol], symbol)
+
 
 class DBDataHandler(DataHandler):
     """
@@ -9,8 +9,13 @@ Event can be transfer between data, portfolio and simulated exchange
 @version: 0.1
 """
 
+import itertools
+import numpy as np
+import pandas as pd
 from abc import ABCMeta
 from .constant import EVENT_TICK, EVENT_BAR, EVENT_SIGNAL, EVENT_ORDER, EVENT_FILL
+from .constant import EVENT_TARGET, EVENT_BATCH_ORDER, EVENT_BATCH_FILL, EVENT_CANCEL
+from .constant import ORDER_BUY, MARKET_ORDER
 
 
 class Event(object):
@@ -23,12 +28,54 @@ class Event(object):
 
 class TickEvent(Event):
     """
-
+    Tick event class (quote market data)
+    Either holds a tick tuple, or reads the latest tick of a symbol from a tick store in place,
+    so one event per symbol can be reused for every quote update
     """
 
-    def __init__(self, tick):
+    def __init__(self, tick=None, store=None, symbol_index=None):
+        """
+        Constructor
+        :param tick: a tuple type (symbol, datetime, bid, ask, bid_size, ask_size, last, volume)
+        :param store: TickStore object, read in place when tick is None
+        :param symbol_index: symbol index in the tick store
+        """
         self.type = EVENT_TICK
-        self.tick = tick
+        self._tick = tick
+        self.store = store
+        self.symbol_index = symbol_index
+
+    @property
+    def tick(self):
+        return self.store.tick(self.symbol_index) if self._tick is None else self._tick
+
+    @property
+    def symbol(self):
+        return self.store.symbol_list[self.symbol_index] if self._tick is None else self._tick[0]
+
+    @property
+    def datetime(self):
+        if self._tick is None:
+            return self.store.timestamp(self.symbol_index)
+        return self._tick[1]
+
+    @property
+    def minute(self):
+        """
+        Minutes since epoch of the tick, an integer key
+        """
+        if self._tick is None:
+            return self.store.minute[self.symbol_index][self.store.position[self.symbol_index]]
+        return pd.Timestamp(self._tick[1]).value // 60000000000
+
+    @property
+    def session(self):
+        """
+        Trading day of the tick in days since epoch, an integer key; calendar day for a tick tuple
+        """
+        if self._tick is None:
+            return self.store.session[self.symbol_index][self.store.position[self.symbol_index]]
+        return pd.Timestamp(self._tick[1]).value // 86400000000000
 
     def __str__(self):
         format_tick = 'Type: %s, Symbol: %s, Datetime: %s, Bid: %s, Ask: %s' % (
@@ -89,42 +136,69 @@ class SignalEvent(Event):
         self.strength = strength
 
 
+class TargetEvent(Event):
+    """
+    Target position event class
+    Procedure: Strategy object send target positions of a timestamp, and received by Portfolio object
+    """
+
+    def __init__(self, datetime, targets, strategy_id=1):
+        """
+        Constructor
+        :param datetime:
+        :param targets: target position array aligned with symbol list, or dictionary key: symbol value: position
+        :param strategy_id:
+        """
+        self.type = EVENT_TARGET
+        self.datetime = datetime
+        self.targets = targets
+        self.strategy_id = strategy_id
+
+
 class OrderEvent(Event):
     """
     Order event class
     Procedure: send a order to execution system
     """
+    order_ids = itertools.count(1)
 
-    def __init__(self, symbol, order_type, quantity, direction):
+    def __init__(self, symbol, order_type, quantity, direction, strategy_id=None, price=None, order_id=None):
         """
         Constructor
         :param symbol: symbol of future
-        :param order_type: 'MKT' or 'LMT'
+        :param order_type: 'MKT', 'LMT' or 'STP'
         :param quantity:
         :param direction: order direction, including BUY and SELL
+        :param strategy_id: strategy_id of the signal, or dictionary key: strategy_id value: signed quantity
+                            for a netted order
+        :param price: limit price of LMT order or trigger price of STP order
+        :param order_id: order_id, a new one by default
         """
         self.type = EVENT_ORDER
         self.symbol = symbol
         self.order_type = order_type
         self.quantity = quantity
         self.direction = direction
+        self.strategy_id = strategy_id
+        self.price = price
+        self.order_id = next(OrderEvent.order_ids) if order_id is None else order_id
 
     def print_order(self):
         """
         Print the value of order
         """
-        print("Order: Symbol=%s, Type=%s, Quantity=%s, Direction=%s" %
-              (self.symbol, self.order_type, self.quantity, self.direction))
+        print("Order: Id=%s, Symbol=%s, Type=%s, Quantity=%s, Direction=%s, Price=%s" %
+              (self.order_id, self.symbol, self.order_type, self.quantity, self.direction, self.price))
 
 
 class FillEvent(Event):
     """
     Fill event class
-    Fill or Kill (FOK order), fill all or cancel all
+    Market order is Fill or Kill (FOK order), fill all or cancel all; resting order may be filled in parts
     """
 
     def __init__(self, time_index, symbol, exchange, quantity, direction,
-                 fill_price, commission):
+                 fill_price, commission, strategy_id=None, order_id=None):
         """
         Constructor, order deal information
         :param time_index: the time index of the fill bar
@@ -134,6 +208,8 @@ class FillEvent(Event):
         :param direction: deal direction
         :param fill_price: deal price
         :param commission: fee
+        :param strategy_id: strategy_id of the order
+        :param order_id: order_id of the order
         """
         self.type = EVENT_FILL
         self.time_index = time_index
@@ -143,4 +219,126 @@ class FillEvent(Event):
         self.direction = direction
         self.fill_price = fill_price
         self.commission = commission
+        self.strategy_id = strategy_id
+        self.order_id = order_id
+
+
+class CancelEvent(Event):
+    """
+    Cancel event class
+    Procedure: the unfilled part of an order is cancelled or expired in execution system,
+    and sent back to Portfolio object
+    """
+
+    def __init__(self, symbol, quantity, direction, strategy_id=None, order_id=None, reason=None):
+        """
+        Constructor
+        :param symbol:
+        :param quantity: quantity removed from the order, negative when a replace adds quantity
+        :param direction: order direction, including BUY and SELL
+        :param strategy_id: strategy_id of the order
+        :param order_id: order_id of the order
+        :param reason: 'cancel', 'replace', 'expire', 'close' or a gateway reason
+        """
+        self.type = EVENT_CANCEL
+        self.symbol = symbol
+        self.quantity = quantity
+        self.direction = direction
+        self.strategy_id = strategy_id
+        self.order_id = order_id
+        self.reason = reason
+
 
+class BatchOrderEvent(Event):
+    """
+    Batch order event class
+    Procedure: send all the orders of a timestamp to execution system at once
+    """
+
+    def __init__(self, symbols, order_type, quantities, directions, strategy_ids=None, order_ids=None):
+        """
+        Constructor
+        :param symbols: symbol array
+        :param order_type: 'MKT', all the legs are market orders
+        :param quantities: quantity array
+        :param directions: order direction array, including BUY and SELL
+        :param strategy_ids: strategy_id array, see OrderEvent
+        :param order_ids: order_id list, a new one per leg by default
+        """
+        assert order_type == MARKET_ORDER, AssertionError('batch order type error!')
+        self.type = EVENT_BATCH_ORDER
+        self.symbols = symbols
+        self.order_type = order_type
+        self.quantities = quantities
+        self.directions = directions
+        self.strategy_ids = [None] * len(symbols) if strategy_ids is None else strategy_ids
+        self.order_ids = [next(OrderEvent.order_ids) for _ in symbols] if order_ids is None else order_ids
+
+    def __len__(self):
+        return len(self.symbols)
+
+    def orders(self):
+        """
+        Split into single order events, with the order_ids of the legs
+        :return: OrderEvent generator
+        """
+        for symbol, quantity, direction, strategy_id, order_id in zip(self.symbols, self.quantities, self.directions,
+                                                                      self.strategy_ids, self.order_ids):
+            yield OrderEvent(symbol, self.order_type, quantity, direction, strategy_id, order_id=order_id)
+
+    def print_order(self):
+        """
+        Print the value of orders
+        """
+        for order in self.orders():
+            order.print_order()
+
+
+class BatchFillEvent(Event):
+    """
+    Batch fill event class
+    Procedure: all the deals of a timestamp are sent back to Portfolio object at once, as arrays
+    """
+
+    def __init__(self, time_index, symbols, exchange, quantities, directions, fill_prices, commissions,
+                 strategy_ids=None, order_ids=None):
+        """
+        Constructor
+        :param time_index: bar datetime of the deals
+        :param symbols: symbol list
+        :param exchange:
+        :param quantities: quantity array
+        :param directions: deal direction array, including BUY and SELL
+        :param fill_prices: deal price array
+        :param commissions: commission array
+        :param strategy_ids: strategy_id list, see FillEvent
+        :param order_ids: order_id list
+        """
+        self.type = EVENT_BATCH_FILL
+        self.time_index = time_index
+        self.symbols = symbols
+        self.exchange = exchange
+        self.quantities = np.asarray(quantities)
+        self.directions = np.asarray(directions)
+        self.fill_prices = np.asarray(fill_prices, dtype=np.float64)
+        self.commissions = np.asarray(commissions, dtype=np.float64)
+        self.strategy_ids = [None] * len(symbols) if strategy_ids is None else strategy_ids
+        self.order_ids = [None] * len(symbols) if order_ids is None else order_ids
+
+    def __len__(self):
+        return len(self.symbols)
+
+    def signed_quantities(self):
+        """
+        Quantity array, positive for BUY and negative for SELL
+        """
+        return np.where(self.directions == ORDER_BUY, self.quantities, -self.quantities)
+
+    def fills(self):
+        """
+        Split into single fill events
+        :return: FillEvent generator
+        """
+        for j, symbol in enumerate(self.symbols):
+            yield FillEvent(self.time_index, symbol, self.exchange, self.quantities[j], self.directions[j],
+                            self.fill_prices[j], self.commissions[j], self.strategy_ids[j], self.order_ids[j])
@@ -9,13 +9,21 @@ Order Execution Simulation in Exchange
 @version: 0.1
 """
 
+import time
+import asyncio
+import threading
+import datetime as dt
+import numpy as np
 from abc import ABCMeta, abstractmethod
 
-from .constant import EVENT_ORDER
-from .event import FillEvent
-from .commission import ZeroCommission, PerMoneyCommission
-from .slippage import ZeroSlippage, FixedPercentSlippage
-from ..utils.symbol import get_exchange
+from .constant import EVENT_ORDER, EVENT_BATCH_ORDER, ORDER_BUY, MARKET_ORDER, LIMITED_ORDER, STOP_ORDER
+from .event import FillEvent, BatchFillEvent, CancelEvent
+from .cost import CostTable
+from .slippage import VolumeShareSlippage
+from .orderbook import Order, SimulatedExchange
+from .scheduler import TimedScheduler
+from .gateway import TCPTransport, MockExchangeServer
+from .gateway import MSG_ORDER, MSG_CANCEL, MSG_ACK, MSG_FILL, MSG_CANCELLED, MSG_REJECT
 
 
 class ExecutionHandler(object):
@@ -34,80 +42,187 @@ class ExecutionHandler(object):
         """
         raise NotImplementedError('function execute_order is nor implemented!')
 
+    def update_market(self):
+        """
+        Handle working orders after new market data arrives, called once per timestamp
+        """
+        pass
+
+    def flush_orders(self):
+        """
+        Wait for the orders in flight, called when the events queue of a timestamp is empty
+        :return: True if any order was in flight
+        """
+        return False
+
+    def close_orders(self):
+        """
+        Fill or cancel the orders still working when data ends, called before the positions are closed out,
+        so the close-out is filled at the last bar
+        """
+        pass
+
+    def close(self):
+        """
+        Release the resources when backtest is over
+        """
+        pass
+
 
 class SimulatedExecutionHandler(ExecutionHandler):
     """
     A simple simulated exchange
-    TODO: Consider partial fill, slippage and waiting time
+    Market orders are filled at the latest close, limit and stop orders rest in order books
+    and are matched against the following bars
+    TODO: Consider waiting time
     """
 
-    def __init__(self, bars, events, slippage_type='fixed', commission_type='default'):
+    def __init__(self, bars, events, slippage_type='fixed', commission_type='default', cost_config=None):
         """
         Constructor
         :param bars:
         :param events: Event queue
         :param slippage_type: slippage model, fixed or zero
         :param commission_type: commission model, zero or default
+        :param cost_config: commission and slippage parameters per exchange, product or symbol,
+                            default DEFAULT_COST_CONFIG
         """
         self.bars = bars
         self.events = events
         self.commission_type = commission_type
         self.slippage_type = slippage_type
 
+        # resolve cost models once, the fill path is only a table lookup
+        self.cost_table = CostTable(self.bars.symbol_list, cost_config, commission_type, slippage_type)
+        self.exchange = SimulatedExchange()
+        self.closing = False  # data is over, orders are filled at once
+
         self.commission = 0.0
 
-    def _trade_with_slippage(self, event):
+    def execute_order(self, event):
         """
-        Consider the fill price with slippage
-        :param event: order event
-        :return:
+        Simple Execution: from Order object to Fill object
+        :param event: event object containing order information
         """
-        order_price = self.bars.get_latest_bars(event.symbol)[0][5]
-        if self.slippage_type == 'zero':
-            return ZeroSlippage().get_trade_price(order_price)
-        elif self.slippage_type == 'fixed':
-            fixed_slippage = FixedPercentSlippage(percent=0.1)
-            return fixed_slippage.get_trade_price(order_price, event.direction)
-        else:
-            return order_price
+        if event.type == EVENT_ORDER:
+            bar = self.bars.get_latest_bars(event.symbol)[0]
+            sign = 1 if event.direction == ORDER_BUY else -1
+            if event.order_type == STOP_ORDER or (
+                    event.order_type == LIMITED_ORDER and (event.price - bar[5]) * sign < 0):
+                self.exchange.submit(Order(event.order_id, event.symbol, event.order_type, event.direction,
+                                           event.quantity, event.price, event.strategy_id))
+                return
 
-    def _get_commission(self, event):
+            self.fill_price, self.commission = self.cost_table.fill(event.symbol, bar[5], event.quantity, sign)
+            if event.order_type == LIMITED_ORDER:
+                # marketable limit order, never filled beyond the limit price
+                self.fill_price = min(self.fill_price, event.price) if sign > 0 else max(self.fill_price, event.price)
+                self.commission = self.cost_table.commission(event.symbol, self.fill_price, event.quantity)
+            fill_event = FillEvent(bar[1], event.symbol, 'SimulatedExchange',
+                                   event.quantity, event.direction, self.fill_price,
+                                   self.commission, event.strategy_id, event.order_id)
+            self._send_fill(fill_event)
+
+        elif event.type == EVENT_BATCH_ORDER:
+            self.execute_batch_order(event)
+
+    def execute_batch_order(self, event, at_open=False):
         """
-        Calculate the commission of future
-        :param event: order event
-        :return: full commission
+        Batch Execution: fill all the orders of a batch order in one call
+        :param event: BatchOrderEvent object
+        :param at_open: fill at the open of the latest bar instead of the close
         """
-        self.fill_price = self._trade_with_slippage(event)
-        full_cost = self.fill_price * event.quantity
+        bars = [self.bars.get_latest_bars(s)[0] for s in event.symbols]
+        index = np.array([self.cost_table.symbol_index[s] for s in event.symbols])
+        quantities = np.asarray(event.quantities)
+        fill_prices, commissions = self.cost_table.fill_batch(
+            index, np.array([bar[2] if at_open else bar[5] for bar in bars]), quantities,
+            np.where(np.asarray(event.directions) == ORDER_BUY, 1, -1))
 
-        if self.commission_type == 'zero':
-            commission = ZeroCommission().get_commission()
+        self._send_fill(BatchFillEvent(bars[0][1], event.symbols, 'SimulatedExchange', quantities,
+                                       event.directions, fill_prices, commissions, event.strategy_ids,
+                                       event.order_ids))
 
-        elif self.commission_type == 'default':
-            if event.symbol.startswith('I'):  # Index Future
-                commission = PerMoneyCommission(rate=3.0e-5).get_commission(full_cost)
-            elif get_exchange(event.symbol) in ('SQ.EX', 'DS.EX', 'ZS.EX'):  # Commodity Future
-                commission = PerMoneyCommission(rate=1.5e-4).get_commission(full_cost)
-            else:
-                commission = 0.0
-        else:
-            commission = 0.0
+    def update_market(self):
+        """
+        Match resting orders of every symbol against the latest bar
+        """
+        for symbol, book in self.exchange.books.items():
+            if len(book) == 0:
+                continue
+            bar = self.bars.get_latest_bars(symbol)[0]
+            for order, quantity, price in self.exchange.match_bar(symbol, bar[2], bar[3], bar[4],
+                                                                  self._book_volume(bar)):
+                if order.order_type == STOP_ORDER:
+                    price, commission = self.cost_table.fill(symbol, price, quantity,
+                                                             1 if order.direction == ORDER_BUY else -1)
+                else:
+                    commission = self.cost_table.commission(symbol, price, quantity)
+                self._send_fill(FillEvent(bar[1], symbol, 'SimulatedExchange', quantity, order.direction,
+                                          price, commission, order.strategy_id, order.order_id))
 
-        return commission
+    def _send_fill(self, fill):
+        """
+        Send a FillEvent back to Events queue
+        :param fill: FillEvent or BatchFillEvent object
+        """
+        self.events.put(fill)
 
-    def execute_order(self, event):
+    def _send_cancel(self, symbol, quantity, direction, strategy_id, order_id, reason):
         """
-        Simple Execution: from Order object to Fill object
-        :param event: event object containing order information
+        Send a CancelEvent of the unfilled part of an order back to Events queue
         """
-        if event.type == EVENT_ORDER:
-            self.commission = self._get_commission(event)
-            assert isinstance(self.commission, float), 'Commission should be float!'
-            time_index = self.bars.get_latest_bars(event.symbol)[0][1]
-            fill_event = FillEvent(time_index, event.symbol, 'SimulatedExchange',
-                                   event.quantity, event.direction, self.fill_price,
-                                   self.commission)
-            self.events.put(fill_event)
+        self.events.put(CancelEvent(symbol, quantity, direction, strategy_id, order_id, reason))
+
+    def _book_volume(self, bar):
+        """
+        Max volume of resting orders to fill per side in a bar
+        :param bar: the latest bar
+        """
+        return float('inf')
+
+    def cancel_order(self, order_id):
+        """
+        Cancel a resting order
+        :param order_id: order_id of OrderEvent
+        :return: cancelled Order object, None if not active
+        """
+        return self._cancel_active(order_id, 'cancel')
+
+    def _cancel_active(self, order_id, reason):
+        """
+        Cancel an active order and report its unfilled part
+        """
+        order = self.exchange.cancel(order_id)
+        if order is not None:
+            self._send_cancel(order.symbol, order.remaining, order.direction, order.strategy_id, order_id, reason)
+        return order
+
+    def close_orders(self):
+        """
+        Cancel the resting orders when data ends, later market orders are filled at the last close
+        """
+        self.closing = True
+        for order_id in list(self.exchange.order_symbols):
+            self._cancel_active(order_id, 'close')
+
+    def replace_order(self, order_id, price=None, quantity=None):
+        """
+        Replace a resting order with new price or quantity
+        :param order_id: order_id of OrderEvent
+        :param price: new price, None for unchanged
+        :param quantity: new total quantity, None for unchanged
+        :return: the active Order object, None if not active
+        """
+        order = self.exchange.order(order_id)
+        if order is None:
+            return None
+        remaining = order.remaining
+        new_order = self.exchange.replace(order_id, price, quantity)
+        reduced = remaining - (0 if new_order is None else new_order.remaining)
+        if reduced != 0:
+            self._send_cancel(order.symbol, reduced, order.direction, order.strategy_id, order_id, 'replace')
+        return new_order
 
 
 class CTPExecutionHandler(ExecutionHandler):
@@ -128,3 +243,679 @@ class CTPExecutionHandler(ExecutionHandler):
         :return:
         """
         pass
+
+
+class VolumeShareExecutionHandler(SimulatedExecutionHandler):
+    """
+    A simulated exchange with volume constrained partial fills
+    Market orders become working orders, filled from the next bar on with at most a share of bar volume per symbol,
+    the remainder is carried to later bars; price impact follows VolumeShareSlippage.
+    All working orders are matched in one pass of array operations per bar, orders still working when data
+    ends are cancelled and the close-out is filled at the last close
+    """
+
+    def __init__(self, bars, events, slippage_type='fixed', commission_type='default', cost_config=None,
+                 volume_limit=0.025, price_impact=0.1):
+        """
+        Constructor
+        :param bars:
+        :param events: Event queue
+        :param slippage_type: slippage model of stop orders, fixed or zero
+        :param commission_type: commission model, zero or default
+        :param cost_config: commission and slippage parameters, see SimulatedExecutionHandler
+        :param volume_limit: max share of bar volume to fill per symbol
+        :param price_impact: price impact coefficient
+        """
+        super(VolumeShareExecutionHandler, self).__init__(bars, events, slippage_type, commission_type, cost_config)
+        self.slippage = VolumeShareSlippage(volume_limit, price_impact)
+
+        # working orders in arrival order, as parallel arrays
+        self.symbol_index = self.cost_table.symbol_index
+        self.work_symbol = np.zeros(0, dtype=np.int64)
+        self.work_remaining = np.zeros(0, dtype=np.int64)
+        self.work_direction = np.zeros(0, dtype='<U4')
+        self.work_order_id = np.zeros(0, dtype=np.int64)
+        self.work_strategy_id = np.zeros(0, dtype=object)
+
+    def _add_working_orders(self, symbols, quantities, directions, order_ids, strategy_ids):
+        """
+        Append new working orders
+        """
+        strategy_id = np.empty(len(symbols), dtype=object)
+        strategy_id[:] = strategy_ids
+        self.work_symbol = np.concatenate([self.work_symbol, [self.symbol_index[s] for s in symbols]])
+        self.work_remaining = np.concatenate([self.work_remaining, quantities])
+        self.work_direction = np.concatenate([self.work_direction, directions])
+        self.work_order_id = np.concatenate([self.work_order_id, order_ids])
+        self.work_strategy_id = np.concatenate([self.work_strategy_id, strategy_id])
+
+    def _keep_working_orders(self, keep):
+        """
+        Keep working orders by boolean mask
+        """
+        self.work_symbol = self.work_symbol[keep]
+        self.work_remaining = self.work_remaining[keep]
+        self.work_direction = self.work_direction[keep]
+        self.work_order_id = self.work_order_id[keep]
+        self.work_strategy_id = self.work_strategy_id[keep]
+
+    def execute_order(self, event):
+        """
+        Market order becomes a working order, others are handled as SimulatedExecutionHandler
+        :param event: event object containing order information
+        """
+        if event.type == EVENT_ORDER and event.order_type == MARKET_ORDER and not self.closing:
+            self._add_working_orders([event.symbol], [event.quantity], [event.direction], [event.order_id],
+                                     [event.strategy_id])
+        else:
+            super(VolumeShareExecutionHandler, self).execute_order(event)
+
+    def execute_batch_order(self, event, at_open=False):
+        """
+        All the orders of a batch order become working orders
+        :param event: BatchOrderEvent object
+        """
+        if self.closing:
+            super(VolumeShareExecutionHandler, self).execute_batch_order(event, at_open)
+            return
+        self._add_working_orders(event.symbols, np.asarray(event.quantities), np.asarray(event.directions),
+                                 event.order_ids, event.strategy_ids)
+
+    def update_market(self):
+        """
+        Fill working orders with the volume of the latest bar, first in first out per symbol
+        """
+        if len(self.work_symbol) > 0:
+            bars = {i: self.bars.get_latest_bars(self.bars.symbol_list[i])[0] for i in np.unique(self.work_symbol)}
+            n = len(self.bars.symbol_list)
+            volume = np.zeros(n)
+            close = np.zeros(n)
+            for i, bar in bars.items():
+                close[i], volume[i] = bar[5], bar[6]
+
+            # volume taken by the orders ahead in the same symbol
+            order = np.argsort(self.work_symbol, kind='stable')
+            symbol = self.work_symbol[order]
+            remaining = self.work_remaining[order]
+            ahead = np.cumsum(remaining) - remaining
+            first = np.r_[True, symbol[1:] != symbol[:-1]]
+            ahead -= ahead[np.maximum.accumulate(np.where(first, np.arange(len(symbol)), 0))]
+
+            filled = np.zeros_like(self.work_remaining)
+            filled[order] = np.clip(self.slippage.get_fill_limit(volume)[symbol] - ahead, 0, remaining)
+
+            if filled.any():
+                share = np.bincount(self.work_symbol, filled, minlength=n) / np.where(volume > 0, volume, 1.0)
+                legs = np.flatnonzero(filled)
+                index = self.work_symbol[legs]
+                prices = self.slippage.get_trade_price(close[index], self.work_direction[legs], share[index])
+                commissions = self.cost_table.commission_batch(index, prices, filled[legs])
+
+                self._send_fill(BatchFillEvent(bars[index[0]][1], [self.bars.symbol_list[i] for i in index],
+                                               'SimulatedExchange', filled[legs], self.work_direction[legs], prices,
+                                               commissions, self.work_strategy_id[legs].tolist(),
+                                               self.work_order_id[legs].tolist()))
+
+                self.work_remaining = self.work_remaining - filled
+                self._keep_working_orders(self.work_remaining > 0)
+
+        # resting limit and stop orders
+        super(VolumeShareExecutionHandler, self).update_market()
+
+    def _book_volume(self, bar):
+        return float(self.slippage.get_fill_limit(bar[6]))
+
+    def cancel_order(self, order_id):
+        """
+        Cancel a working market order or a resting order
+        :param order_id: order_id of OrderEvent
+        :return: True for working market order, cancelled Order object for resting order, None if not active
+        """
+        return self._cancel_active(order_id, 'cancel')
+
+    def _cancel_working(self, cancel, reason):
+        """
+        Cancel working market orders by boolean mask and report them
+        """
+        for j in np.flatnonzero(cancel):
+            self._send_cancel(self.bars.symbol_list[self.work_symbol[j]], int(self.work_remaining[j]),
+                              self.work_direction[j], self.work_strategy_id[j], int(self.work_order_id[j]), reason)
+        self._keep_working_orders(~cancel)
+
+    def _cancel_active(self, order_id, reason):
+        cancel = self.work_order_id == order_id
+        if cancel.any():
+            self._cancel_working(cancel, reason)
+            return True
+        return super(VolumeShareExecutionHandler, self)._cancel_active(order_id, reason)
+
+    def close_orders(self):
+        """
+        Cancel the working and resting orders when data ends, later market orders are filled at the last close
+        """
+        self._cancel_working(np.ones(len(self.work_order_id), dtype=bool), 'close')
+        super(VolumeShareExecutionHandler, self).close_orders()
+
+
+def _as_timedelta(value):
+    """
+    Latency in seconds or timedelta to timedelta
+    """
+    return value if isinstance(value, dt.timedelta) else dt.timedelta(seconds=value)
+
+
+class LatencyExecutionHandler(SimulatedExecutionHandler):
+    """
+    A simulated exchange with order latency
+    Orders, cancels and fill acknowledgements travel on a timeline merged with the market data clock: an action
+    is scheduled at its due time and released at the first bar at or after it, so pending orders are never
+    polled bar by bar. An arrived market order is filled at the open of that bar, an arrived limit or stop order
+    joins the order book behind the resting orders and is matched from that bar on.
+    When data ends the actions left are released at once: orders still on the way are cancelled, and the
+    close-out is filled at the last close
+    """
+
+    def __init__(self, bars, events, slippage_type='fixed', commission_type='default', cost_config=None,
+                 submit_latency=0.0, ack_latency=0.0, cancel_latency=None, order_timeout=None):
+        """
+        Constructor
+        :param bars:
+        :param events: Event queue
+        :param slippage_type: slippage model, fixed or zero
+        :param commission_type: commission model, zero or default
+        :param cost_config: commission and slippage parameters, see SimulatedExecutionHandler
+        :param submit_latency: seconds or timedelta from order sending to exchange arrival
+        :param ack_latency: seconds or timedelta from a deal to its FillEvent
+        :param cancel_latency: seconds or timedelta from cancel/replace sending to exchange arrival,
+                               default submit_latency
+        :param order_timeout: seconds or timedelta a limit or stop order rests before cancelled, None for no timeout
+        """
+        super(LatencyExecutionHandler, self).__init__(bars, events, slippage_type, commission_type, cost_config)
+        self.submit_latency = _as_timedelta(submit_latency)
+        self.ack_latency = _as_timedelta(ack_latency)
+        self.cancel_latency = self.submit_latency if cancel_latency is None else _as_timedelta(cancel_latency)
+        self.order_timeout = None if order_timeout is None else _as_timedelta(order_timeout)
+
+        self.scheduler = TimedScheduler()
+        self.in_flight = {}  # key: order_id value: OrderEvent sent but not arrived
+        self.expired = []  # Order objects cancelled by timeout, also reported as CancelEvent
+
+    def _market_time(self):
+        """
+        Datetime of the latest bar, all the symbols share one clock
+        """
+        return self.bars.get_latest_bar_datetime(self.bars.symbol_list[0])
+
+    def execute_order(self, event):
+        """
+        Send an order or a batch order to the exchange
+        :param event: event object containing order information
+        """
+        if self.closing:
+            super(LatencyExecutionHandler, self).execute_order(event)
+            return
+        arrival = self._market_time() + self.submit_latency
+        if event.type == EVENT_ORDER:
+            self.in_flight[event.order_id] = event
+        self.scheduler.schedule(arrival, self._arrive, event, arrival)
+
+    def _arrive(self, event, arrival):
+        """
+        Order arrives at the exchange
+        """
+        if event.type == EVENT_BATCH_ORDER:
+            if self.closing:
+                for order in event.orders():
+                    self._send_cancel(order.symbol, order.quantity, order.direction, order.strategy_id,
+                                      order.order_id, 'close')
+            else:
+                self.execute_batch_order(event, at_open=True)
+            return
+        if self.in_flight.pop(event.order_id, None) is None:
+            return  # cancelled on the way
+        if self.closing:
+            # data is over before the order arrives
+            self._send_cancel(event.symbol, event.quantity, event.direction, event.strategy_id, event.order_id,
+                              'close')
+            return
+
+        if event.order_type == MARKET_ORDER:
+            bar = self.bars.get_latest_bars(event.symbol)[0]
+            price, commission = self.cost_table.fill(event.symbol, bar[2], event.quantity,
+                                                     1 if event.direction == ORDER_BUY else -1)
+            self._send_fill(FillEvent(bar[1], event.symbol, 'SimulatedExchange', event.quantity, event.direction,
+                                      price, commission, event.strategy_id, event.order_id))
+        else:
+            self.exchange.submit(Order(event.order_id, event.symbol, event.order_type, event.direction,
+                                       event.quantity, event.price, event.strategy_id))
+            if self.order_timeout is not None:
+                self.scheduler.schedule(arrival + self.order_timeout, self._expire, event.order_id)
+
+    def _expire(self, order_id):
+        """
+        Cancel an order still resting at timeout
+        """
+        order = self._cancel_active(order_id, 'expire')
+        if order is not None:
+            self.expired.append(order)
+
+    def _send_fill(self, fill):
+        if self.ack_latency and not self.closing:
+            self.scheduler.schedule(fill.time_index + self.ack_latency, self.events.put, fill)
+        else:
+            self.events.put(fill)
+
+    def _send_cancel(self, symbol, quantity, direction, strategy_id, order_id, reason):
+        cancel = CancelEvent(symbol, quantity, direction, strategy_id, order_id, reason)
+        if self.ack_latency and not self.closing:
+            self.scheduler.schedule(self._market_time() + self.ack_latency, self.events.put, cancel)
+        else:
+            self.events.put(cancel)
+
+    def update_market(self):
+        """
+        Release the actions due at the latest bar in timestamp order, then match the order books
+        """
+        self.scheduler.run_until(self._market_time())
+        super(LatencyExecutionHandler, self).update_market()
+
+    def cancel_order(self, order_id):
+        """
+        Send a cancel request, it takes effect when arriving at the exchange unless the order is filled by then
+        :param order_id: order_id of OrderEvent
+        :return: arrival time of the cancel request
+        """
+        arrival = self._market_time() + self.cancel_latency
+        self.scheduler.schedule(arrival, self._cancel, order_id)
+        return arrival
+
+    def _cancel(self, order_id):
+        event = self.in_flight.pop(order_id, None)
+        if event is None:
+            self._cancel_active(order_id, 'cancel')
+        else:
+            self._send_cancel(event.symbol, event.quantity, event.direction, event.strategy_id, order_id, 'cancel')
+
+    def replace_order(self, order_id, price=None, quantity=None):
+        """
+        Send a replace request, see SimulatedExecutionHandler.replace_order()
+        :return: arrival time of the replace request
+        """
+        arrival = self._market_time() + self.cancel_latency
+        self.scheduler.schedule(arrival, self._replace, order_id, price, quantity)
+        return arrival
+
+    def _replace(self, order_id, price, quantity):
+        event = self.in_flight.get(order_id)
+        if event is None:
+            super(LatencyExecutionHandler, self).replace_order(order_id, price, quantity)
+            return
+        event.price = event.price if price is None else price
+        quantity = event.quantity if quantity is None else quantity
+        if quantity != event.quantity:
+            self._send_cancel(event.symbol, event.quantity - quantity, event.direction, event.strategy_id, order_id,
+                              'replace')
+            event.quantity = quantity
+        if quantity <= 0:
+            self.in_flight.pop(order_id)
+
+    def close_orders(self):
+        """
+        Release the actions left when data ends: acknowledgements are sent, orders on the way are cancelled,
+        then resting orders are cancelled
+        """
+        self.closing = True
+        self.scheduler.run_all()
+        super(LatencyExecutionHandler, self).close_orders()
+
+
+class TickExecutionHandler(SimulatedExecutionHandler):
+    """
+    A simulated exchange driven by quotes, used with CSVTickDataHandler
+    Every order rests in the order book and is matched against the quote: market orders at the opposite best
+    quote, limit orders when the quote crosses the limit, stop orders when the quote touches the stop.
+    A quote is shared by all the orders of a tick up to its size, the remainder waits for the next quotes;
+    after data ends the close-out market orders are filled in full at the last quotes.
+    Quotes are read from the tick store in place, slippage is given by the quotes
+    """
+
+    def __init__(self, bars, events, slippage_type='zero', commission_type='default', cost_config=None):
+        """
+        Constructor
+        :param bars: CSVTickDataHandler object
+        :param events: Event queue
+        :param slippage_type: unused, kept for the Backtest interface
+        :param commission_type: commission model, zero or default
+        :param cost_config: commission parameters, see SimulatedExecutionHandler
+        """
+        super(TickExecutionHandler, self).__init__(bars, events, slippage_type, commission_type, cost_config)
+        self.store = bars.store
+        n = len(self.bars.symbol_list)
+        self.quote_row = np.full(n, -1, dtype=np.int64)
+        self.bid_taken = np.zeros(n)  # quantity taken from the latest quote
+        self.ask_taken = np.zeros(n)
+
+    def execute_order(self, event):
+        """
+        Submit an order, and match it against the latest quote
+        :param event: event object containing order information
+        """
+        if event.type == EVENT_BATCH_ORDER:
+            for order in event.orders():
+                self.execute_order(order)
+            return
+
+        if self.closing and event.order_type == MARKET_ORDER:
+            self._fill_at_quote(event)
+            return
+
+        price = event.price
+        if event.order_type == MARKET_ORDER:
+            price = float('inf') if event.direction == ORDER_BUY else float('-inf')
+        self.exchange.submit(Order(event.order_id, event.symbol, event.order_type, event.direction,
+                                   event.quantity, price, event.strategy_id))
+        self._match(self.cost_table.symbol_index[event.symbol])
+
+    def _fill_at_quote(self, event):
+        """
+        Fill a market order in full at the latest opposite best quote, no more quotes arrive after data ends
+        :param event: OrderEvent object
+        """
+        i = self.cost_table.symbol_index[event.symbol]
+        row = self.store.position[i]
+        price = self.store.ask[i][row] if event.direction == ORDER_BUY else self.store.bid[i][row]
+        commission = self.cost_table.commission(event.symbol, price, event.quantity)
+        self._send_fill(FillEvent(self.store.timestamp(i, row), event.symbol, 'SimulatedExchange', event.quantity,
+                                  event.direction, price, commission, event.strategy_id, event.order_id))
+
+    def update_market(self):
+        """
+        Match the order book of the symbol of the latest tick
+        """
+        i = self.bars.latest_symbol_index
+        if i is not None:
+            self._match(i)
+
+    def _match(self, i):
+        """
+        Match the order book of a symbol against its latest quote
+        :param i: symbol index
+        """
+        symbol = self.bars.symbol_list[i]
+        book = self.exchange.books.get(symbol)
+        if book is None or len(book) == 0:
+            return
+
+        store = self.store
+        row = store.position[i]
+        if row != self.quote_row[i]:
+            self.quote_row[i] = row
+            self.bid_taken[i] = self.ask_taken[i] = 0.0
+
+        fills = self.exchange.match_quote(symbol, store.bid[i][row], store.ask[i][row],
+                                          store.bid_size[i][row] - self.bid_taken[i],
+                                          store.ask_size[i][row] - self.ask_taken[i])
+        if not fills:
+            return
+        timestamp = store.timestamp(i, row)
+        for order, quantity, price in fills:
+            if order.direction == ORDER_BUY:
+                self.ask_taken[i] += quantity
+            else:
+                self.bid_taken[i] += quantity
+            commission = self.cost_table.commission(symbol, price, quantity)
+            self._send_fill(FillEvent(timestamp, symbol, 'SimulatedExchange', quantity, order.direction,
+                                      price, commission, order.strategy_id, order.order_id))
+
+
+class AsyncExecutionHandler(ExecutionHandler):
+    """
+    Asynchronous order routing to an exchange gateway
+    An asyncio event loop in a background thread keeps a persistent connection, orders are pipelined without
+    waiting for the previous ack, and the orders in flight are resent after reconnection.
+    Without a transport, a bundled MockExchangeServer is started on a local port
+    """
+
+    def __init__(self, bars, events, slippage_type='fixed', commission_type='default', cost_config=None,
+                 transport=None, server_params=None, synchronous=True, timeout=10.0,
+                 reconnect_delay=0.1, max_reconnects=10):
+        """
+        Constructor
+        :param bars:
+        :param events: Event queue
+        :param slippage_type: slippage model, fixed or zero
+        :param commission_type: commission model, zero or default
+        :param cost_config: commission and slippage parameters, see SimulatedExecutionHandler
+        :param transport: Transport object, None for the bundled mock exchange
+        :param server_params: dictionary, parameters of MockExchangeServer
+        :param synchronous: wait for the orders in flight before a timestamp ends
+        :param timeout: seconds to wait for the orders in flight
+        :param reconnect_delay: seconds between reconnections
+        :param max_reconnects: max reconnections in a row
+        """
+        self.bars = bars
+        self.events = events
+        self.cost_table = CostTable(self.bars.symbol_list, cost_config, commission_type, slippage_type)
+        self.synchronous = synchronous
+        self.timeout = timeout
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnects = max_reconnects
+
+        # key: order_id value: [message, OrderEvent, bar datetime, send time, acked, filled quantity, fill ids]
+        self.in_flight = {}
+        self.cancelling = set()  # order_id of the cancel requests sent
+        self.condition = threading.Condition()
+        self.sent = 0
+        self.filled = 0
+        self.reconnects = 0
+        self.ack_latency = []
+        self.fill_latency = []
+        self.first_send = None
+        self.last_fill = None
+
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.thread.start()
+
+        self.server = None
+        if transport is None:
+            self.server = MockExchangeServer(**(server_params or {}))
+            self._call(self.server.start())
+            transport = TCPTransport(self.server.host, self.server.port)
+        self.transport = transport
+
+        self.closing = False
+        self.connected = self._call(self._make_event())
+        self.connection = asyncio.run_coroutine_threadsafe(self._keep_connection(), self.loop)
+
+    def _call(self, coroutine):
+        """
+        Run a coroutine in the event loop and wait for the result
+        """
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop).result(self.timeout)
+
+    @staticmethod
+    async def _make_event():
+        return asyncio.Event()
+
+    async def _keep_connection(self):
+        """
+        Connect, resend the orders in flight, read until disconnected, and reconnect
+        """
+        failures = 0
+        while not self.closing:
+            try:
+                await self.transport.connect()
+                self.connected.set()
+                with self.condition:
+                    messages = [entry[0] for _, entry in sorted(self.in_flight.items())]
+                for message in messages:
+                    await self.transport.send(message)
+                failures = 0
+                while True:
+                    message = await self.transport.receive()
+                    if message is None:
+                        break
+                    self._on_message(message)
+            except (OSError, ConnectionError):
+                failures += 1
+            self.connected.clear()
+            await self.transport.close()
+            if self.closing or failures > self.max_reconnects:
+                break
+            self.reconnects += 1
+            await asyncio.sleep(self.reconnect_delay)
+
+    async def _send(self, message):
+        await self.connected.wait()
+        try:
+            await self.transport.send(message)
+        except (OSError, ConnectionError):
+            pass  # resent after reconnection
+
+    def _on_message(self, message):
+        """
+        Handle a response of the gateway, duplicated responses after resending are ignored
+        An order leaves in flight when fully filled, cancelled or rejected, partial fills keep it in flight with
+        the rest; a rejected cancel request keeps the order
+        """
+        now = time.perf_counter()
+        order_id = message['order_id']
+        with self.condition:
+            if message['type'] == MSG_REJECT and order_id in self.cancelling:
+                # too late to cancel, the order is filled or the fill is on the way
+                self.cancelling.discard(order_id)
+                return
+            entry = self.in_flight.get(order_id)
+            if entry is None:
+                return
+            event = entry[1]
+            if message['type'] == MSG_ACK:
+                if not entry[4]:
+                    entry[4] = True
+                    self.ack_latency.append(now - entry[3])
+                return
+
+            if message['type'] == MSG_FILL:
+                fill_id = message.get('fill_id')
+                if fill_id is not None:
+                    if fill_id in entry[6]:
+                        return  # a fill sent again after resending
+                    entry[6].add(fill_id)
+                entry[5] += message['quantity']
+                if entry[5] >= event.quantity:
+                    del self.in_flight[order_id]
+                    self.cancelling.discard(order_id)
+                    self.fill_latency.append(now - entry[3])
+                sign = 1 if event.direction == ORDER_BUY else -1
+                if event.order_type == MARKET_ORDER:
+                    price, commission = self.cost_table.fill(event.symbol, message['price'], message['quantity'],
+                                                             sign)
+                else:
+                    price = message['price']
+                    commission = self.cost_table.commission(event.symbol, price, message['quantity'])
+                self.events.put(FillEvent(entry[2], event.symbol, 'Gateway', message['quantity'],
+                                          event.direction, price, commission, event.strategy_id, event.order_id))
+                self.filled += 1
+                self.last_fill = now
+
+            elif message['type'] in (MSG_CANCELLED, MSG_REJECT):
+                del self.in_flight[order_id]
+                self.cancelling.discard(order_id)
+                reason = 'cancel' if message['type'] == MSG_CANCELLED else message.get('reason', MSG_REJECT)
+                self.events.put(CancelEvent(event.symbol, event.quantity - entry[5], event.direction,
+                                            event.strategy_id, order_id, reason))
+            else:
+                return
+            self.condition.notify_all()
+
+    def execute_order(self, event):
+        """
+        Send an order to the gateway without waiting for the response
+        :param event: event object containing order information
+        """
+        if event.type == EVENT_BATCH_ORDER:
+            for order in event.orders():
+                self.execute_order(order)
+            return
+
+        bar = self.bars.get_latest_bars(event.symbol)[0]
+        message = {'type': MSG_ORDER, 'order_id': event.order_id, 'symbol': event.symbol,
+                   'order_type': event.order_type, 'direction': event.direction, 'quantity': int(event.quantity),
+                   'price': float(bar[5] if event.price is None else event.price)}
+        now = time.perf_counter()
+        with self.condition:
+            self.in_flight[event.order_id] = [message, event, bar[1], now, False, 0, set()]
+        if self.first_send is None:
+            self.first_send = now
+        self.sent += 1
+        asyncio.run_coroutine_threadsafe(self._send(message), self.loop)
+
+    def cancel_order(self, order_id):
+        """
+        Send a cancel request, the order is reported as CancelEvent when cancelled
+        :param order_id: order_id of OrderEvent
+        """
+        with self.condition:
+            self.cancelling.add(order_id)
+        asyncio.run_coroutine_threadsafe(self._send({'type': MSG_CANCEL, 'order_id': order_id}), self.loop)
+
+    def wait_all(self, timeout=None):
+        """
+        Wait until no order is in flight
+        :param timeout: seconds, None for the handler timeout
+        :return: True if no order is in flight
+        """
+        with self.condition:
+            return self.condition.wait_for(lambda: not self.in_flight, self.timeout if timeout is None else timeout)
+
+    def flush_orders(self):
+        if not self.synchronous or not self.in_flight:
+            return False
+        if not self.wait_all():
+            raise RuntimeError('%d orders in flight after %s seconds' % (len(self.in_flight), self.timeout))
+        return True
+
+    def close_orders(self):
+        """
+        Cancel the orders in flight when data ends and wait for the responses, the close-out is waited for
+        """
+        with self.condition:
+            order_ids = list(self.in_flight)
+        for order_id in order_ids:
+            self.cancel_order(order_id)
+        self.wait_all()
+        self.synchronous = True
+
+    def stats(self):
+        """
+        Throughput and latency of the order path
+        :return: dictionary, latency in milliseconds
+        """
+        result = {'sent': self.sent, 'filled': self.filled, 'in_flight': len(self.in_flight),
+                  'reconnects': self.reconnects, 'throughput': np.nan}
+        if self.filled and self.last_fill > self.first_send:
+            result['throughput'] = self.filled / (self.last_fill - self.first_send)
+        for name, latency in (('ack', self.ack_latency), ('fill', self.fill_latency)):
+            latency = np.array(latency) * 1e3 if latency else np.full(1, np.nan)
+            result[name + '_mean'] = latency.mean()
+            result[name + '_p50'] = np.percentile(latency, 50)
+            result[name + '_p99'] = np.percentile(latency, 99)
+        return result
+
+    def close(self):
+        """
+        Close the connection and the bundled mock exchange, and stop the event loop
+        """
+        if self.closing:
+            return
+        self.closing = True
+        self._call(self.transport.close())
+        try:
+            self.connection.result(self.timeout)
+        except Exception:
+            self.connection.cancel()
+        if self.server is not None:
+            self._call(self.server.stop())
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(self.timeout)
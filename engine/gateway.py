@@ -0,0 +1,192 @@
+# -*- coding: utf-8 -*-
+
+"""
+Exchange Gateway
+Order/ack/fill protocol over an asynchronous transport, and a local mock exchange server
+Messages are JSON objects, one per line:
+    order:     {'type': 'order', 'order_id', 'symbol', 'order_type', 'direction', 'quantity', 'price'}
+    cancel:    {'type': 'cancel', 'order_id'}
+    ack:       {'type': 'ack', 'order_id'}
+    fill:      {'type': 'fill', 'order_id', 'fill_id', 'symbol', 'direction', 'quantity', 'price'}
+    cancelled: {'type': 'cancelled', 'order_id'}
+    reject:    {'type': 'reject', 'order_id', 'reason'}
+
+@author: Jesse J. Hsu
+@email: jessexu117@outlook.com
+@version: 0.1
+"""
+
+import json
+import asyncio
+from abc import ABCMeta, abstractmethod
+
+MSG_ORDER = 'order'
+MSG_CANCEL = 'cancel'
+MSG_ACK = 'ack'
+MSG_FILL = 'fill'
+MSG_CANCELLED = 'cancelled'
+MSG_REJECT = 'reject'
+
+
+def encode(message):
+    return (json.dumps(message) + '\n').encode()
+
+
+def decode(line):
+    return json.loads(line.decode())
+
+
+class Transport(object):
+    """
+    Transport abstract base class, a persistent connection to an exchange gateway
+    A live trading API is plugged into the execution handler by implementing this interface
+    """
+    __metaclass__ = ABCMeta
+
+    @abstractmethod
+    async def connect(self):
+        raise NotImplementedError('function connect() is not implemented!')
+
+    @abstractmethod
+    async def send(self, message):
+        """
+        Send a message
+        :param message: dictionary
+        """
+        raise NotImplementedError('function send() is not implemented!')
+
+    @abstractmethod
+    async def receive(self):
+        """
+        Receive a message
+        :return: dictionary, None if the connection is closed
+        """
+        raise NotImplementedError('function receive() is not implemented!')
+
+    async def close(self):
+        pass
+
+
+class TCPTransport(Transport):
+    """
+    Newline delimited JSON over TCP
+    """
+
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self.reader = None
+        self.writer = None
+
+    async def connect(self):
+        self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+
+    async def send(self, message):
+        self.writer.write(encode(message))
+        await self.writer.drain()
+
+    async def receive(self):
+        line = await self.reader.readline()
+        return decode(line) if line else None
+
+    async def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            try:
+                await self.writer.wait_closed()
+            except (OSError, ConnectionError):
+                pass
+
+
+class MockExchangeServer(object):
+    """
+    A local mock exchange
+    Every order is acknowledged and then fully filled at its price after the latency, in fills of at most
+    fill_size, orders are processed concurrently so that clients can pipeline. Responses go to the latest
+    connection, a resent order gets its responses again instead of a second fill
+    """
+
+    def __init__(self, host='127.0.0.1', port=0, latency=0.0, drop_every=None, fill_size=None):
+        """
+        Constructor
+        :param host:
+        :param port: 0 for an ephemeral port
+        :param latency: seconds from order arrival to ack and fill
+        :param drop_every: drop the connection at every n-th message received, None for never
+        :param fill_size: max quantity of a fill, None for one fill per order
+        """
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.drop_every = drop_every
+        self.fill_size = fill_size
+
+        self.server = None
+        self.writer = None
+        self.received = 0
+        self.connections = 0
+        self.responses = {}  # key: order_id value: list of responses, None while pending
+        self.cancel_requests = set()
+
+    async def start(self):
+        self.server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+        if self.writer is not None:
+            self.writer.close()
+
+    def _write(self, message):
+        if self.writer is not None and not self.writer.is_closing():
+            self.writer.write(encode(message))
+
+    async def _handle(self, reader, writer):
+        self.writer = writer
+        self.connections += 1
+        while True:
+            try:
+                line = await reader.readline()
+            except (OSError, ConnectionError):
+                break
+            if not line:
+                break
+            self.received += 1
+            if self.drop_every and self.received % self.drop_every == 0:
+                break
+
+            message = decode(line)
+            order_id = message['order_id']
+            if message['type'] == MSG_ORDER:
+                if order_id not in self.responses:
+                    self.responses[order_id] = None
+                    asyncio.ensure_future(self._process(message))
+                elif self.responses[order_id] is not None:
+                    for response in self.responses[order_id]:
+                        self._write(response)
+            elif message['type'] == MSG_CANCEL:
+                if order_id in self.responses and self.responses[order_id] is None:
+                    self.cancel_requests.add(order_id)
+                else:
+                    self._write({'type': MSG_REJECT, 'order_id': order_id, 'reason': 'not active'})
+        writer.close()
+
+    async def _process(self, message):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        order_id = message['order_id']
+        if order_id in self.cancel_requests:
+            responses = [{'type': MSG_CANCELLED, 'order_id': order_id}]
+        else:
+            quantity = message['quantity']
+            size = self.fill_size or quantity
+            responses = [{'type': MSG_ACK, 'order_id': order_id}]
+            for fill_id, start in enumerate(range(0, quantity, size)):
+                responses.append({'type': MSG_FILL, 'order_id': order_id, 'fill_id': fill_id,
+                                  'symbol': message['symbol'], 'direction': message['direction'],
+                                  'quantity': min(size, quantity - start), 'price': message['price']})
+        self.responses[order_id] = responses
+        for response in responses:
+            self._write(response)
@@ -0,0 +1,471 @@
+# -*- coding: utf-8 -*-
+
+"""
+Indicators
+Streaming indicators keep their state per symbol in arrays and are updated in O(1) per bar,
+vectorized functions compute the same values over a whole history at load time,
+window indicators are memoized per bar in an indicator cache shared by strategies
+
+@author: Jesse J. Hsu
+@email: jessexu117@outlook.com
+@version: 0.1
+"""
+
+import sys
+import numpy as np
+from collections import deque, OrderedDict
+
+
+class Indicator(object):
+    """
+    Indicator base class
+    State is kept in arrays aligned with symbol index, value is NaN until the indicator is ready
+    """
+
+    def __init__(self, n=1):
+        """
+        Constructor
+        :param n: number of symbols
+        """
+        self.n = n
+        self.count = np.zeros(n, dtype=np.int64)
+        self.value = np.full(n, np.nan)
+
+    def ready(self, i):
+        """
+        Is the indicator of symbol i ready
+        """
+        return not np.isnan(self.value[i])
+
+
+class _RingBuffer(Indicator):
+    """
+    Indicator over a window of the latest values
+    """
+
+    def __init__(self, window, n=1):
+        super(_RingBuffer, self).__init__(n)
+        self.window = window
+        self.buffer = np.zeros((n, window))
+        self.pos = np.zeros(n, dtype=np.int64)
+
+    def _push(self, i, x):
+        """
+        Push a value into the window
+        :return: the value leaving the window, None if the window is not full
+        """
+        p = self.pos[i]
+        old = self.buffer[i, p] if self.count[i] >= self.window else None
+        self.buffer[i, p] = x
+        self.pos[i] = (p + 1) % self.window
+        self.count[i] += 1
+        return old
+
+
+class SMA(_RingBuffer):
+    """
+    Simple moving average
+    """
+
+    def __init__(self, window, n=1):
+        super(SMA, self).__init__(window, n)
+        self.sum = np.zeros(n)
+
+    def update(self, i, x):
+        """
+        Update with a new value
+        :param i: symbol index
+        :param x: new value
+        :return: current value
+        """
+        old = self._push(i, x)
+        self.sum[i] += x if old is None else x - old
+        if self.count[i] >= self.window:
+            self.value[i] = self.sum[i] / self.window
+        return self.value[i]
+
+
+class EMA(Indicator):
+    """
+    Exponential moving average, alpha = 2 / (window + 1), seeded with the first value
+    """
+
+    def __init__(self, window, n=1):
+        super(EMA, self).__init__(n)
+        self.window = window
+        self.alpha = 2.0 / (window + 1.0)
+
+    def update(self, i, x):
+        if self.count[i] == 0:
+            self.value[i] = x
+        else:
+            self.value[i] += self.alpha * (x - self.value[i])
+        self.count[i] += 1
+        return self.value[i]
+
+
+class RollingStd(_RingBuffer):
+    """
+    Rolling standard deviation, mean and squared deviations are updated by Welford's method
+    """
+
+    def __init__(self, window, n=1, ddof=1):
+        super(RollingStd, self).__init__(window, n)
+        self.ddof = ddof
+        self.mean = np.full(n, np.nan)
+        self._mean = np.zeros(n)
+        self._m2 = np.zeros(n)
+
+    def update(self, i, x):
+        old = self._push(i, x)
+        mean = self._mean[i]
+        if old is None:
+            k = self.count[i]
+            new_mean = mean + (x - mean) / k
+            self._m2[i] += (x - mean) * (x - new_mean)
+        else:
+            new_mean = mean + (x - old) / self.window
+            self._m2[i] += (x - old) * (x - new_mean + old - mean)
+        self._mean[i] = new_mean
+
+        if self.count[i] >= self.window:
+            self.mean[i] = new_mean
+            self.value[i] = np.sqrt(max(self._m2[i], 0.0) / (self.window - self.ddof))
+        return self.value[i]
+
+
+class RollingMax(Indicator):
+    """
+    Rolling maximum via monotonic deque, amortized O(1)
+    """
+    sign = 1
+
+    def __init__(self, window, n=1):
+        super(RollingMax, self).__init__(n)
+        self.window = window
+        self.deques = [deque() for _ in range(n)]  # (bar count, value), values decreasing for max
+
+    def update(self, i, x):
+        d = self.deques[i]
+        t = self.count[i]
+        key = self.sign * x
+        while d and self.sign * d[-1][1] <= key:
+            d.pop()
+        d.append((t, x))
+        if d[0][0] <= t - self.window:
+            d.popleft()
+        self.count[i] = t + 1
+        if self.count[i] >= self.window:
+            self.value[i] = d[0][1]
+        return self.value[i]
+
+
+class RollingMin(RollingMax):
+    """
+    Rolling minimum via monotonic deque, amortized O(1)
+    """
+    sign = -1
+
+
+class ATR(Indicator):
+    """
+    Average true range with Wilder's smoothing, seeded with the mean of the first window true ranges
+    """
+
+    def __init__(self, window, n=1):
+        super(ATR, self).__init__(n)
+        self.window = window
+        self.prev_close = np.full(n, np.nan)
+        self._sum = np.zeros(n)
+
+    def update(self, i, high, low, close):
+        """
+        Update with a new bar
+        :param i: symbol index
+        :param high: bar high
+        :param low: bar low
+        :param close: bar close
+        :return: current value
+        """
+        pc = self.prev_close[i]
+        tr = high - low if np.isnan(pc) else max(high - low, abs(high - pc), abs(low - pc))
+        self.prev_close[i] = close
+        self.count[i] += 1
+
+        if self.count[i] < self.window:
+            self._sum[i] += tr
+        elif self.count[i] == self.window:
+            self.value[i] = (self._sum[i] + tr) / self.window
+        else:
+            self.value[i] += (tr - self.value[i]) / self.window
+        return self.value[i]
+
+
+class Bollinger(RollingStd):
+    """
+    Bollinger bands, middle band is the rolling mean and value is the rolling std
+    """
+
+    def __init__(self, window, n=1, k=2.0):
+        super(Bollinger, self).__init__(window, n, ddof=0)
+        self.k = k
+        self.upper = np.full(n, np.nan)
+        self.lower = np.full(n, np.nan)
+
+    def update(self, i, x):
+        """
+        :return: tuple (upper, middle, lower)
+        """
+        std = super(Bollinger, self).update(i, x)
+        self.upper[i] = self.mean[i] + self.k * std
+        self.lower[i] = self.mean[i] - self.k * std
+        return self.upper[i], self.mean[i], self.lower[i]
+
+
+class RSI(Indicator):
+    """
+    Relative strength index with Wilder's smoothing
+    """
+
+    def __init__(self, window, n=1):
+        super(RSI, self).__init__(n)
+        self.window = window
+        self.prev = np.full(n, np.nan)
+        self.gain = np.zeros(n)
+        self.loss = np.zeros(n)
+
+    def update(self, i, x):
+        prev = self.prev[i]
+        self.prev[i] = x
+        if np.isnan(prev):
+            return self.value[i]
+
+        change = x - prev
+        gain, loss = max(change, 0.0), max(-change, 0.0)
+        self.count[i] += 1
+        if self.count[i] <= self.window:
+            # simple average of the first window changes
+            self.gain[i] += (gain - self.gain[i]) / self.count[i]
+            self.loss[i] += (loss - self.loss[i]) / self.count[i]
+        else:
+            self.gain[i] += (gain - self.gain[i]) / self.window
+            self.loss[i] += (loss - self.loss[i]) / self.window
+
+        if self.count[i] >= self.window:
+            total = self.gain[i] + self.loss[i]
+            self.value[i] = 50.0 if total == 0 else 100.0 * self.gain[i] / total
+        return self.value[i]
+
+
+class LaneSMA(object):
+    """
+    Simple moving average of K parameter lanes, one window per lane
+    Values of all the symbols at a timestamp are pushed at once into a buffer of the longest window,
+    every lane keeps its own running sum, so a bar updates all the lanes in O(K * symbols) array operations
+    """
+
+    def __init__(self, windows, n=1):
+        """
+        Constructor
+        :param windows: window array of lanes
+        :param n: number of symbols
+        """
+        self.windows = np.asarray(windows, dtype=np.int64)
+        self.max_window = int(self.windows.max())
+        self.buffer = np.zeros((self.max_window, n))
+        self.count = 0
+        self.sum = np.zeros((len(self.windows), n))
+        self.value = np.full((len(self.windows), n), np.nan)
+
+    def update(self, x):
+        """
+        Update with the values of all the symbols
+        :param x: value array aligned with symbol index
+        :return: current value array with shape (lanes, symbols)
+        """
+        leaving = self.count >= self.windows
+        delta = np.broadcast_to(x, self.sum.shape).copy()
+        delta[leaving] -= self.buffer[(self.count - self.windows[leaving]) % self.max_window]
+        self.sum += delta
+
+        self.buffer[self.count % self.max_window] = x
+        self.count += 1
+        ready = self.count >= self.windows
+        self.value[ready] = self.sum[ready] / self.windows[ready, None]
+        return self.value
+
+
+# vectorized indicators over a whole history, array shape (times, symbols), values causal and aligned with bars
+
+def shift(x, periods=1):
+    """
+    Value of periods bars before, NaN at the beginning
+    """
+    x = np.asarray(x, dtype=np.float64)
+    out = np.full_like(x, np.nan)
+    if periods < len(x):
+        out[periods:] = x[:len(x) - periods]
+    return out
+
+
+def rolling_mean(x, window):
+    """
+    Simple moving average, same as SMA
+    """
+    x = np.asarray(x, dtype=np.float64)
+    out = np.full_like(x, np.nan)
+    if window <= len(x):
+        c = np.cumsum(x, axis=0)
+        out[window - 1] = c[window - 1]
+        out[window:] = c[window:] - c[:-window]
+        out[window - 1:] /= window
+    return out
+
+
+def rolling_std(x, window, ddof=1):
+    """
+    Rolling standard deviation, same as RollingStd
+    """
+    x = np.asarray(x, dtype=np.float64)
+    out = np.full_like(x, np.nan)
+    if window <= len(x):
+        out[window - 1:] = np.lib.stride_tricks.sliding_window_view(x, window, axis=0).std(axis=-1, ddof=ddof)
+    return out
+
+
+def rolling_max(x, window):
+    """
+    Rolling maximum, same as RollingMax
+    """
+    x = np.asarray(x, dtype=np.float64)
+    out = np.full_like(x, np.nan)
+    if window <= len(x):
+        out[window - 1:] = np.lib.stride_tricks.sliding_window_view(x, window, axis=0).max(axis=-1)
+    return out
+
+
+def rolling_min(x, window):
+    """
+    Rolling minimum, same as RollingMin
+    """
+    x = np.asarray(x, dtype=np.float64)
+    out = np.full_like(x, np.nan)
+    if window <= len(x):
+        out[window - 1:] = np.lib.stride_tricks.sliding_window_view(x, window, axis=0).min(axis=-1)
+    return out
+
+
+def ewm_mean(x, window):
+    """
+    Exponential moving average, same as EMA
+    """
+    x = np.asarray(x, dtype=np.float64)
+    alpha = 2.0 / (window + 1.0)
+    out = np.empty_like(x)
+    if len(x):
+        out[0] = x[0]
+    for t in range(1, len(x)):
+        out[t] = out[t - 1] + alpha * (x[t] - out[t - 1])
+    return out
+
+
+# window indicators of a symbol, function of BarArrays over the latest n bars
+
+def _true_range_mean(bars):
+    """
+    Simple mean of the true ranges of the window, unlike the Wilder smoothed ATR
+    """
+    prev_close = np.r_[np.nan, bars.close[:-1]]
+    tr = np.fmax(bars.high - bars.low, np.fmax(np.abs(bars.high - prev_close), np.abs(bars.low - prev_close)))
+    return tr.mean()
+
+
+WINDOW_INDICATORS = {
+    'sma': lambda bars: bars.close.mean(),
+    'std': lambda bars: bars.close.std(ddof=1),
+    'max': lambda bars: bars.high.max(),
+    'min': lambda bars: bars.low.min(),
+    'tr_mean': _true_range_mean,
+}
+
+
+class IndicatorCache(object):
+    """
+    Memoized indicator values with LRU eviction under a memory budget
+    Key is (data scope, symbol, indicator, parameters, cursor), so the same value is computed once per bar
+    whatever the number of strategies asking for it
+    """
+
+    def __init__(self, max_bytes=64 * 1024 * 1024):
+        """
+        Constructor
+        :param max_bytes: memory budget of cached values
+        """
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()  # key: cache key value: (value, size)
+        self.nbytes = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    @staticmethod
+    def _sizeof(value):
+        # getsizeof of an array owning its data already counts the buffer, a view only counts the header
+        if isinstance(value, np.ndarray) and value.base is not None:
+            return value.nbytes + sys.getsizeof(value)
+        return sys.getsizeof(value)
+
+    def get(self, key, compute):
+        """
+        Get a cached value, compute and cache it on miss
+        :param key: hashable cache key
+        :param compute: function without argument computing the value
+        :return: value
+        """
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+        self.misses += 1
+        value = compute()
+        self.put(key, value)
+        return value
+
+    def put(self, key, value):
+        """
+        Cache a value, least recently used values are evicted to keep the memory budget
+        """
+        size = self._sizeof(value)
+        if size > self.max_bytes:
+            return
+        if key in self.entries:
+            self.nbytes -= self.entries.pop(key)[1]
+        while self.entries and self.nbytes + size > self.max_bytes:
+            _, (_, evicted) = self.entries.popitem(last=False)
+            self.nbytes -= evicted
+            self.evictions += 1
+        self.entries[key] = (value, size)
+        self.nbytes += size
+
+    def clear(self):
+        self.entries.clear()
+        self.nbytes = 0
+
+    def stats(self):
+        """
+        Counters for tuning
+        :return: dictionary
+        """
+        total = self.hits + self.misses
+        return {'hits': self.hits, 'misses': self.misses, 'hit_rate': self.hits / total if total else np.nan,
+                'evictions': self.evictions, 'items': len(self.entries), 'nbytes': self.nbytes}
+
+
+# cache shared by all the data handlers of a process
+shared_indicator_cache = IndicatorCache()
@@ -0,0 +1,237 @@
+# -*- coding: utf-8 -*-
+
+"""
+Kernels
+Hot loops written as plain array functions, compiled by numba when it is installed and run as pure Python
+otherwise, with identical results. check_kernels() verifies the compiled kernels against their Python source
+and against the numpy implementations of the engine
+
+@author: Jesse J. Hsu
+@email: jessexu117@outlook.com
+@version: 0.1
+"""
+
+import numpy as np
+
+try:
+    from numba import njit
+except ImportError:
+    NUMBA_AVAILABLE = False
+else:
+    NUMBA_AVAILABLE = True
+
+
+def kernel(func):
+    """
+    Decorator of a kernel: numba nopython function when numba is installed, the plain function otherwise
+    Kernels only take numpy arrays and scalars, and write results into arrays or return them
+    """
+    return njit(cache=True)(func) if NUMBA_AVAILABLE else func
+
+
+def python_func(func):
+    """
+    Pure Python source of a kernel
+    """
+    return getattr(func, 'py_func', func)
+
+
+# accounting kernels
+
+@kernel
+def apply_fills_loop(position, basis, multiplier, index, quantities, prices):
+    """
+    Apply deals one by one to position and basis arrays in place (average cost method)
+    Same as FuturesAccount.apply_fill() in a row, symbols may repeat
+    :param position: position array
+    :param basis: average open price array
+    :param multiplier: contract multiplier array aligned with position
+    :param index: symbol index array
+    :param quantities: signed deal quantity array
+    :param prices: deal price array
+    :return: realized pnl array aligned with index
+    """
+    realized = np.zeros(len(index))
+    for k in range(len(index)):
+        i = index[k]
+        q = quantities[k]
+        p = prices[k]
+        pos = position[i]
+        new_pos = pos + q
+
+        if pos * q < 0:
+            closed = min(abs(q), abs(pos))
+            realized[k] = (1.0 if pos > 0 else -1.0) * closed * (p - basis[i]) * multiplier[i]
+            if new_pos == 0:
+                basis[i] = 0.0
+            elif new_pos * pos < 0:
+                basis[i] = p
+        elif new_pos != 0:
+            basis[i] = (basis[i] * pos + p * q) / new_pos
+        position[i] = new_pos
+    return realized
+
+
+@kernel
+def mark_to_market_loop(position, basis, prices, multiplier, margin_rate, market_value, unrealized, margin):
+    """
+    Mark positions to market, per symbol results are written into market_value, unrealized and margin
+    :return: tuple (total unrealized pnl, total margin)
+    """
+    total_unrealized = 0.0
+    total_margin = 0.0
+    for i in range(len(position)):
+        market_value[i] = position[i] * prices[i] * multiplier[i]
+        unrealized[i] = position[i] * (prices[i] - basis[i]) * multiplier[i]
+        margin[i] = abs(market_value[i]) * margin_rate[i]
+        total_unrealized += unrealized[i]
+        total_margin += margin[i]
+    return total_unrealized, total_margin
+
+
+# strategy kernels
+
+@kernel
+def rbreaker_positions(days, hours, high, low, close, f1=0.35, f2=0.07, f3=0.25, swing_threshold=0.0,
+                       trade_per_day=5, trend=True, revert=False):
+    """
+    R-Breaker state machine over the bars of a symbol
+    Six price levels are set from the prior session OHLC; trend trades open on breakouts when flat and close
+    below 0.98 * bbreak or above 0.98 * sbreak as RBreaker does, reversal trades turn the position after the
+    session high (low) passes the setup level and the price crosses back the enter level when the trend rules
+    leave the position unchanged. Positions are closed from 15:00, and after trade_per_day trades for the rest
+    of the session.
+    The first session and sessions after a prior swing below swing_threshold are not traded
+    :param days: session key array, eg. days since epoch
+    :param hours: bar hour array
+    :param high: bar high array
+    :param low: bar low array
+    :param close: bar close array
+    :return: target position array (1 long, -1 short, 0 flat) aligned with bars
+    """
+    n = len(close)
+    positions = np.zeros(n)
+    pos = 0.0
+    trades = 0
+    trading = False
+    has_prior = False
+    day_high = 0.0
+    day_low = 0.0
+    bsetup = 0.0
+    ssetup = 0.0
+    benter = 0.0
+    senter = 0.0
+    bbreak = 0.0
+    sbreak = 0.0
+
+    for t in range(n):
+        if t == 0 or days[t] != days[t - 1]:
+            if t > 0:
+                prior_high = day_high
+                prior_low = day_low
+                prior_close = close[t - 1]
+                has_prior = True
+                bsetup = prior_low - f1 * (prior_high - prior_close)
+                ssetup = prior_high + f1 * (prior_close - prior_low)
+                benter = (1 + f2) / 2 * (prior_high + prior_low) - f2 * prior_high
+                senter = (1 + f2) / 2 * (prior_high + prior_low) - f2 * prior_low
+                bbreak = ssetup + f3 * (ssetup - bsetup)
+                sbreak = bsetup - f3 * (ssetup - bsetup)
+                trading = prior_high - prior_low >= swing_threshold
+            day_high = high[t]
+            day_low = low[t]
+            trades = 0
+        else:
+            day_high = max(day_high, high[t])
+            day_low = min(day_low, low[t])
+
+        target = pos
+        if has_prior and trading:
+            price = close[t]
+            if hours[t] >= 15:
+                target = 0.0
+            else:
+                if trend:
+                    if pos == 0:
+                        if price > bbreak:
+                            target = 1.0
+                        elif price < sbreak:
+                            target = -1.0
+                    elif price < 0.98 * bbreak or price > 0.98 * sbreak:
+                        target = 0.0
+                if revert and target == pos:
+                    if day_high > ssetup and price < senter and pos >= 0:
+                        target = -1.0
+                    elif day_low < bsetup and price > benter and pos <= 0:
+                        target = 1.0
+            if target != pos:
+                trades += 1
+                if trades >= trade_per_day:
+                    target = 0.0
+                    trading = False
+
+        pos = target
+        positions[t] = pos
+    return positions
+
+
+def check_kernels(n=2000, seed=0):
+    """
+    Self-check of the kernels on random data, compiled and pure Python kernels must give identical results,
+    and accounting kernels must match the numpy implementations of FuturesAccount
+    :param n: amount of random deals and bars
+    :param seed: random seed
+    :return: True, AssertionError raised on mismatch
+    """
+    from .account import apply_deals
+
+    rng = np.random.RandomState(seed)
+    m = 8
+    multiplier = rng.choice([1.0, 5.0, 10.0], m)
+    index = rng.randint(0, m, n)
+    quantities = rng.randint(-5, 6, n).astype(np.float64)
+    prices = np.round(100 + rng.randn(n).cumsum(), 1)
+
+    # deals one by one, compiled vs python vs numpy with distinct symbols per call
+    results = []
+    for func in (apply_fills_loop, python_func(apply_fills_loop)):
+        position, basis = np.zeros(m), np.zeros(m)
+        realized = func(position, basis, multiplier, index, quantities, prices)
+        results.append((position, basis, realized))
+    position, basis = np.zeros(m), np.zeros(m)
+    realized = np.concatenate([apply_deals(position, basis, index[k:k + 1], quantities[k:k + 1], prices[k:k + 1],
+                                           multiplier[index[k:k + 1]]) for k in range(n)])
+    results.append((position, basis, realized))
+    for other in results[1:]:
+        for a, b in zip(results[0], other):
+            assert np.allclose(a, b), 'apply_fills_loop mismatch!'
+
+    # mark to market
+    position, basis = results[0][0], results[0][1]
+    last = prices[-m:]
+    margin_rate = rng.uniform(0.05, 0.15, m)
+    outputs = []
+    for func in (mark_to_market_loop, python_func(mark_to_market_loop)):
+        arrays = np.zeros(m), np.zeros(m), np.zeros(m)
+        totals = func(position, basis, last, multiplier, margin_rate, *arrays)
+        outputs.append((totals,) + arrays)
+    market_value = position * last * multiplier
+    unrealized = position * (last - basis) * multiplier
+    margin = np.abs(market_value) * margin_rate
+    outputs.append(((unrealized.sum(), margin.sum()), market_value, unrealized, margin))
+    for other in outputs[1:]:
+        for a, b in zip(outputs[0], other):
+            assert np.allclose(a, b), 'mark_to_market_loop mismatch!'
+
+    # strategy kernel
+    days = np.repeat(np.arange(n // 200 + 1), 200)[:n]
+    hours = np.tile(np.repeat(np.arange(9, 16), 30), n // 200 + 2)[:n]
+    close = 100 + rng.randn(n).cumsum()
+    high = close + rng.uniform(0, 1, n)
+    low = close - rng.uniform(0, 1, n)
+    for trend, revert in ((True, False), (False, True), (True, True)):
+        a = rbreaker_positions(days, hours, high, low, close, 0.35, 0.07, 0.25, 0.0, 5, trend, revert)
+        b = python_func(rbreaker_positions)(days, hours, high, low, close, 0.35, 0.07, 0.25, 0.0, 5, trend, revert)
+        assert np.array_equal(a, b), 'rbreaker_positions mismatch!'
+
+    return True
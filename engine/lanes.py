@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+
+"""
+Lane Backtest
+K parameter sets of a strategy run in one pass over the data: every bar updates the strategy state
+and the accounts of all the lanes in array operations, and K equity curves come back
+
+@author: Jesse J. Hsu
+@email: jessexu117@outlook.com
+@version: 0.1
+"""
+
+import queue
+import itertools
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from .cost import CostTable
+from .data import CSVDataHandler
+from .vectorized import performance
+from ..utils.symbol import get_symbol_info
+
+
+LaneResult = namedtuple('LaneResult', ('params', 'equity', 'metrics'))
+
+
+def param_grid(**ranges):
+    """
+    All the combinations of parameter ranges
+    :param ranges: key: parameter name value: parameter value list
+    :return: list of parameter dictionaries
+    """
+    names = list(ranges)
+    return [dict(zip(names, values)) for values in itertools.product(*[ranges[name] for name in names])]
+
+
+class LaneBacktest(object):
+    """
+    Lane backtest engine
+    Follows SimulatedExecutionHandler and BasicPortfolioHandler, as VectorizedBacktest: targets are filled at the
+    close of the bar with the same cost table, holdings of a bar are marked before the fills of the bar,
+    and all the positions are closed at the last bar
+    """
+
+    def __init__(self, data_dir, symbol_list, initial_capital, start_date, end_date, strategy, params,
+                 data_handler=CSVDataHandler, commission_type='default', slippage_type='fixed', cost_config=None,
+                 periods=252 * 4 * 60):
+        """
+        Constructor
+        :param data_dir:
+        :param symbol_list:
+        :param initial_capital:
+        :param start_date:
+        :param end_date:
+        :param strategy: LaneStrategy class
+        :param params: list of parameter dictionaries, one per lane, see param_grid()
+        :param data_handler: DataHandler class with bar matrix
+        :param commission_type: commission model, zero or default
+        :param slippage_type: slippage model, fixed or zero
+        :param cost_config: commission and slippage parameters, see CostTable
+        :param periods: backtest time scale of metrics
+        """
+        assert len(params) > 0, AssertionError('no parameter set!')
+        self.symbol_list = symbol_list
+        self.initial_capital = initial_capital
+        self.params = list(params)
+        self.periods = periods
+
+        self.data_handler = data_handler(queue.Queue(), symbol_list, start_date, end_date, data_dir)
+        self.strategy = strategy(self.data_handler, {name: np.array([p[name] for p in self.params])
+                                                     for name in self.params[0]})
+
+        self.cost_table = CostTable(symbol_list, cost_config, commission_type, slippage_type)
+        infos = [get_symbol_info(s) for s in symbol_list]
+        self.multiplier = np.array([1.0 if info is None else info.multiplier for info in infos])
+
+    def _trade(self, quantities, close):
+        """
+        Cash flow of the trades of all the lanes at a close
+        :param quantities: signed trade quantity array with shape (lanes, symbols)
+        :param close: close price array aligned with symbol list
+        :return: tuple (cash flow array of lanes, commission array of lanes)
+        """
+        index = np.broadcast_to(np.arange(len(self.symbol_list)), quantities.shape)
+        amounts = np.abs(quantities)
+        fill_prices, commissions = self.cost_table.fill_batch(index, np.broadcast_to(close, quantities.shape),
+                                                              amounts, np.sign(quantities))
+        commissions = np.where(amounts > 0, commissions, 0.0).sum(axis=1)
+        return (quantities * fill_prices * self.multiplier).sum(axis=1) + commissions, commissions
+
+    def run(self):
+        """
+        Run all the lanes over the data
+        :return: LaneResult, equity is a DataFrame with one column per lane,
+                 metrics is a DataFrame of parameters and metrics with one row per lane
+        """
+        data = self.data_handler
+        matrix = data.bar_matrix
+        times, lanes = len(matrix), len(self.params)
+
+        positions = np.zeros((lanes, len(self.symbol_list)))
+        cash = np.full(lanes, float(self.initial_capital))
+        commission = np.zeros(lanes)
+        trades = np.zeros(lanes, dtype=np.int64)
+        equity = np.empty((times, lanes))
+
+        for t in range(times):
+            data.cursor = t
+            close = matrix[t, :, 3]
+            equity[t] = cash + (positions * close * self.multiplier).sum(axis=1)
+
+            targets = np.round(self.strategy.calculate_targets(data.bar_arrays.datetime[t], matrix[t]))
+            quantities = targets - positions
+            if quantities.any():
+                flow, fees = self._trade(quantities, close)
+                cash -= flow
+                commission += fees
+                trades += np.count_nonzero(quantities, axis=1)
+                positions = targets
+
+        # close out at the last bar
+        if times > 0:
+            flow, fees = self._trade(-positions, matrix[-1, :, 3])
+            cash -= flow
+            commission += fees
+            trades += np.count_nonzero(positions, axis=1)
+            equity[-1] = cash
+        data.continue_backtest = False
+
+        metrics = []
+        for k in range(lanes):
+            row = dict(self.params[k])
+            row.update(performance(np.r_[self.initial_capital, equity[:, k]], self.periods))
+            row.update(trades=trades[k], commission=commission[k])
+            metrics.append(row)
+
+        return LaneResult(self.params, pd.DataFrame(equity, index=data.bar_arrays.datetime[:times]),
+                          pd.DataFrame(metrics))
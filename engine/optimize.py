@@ -0,0 +1,226 @@
+# -*- coding: utf-8 -*-
+
+"""
+Parameter Optimizer
+Random search and successive halving over Backtest, trials run concurrently in a process pool.
+Runs are pruned mid-simulation by a monitor reading the running metrics of the backtest
+
+@author: Jesse J. Hsu
+@email: jessexu117@outlook.com
+@version: 0.1
+"""
+
+import math
+import queue
+import random
+
+import numpy as np
+import pandas as pd
+
+from .data import CSVDataHandler, preload_csv_data
+from .sweep import SweepRunner, STATUS_OK
+
+METHOD_RANDOM = 'random'
+METHOD_HALVING = 'halving'
+
+STOP_BUDGET = 'budget'
+STOP_DRAWDOWN = 'drawdown'
+STOP_SHARPE = 'sharpe'
+
+
+class Pruner(object):
+    """
+    Backtest monitor stopping runs whose running drawdown or Sharpe ratio falls below a threshold,
+    or which have used up their bar budget
+    """
+
+    def __init__(self, max_drawdown=None, min_sharpe=None, warmup=0, interval=1, max_bars=None):
+        """
+        Constructor
+        :param max_drawdown: stop when the running max drawdown is below it, eg. -0.1
+        :param min_sharpe: stop when the running Sharpe ratio is below it
+        :param warmup: bars before checking thresholds
+        :param interval: check thresholds every interval bars
+        :param max_bars: bar budget, None for unlimited
+        """
+        self.max_drawdown = max_drawdown
+        self.min_sharpe = min_sharpe
+        self.warmup = warmup
+        self.interval = interval
+        self.max_bars = max_bars
+
+    def with_budget(self, max_bars):
+        """
+        Same thresholds with another bar budget
+        """
+        return Pruner(self.max_drawdown, self.min_sharpe, self.warmup, self.interval, max_bars)
+
+    def __call__(self, backtest):
+        n = backtest.bar_count
+        if self.max_bars is not None and n >= self.max_bars:
+            backtest.request_stop(STOP_BUDGET)
+            return
+        if n < self.warmup or n % self.interval:
+            return
+
+        metrics = backtest.running_metrics()
+        if self.max_drawdown is not None and metrics['max_drawdown'] < self.max_drawdown:
+            backtest.request_stop(STOP_DRAWDOWN)
+        elif self.min_sharpe is not None and metrics['sharpe'] < self.min_sharpe:
+            backtest.request_stop(STOP_SHARPE)
+
+
+def sample_params(space, n, seed=None):
+    """
+    Random parameter sets
+    :param space: dictionary, key: parameter name value: list of choices, or tuple (low, high) sampled uniformly,
+                  integers when both bounds are integers
+    :param n: amount of parameter sets
+    :param seed: random seed
+    :return: list of parameter dictionaries
+    """
+    rng = random.Random(seed)
+    params = []
+    for _ in range(n):
+        p = {}
+        for name, spec in space.items():
+            if isinstance(spec, tuple):
+                low, high = spec
+                p[name] = rng.randint(low, high) if isinstance(low, int) and isinstance(high, int) \
+                    else rng.uniform(low, high)
+            else:
+                p[name] = rng.choice(list(spec))
+        params.append(p)
+    return params
+
+
+class Optimizer(object):
+    """
+    Early-stopping parameter optimizer over Backtest
+    random: every trial runs the whole data, bad trials are pruned by thresholds
+    halving: successive halving, trials run on a small bar budget and the best 1 / eta of them are rerun with
+             eta times the budget, until the survivors run the whole data
+    """
+
+    def __init__(self, data_dir, symbol_list, initial_capital, start_date, end_date, strategy, space,
+                 n_trials=27, method=METHOD_RANDOM, eta=3, objective='sharpe', pruner=None, max_workers=None,
+                 seed=None, **backtest_params):
+        """
+        Constructor
+        :param data_dir:
+        :param symbol_list:
+        :param initial_capital:
+        :param start_date:
+        :param end_date:
+        :param strategy: Strategy class
+        :param space: parameter space, see sample_params()
+        :param n_trials: amount of sampled parameter sets
+        :param method: 'random' or 'halving'
+        :param eta: reduction factor of successive halving
+        :param objective: metric to maximize, eg. 'sharpe', 'return' or 'max_drawdown'
+        :param pruner: Pruner object of thresholds
+        :param max_workers: number of worker processes
+        :param seed: random seed of sampling
+        :param backtest_params: other SweepRunner and Backtest parameters
+        """
+        assert method in (METHOD_RANDOM, METHOD_HALVING), AssertionError('optimize method error!')
+        self.data_dir = data_dir
+        self.symbol_list = symbol_list
+        self.initial_capital = initial_capital
+        self.start_date = start_date
+        self.end_date = end_date
+        self.strategy = strategy
+        self.space = space
+        self.n_trials = n_trials
+        self.method = method
+        self.eta = eta
+        self.objective = objective
+        self.pruner = pruner or Pruner()
+        self.max_workers = max_workers
+        self.seed = seed
+        self.backtest_params = backtest_params
+
+        self.trials = []  # summary row dictionaries of all the runs
+
+    def _score(self, row):
+        """
+        Objective of a run, -inf for failed or pruned runs
+        """
+        if row['status'] != STATUS_OK or row.get('stop_reason') not in (None, STOP_BUDGET):
+            return -np.inf
+        value = row.get(self.objective)
+        return -np.inf if value is None or np.isnan(value) else value
+
+    def _evaluate(self, trial_ids, params, pruner, rung, callback):
+        """
+        Run a batch of trials concurrently
+        :return: dictionary, key: trial id value: score
+        """
+        runner = SweepRunner(self.data_dir, self.symbol_list, self.initial_capital, self.start_date, self.end_date,
+                             self.strategy, [params[i] for i in trial_ids], max_workers=self.max_workers,
+                             monitor=pruner, **self.backtest_params)
+        scores = {}
+        for row in runner.iter_results():
+            trial_id = trial_ids[row['run_id']]
+            row.update(trial=trial_id, rung=rung, budget=pruner.max_bars)
+            scores[trial_id] = self._score(row)
+            self.trials.append(row)
+            if callback is not None:
+                callback(row)
+        return scores
+
+    def _count_bars(self):
+        """
+        Bars of the data, loaded once in the parent
+        """
+        data_handler = self.backtest_params.get('data_handler', CSVDataHandler)
+        if data_handler is CSVDataHandler:
+            preload_csv_data(self.data_dir, self.symbol_list)
+        handler = data_handler(queue.Queue(), self.symbol_list, self.start_date, self.end_date, self.data_dir)
+        return len(handler.bar_arrays.datetime)
+
+    def run(self, callback=None):
+        """
+        Run the optimization
+        :param callback: function called with every summary row as runs complete
+        :return: summary DataFrame of all the runs, best first
+        """
+        params = sample_params(self.space, self.n_trials, self.seed)
+        candidates = list(range(len(params)))
+
+        if self.method == METHOD_RANDOM:
+            self._evaluate(candidates, params, self.pruner.with_budget(None), 0, callback)
+        else:
+            total = self._count_bars()
+            rungs = int(math.log(max(len(candidates), 1)) / math.log(self.eta) + 1e-9)
+            for rung in range(rungs + 1):
+                budget = None if rung == rungs else int(math.ceil(total * self.eta ** (rung - rungs)))
+                scores = self._evaluate(candidates, params, self.pruner.with_budget(budget), rung, callback)
+                alive = sorted((i for i in candidates if scores.get(i, -np.inf) > -np.inf),
+                               key=lambda i: scores[i], reverse=True)
+                candidates = alive[:max(int(math.ceil(len(candidates) / float(self.eta))), 1)]
+                if not candidates:
+                    break
+
+        return self.summary()
+
+    def summary(self):
+        """
+        Summary table of all the runs, full runs first and best first
+        """
+        if not self.trials:
+            return pd.DataFrame()
+        table = pd.DataFrame(self.trials).drop(columns='run_id')
+        table['score'] = [self._score(row) for row in self.trials]
+        return table.sort_values(['rung', 'score'], ascending=False).reset_index(drop=True)
+
+    def best_params(self):
+        """
+        Parameters of the best full run
+        :return: parameter dictionary, None if every run failed or was pruned
+        """
+        full = [row for row in self.trials if row['budget'] is None and self._score(row) > -np.inf]
+        if not full:
+            return None
+        best = max(full, key=self._score)
+        return {name: best[name] for name in self.space}
@@ -0,0 +1,387 @@
+# -*- coding: utf-8 -*-
+
+"""
+Order Book Model
+Resting orders of a simulated exchange, matched against every new bar or quote
+
+@author: Jesse J. Hsu
+@email: jessexu117@outlook.com
+@version: 0.1
+"""
+
+import heapq
+import itertools
+from collections import deque
+
+from .constant import ORDER_BUY, MARKET_ORDER, STOP_ORDER
+from .constant import STATUS_ACTIVE, STATUS_PARTIAL, STATUS_FILLED, STATUS_CANCELLED
+
+
+class Order(object):
+    """
+    A resting order in the book
+    """
+    __slots__ = ('order_id', 'symbol', 'order_type', 'direction', 'quantity', 'price', 'strategy_id',
+                 'filled', 'status', 'seq')
+
+    def __init__(self, order_id, symbol, order_type, direction, quantity, price, strategy_id=None):
+        self.order_id = order_id
+        self.symbol = symbol
+        self.order_type = order_type
+        self.direction = direction
+        self.quantity = quantity
+        self.price = price
+        self.strategy_id = strategy_id
+        self.filled = 0
+        self.status = STATUS_ACTIVE
+        self.seq = 0
+
+    @property
+    def remaining(self):
+        return self.quantity - self.filled
+
+    def __repr__(self):
+        return 'Order(id=%s, %s %s %s %s@%s, filled=%s, %s)' % (
+            self.order_id, self.symbol, self.order_type, self.direction, self.quantity, self.price,
+            self.filled, self.status)
+
+
+class PriceLevel(object):
+    """
+    Orders at a price, first in first out
+    """
+    __slots__ = ('price', 'orders', 'quantity')
+
+    def __init__(self, price):
+        self.price = price
+        self.orders = deque()
+        self.quantity = 0  # remaining quantity of active orders
+
+
+class OrderBook(object):
+    """
+    Order book of a symbol
+    Limit orders are held in price levels, best price found by a heap over level prices;
+    stop orders are held in heaps by trigger price.
+    Cancelled orders are removed lazily, so add, cancel and best price lookup are O(log n)
+    """
+
+    def __init__(self, symbol):
+        self.symbol = symbol
+
+        self.bid_levels = {}  # key: price value: PriceLevel
+        self.ask_levels = {}
+        self.bid_prices = []  # max heap via negative price
+        self.ask_prices = []  # min heap
+
+        self.buy_stops = []  # min heap of (stop price, seq, order), triggered by rising price
+        self.sell_stops = []  # max heap of (-stop price, seq, order), triggered by falling price
+
+        self.orders = {}  # key: order_id value: active order
+        self.seq = itertools.count()
+
+    def __len__(self):
+        return len(self.orders)
+
+    def add(self, order):
+        """
+        Add an order into the book
+        :param order: Order object, LMT or STP, or MKT with price inf for BUY and -inf for SELL
+        """
+        order.seq = next(self.seq)
+        self.orders[order.order_id] = order
+
+        if order.order_type == STOP_ORDER:
+            if order.direction == ORDER_BUY:
+                heapq.heappush(self.buy_stops, (order.price, order.seq, order))
+            else:
+                heapq.heappush(self.sell_stops, (-order.price, order.seq, order))
+        else:
+            self._add_level(order)
+
+    def _add_level(self, order):
+        """
+        Append an order to its price level, a market order rests at an infinite price
+        """
+        if order.direction == ORDER_BUY:
+            levels, prices, key = self.bid_levels, self.bid_prices, -order.price
+        else:
+            levels, prices, key = self.ask_levels, self.ask_prices, order.price
+
+        level = levels.get(order.price)
+        if level is None:
+            level = levels[order.price] = PriceLevel(order.price)
+            heapq.heappush(prices, key)
+        level.orders.append(order)
+        level.quantity += order.remaining
+
+    def cancel(self, order_id):
+        """
+        Cancel an active order
+        :param order_id:
+        :return: cancelled Order object, None if not active
+        """
+        order = self.orders.pop(order_id, None)
+        if order is None:
+            return None
+
+        order.status = STATUS_CANCELLED
+        if order.order_type != STOP_ORDER:
+            levels = self.bid_levels if order.direction == ORDER_BUY else self.ask_levels
+            levels[order.price].quantity -= order.remaining
+        return order
+
+    def replace(self, order_id, price=None, quantity=None):
+        """
+        Replace an active order
+        Reducing quantity keeps the queue priority, changing price or adding quantity loses it
+        :param order_id:
+        :param price: new price, None for unchanged
+        :param quantity: new total quantity, None for unchanged
+        :return: the active Order object, None if not active
+        """
+        order = self.orders.get(order_id)
+        if order is None:
+            return None
+
+        price = order.price if price is None else price
+        quantity = order.quantity if quantity is None else quantity
+        if quantity <= order.filled:
+            self.cancel(order_id)
+            return None
+
+        if price == order.price and quantity <= order.quantity:
+            if order.order_type != STOP_ORDER:
+                levels = self.bid_levels if order.direction == ORDER_BUY else self.ask_levels
+                levels[order.price].quantity -= order.quantity - quantity
+            order.quantity = quantity
+            return order
+
+        self.cancel(order_id)
+        new_order = Order(order_id, order.symbol, order.order_type, order.direction, quantity, price,
+                          order.strategy_id)
+        new_order.filled = order.filled
+        new_order.status = STATUS_ACTIVE if order.filled == 0 else STATUS_PARTIAL
+        self.add(new_order)
+        return new_order
+
+    def _best_level(self, levels, prices, sign):
+        """
+        Best active price level, empty levels are dropped on the way
+        """
+        while prices:
+            price = prices[0] * sign
+            level = levels.get(price)
+            if level is not None and level.quantity > 0:
+                return level
+            heapq.heappop(prices)
+            levels.pop(price, None)
+        return None
+
+    def best_bid(self):
+        level = self._best_level(self.bid_levels, self.bid_prices, -1)
+        return None if level is None else level.price
+
+    def best_ask(self):
+        level = self._best_level(self.ask_levels, self.ask_prices, 1)
+        return None if level is None else level.price
+
+    def _fill(self, order, quantity, price, fills, level=None):
+        """
+        Record a deal of an order
+        """
+        order.filled += quantity
+        if level is not None:
+            level.quantity -= quantity
+        if order.remaining == 0:
+            order.status = STATUS_FILLED
+            self.orders.pop(order.order_id, None)
+        else:
+            order.status = STATUS_PARTIAL
+        fills.append((order, quantity, price))
+
+    def _trigger_stops(self, high, low, open_price, fills):
+        """
+        Triggered stop orders become market orders, filled at stop price or at open price when gapping through
+        """
+        while self.buy_stops and self.buy_stops[0][0] <= high:
+            stop, _, order = heapq.heappop(self.buy_stops)
+            if order.status in (STATUS_ACTIVE, STATUS_PARTIAL):
+                self._fill(order, order.remaining, max(stop, open_price), fills)
+        while self.sell_stops and -self.sell_stops[0][0] >= low:
+            stop, _, order = heapq.heappop(self.sell_stops)
+            if order.status in (STATUS_ACTIVE, STATUS_PARTIAL):
+                self._fill(order, order.remaining, min(-stop, open_price), fills)
+
+    def _match_level(self, level, volume, fill_price, fills):
+        """
+        Fill orders of a price level in FIFO order
+        :return: volume left
+        """
+        orders = level.orders
+        while orders and volume > 0:
+            order = orders[0]
+            if order.status not in (STATUS_ACTIVE, STATUS_PARTIAL):
+                orders.popleft()
+                continue
+            quantity = min(order.remaining, volume)
+            self._fill(order, quantity, fill_price, fills, level)
+            volume -= quantity
+            if order.remaining == 0:
+                orders.popleft()
+        return volume
+
+    def match_bar(self, open_price, high, low, volume=float('inf')):
+        """
+        Match resting orders against a new bar
+        Buy limits at or above the low and sell limits at or below the high are filled level by level,
+        at limit price or at open price when the bar opens through the limit
+        :param open_price: bar open
+        :param high: bar high
+        :param low: bar low
+        :param volume: max volume to fill per side, default unlimited
+        :return: list of (Order, fill quantity, fill price)
+        """
+        fills = []
+        self._trigger_stops(high, low, open_price, fills)
+
+        left = volume
+        while left > 0:
+            level = self._best_level(self.bid_levels, self.bid_prices, -1)
+            if level is None or level.price < low:
+                break
+            left = self._match_level(level, left, min(level.price, open_price), fills)
+
+        left = volume
+        while left > 0:
+            level = self._best_level(self.ask_levels, self.ask_prices, 1)
+            if level is None or level.price > high:
+                break
+            left = self._match_level(level, left, max(level.price, open_price), fills)
+
+        return fills
+
+    def _trigger_stops_by_quote(self, bid, ask):
+        """
+        Triggered stop orders become market orders at the back of the book
+        """
+        while self.buy_stops and self.buy_stops[0][0] <= ask:
+            _, _, order = heapq.heappop(self.buy_stops)
+            if order.status in (STATUS_ACTIVE, STATUS_PARTIAL):
+                order.order_type, order.price = MARKET_ORDER, float('inf')
+                self._add_level(order)
+        while self.sell_stops and -self.sell_stops[0][0] >= bid:
+            _, _, order = heapq.heappop(self.sell_stops)
+            if order.status in (STATUS_ACTIVE, STATUS_PARTIAL):
+                order.order_type, order.price = MARKET_ORDER, float('-inf')
+                self._add_level(order)
+
+    def match_quote(self, bid, ask, bid_size=float('inf'), ask_size=float('inf')):
+        """
+        Match resting orders against a quote
+        Buy orders at or above the ask are filled at the ask up to the ask size, sell orders at or below the bid
+        are filled at the bid up to the bid size, best price level and earliest order first
+        :param bid: best bid price
+        :param ask: best ask price
+        :param bid_size: quantity available at the bid
+        :param ask_size: quantity available at the ask
+        :return: list of (Order, fill quantity, fill price)
+        """
+        fills = []
+        self._trigger_stops_by_quote(bid, ask)
+
+        left = ask_size
+        while left > 0:
+            level = self._best_level(self.bid_levels, self.bid_prices, -1)
+            if level is None or level.price < ask:
+                break
+            left = self._match_level(level, left, ask, fills)
+
+        left = bid_size
+        while left > 0:
+            level = self._best_level(self.ask_levels, self.ask_prices, 1)
+            if level is None or level.price > bid:
+                break
+            left = self._match_level(level, left, bid, fills)
+
+        return fills
+
+
+class SimulatedExchange(object):
+    """
+    A simulated exchange holding an order book per symbol
+    """
+
+    def __init__(self):
+        self.books = {}  # key: symbol value: OrderBook
+        self.order_symbols = {}  # key: order_id value: symbol
+
+    def book(self, symbol):
+        """
+        Get the order book of a symbol, create it on first use
+        """
+        book = self.books.get(symbol)
+        if book is None:
+            book = self.books[symbol] = OrderBook(symbol)
+        return book
+
+    def submit(self, order):
+        """
+        Submit a resting order
+        :param order: Order object
+        """
+        self.order_symbols[order.order_id] = order.symbol
+        self.book(order.symbol).add(order)
+
+    def order(self, order_id):
+        """
+        Get an active order by order_id
+        :return: Order object, None if not active
+        """
+        symbol = self.order_symbols.get(order_id)
+        return None if symbol is None else self.books[symbol].orders.get(order_id)
+
+    def cancel(self, order_id):
+        """
+        Cancel an active order by order_id
+        :return: cancelled Order object, None if not active
+        """
+        symbol = self.order_symbols.pop(order_id, None)
+        return None if symbol is None else self.books[symbol].cancel(order_id)
+
+    def replace(self, order_id, price=None, quantity=None):
+        """
+        Replace an active order by order_id, see OrderBook.replace()
+        """
+        symbol = self.order_symbols.get(order_id)
+        if symbol is None:
+            return None
+        order = self.books[symbol].replace(order_id, price, quantity)
+        if order is None:
+            # cancelled by reducing the quantity to the filled part
+            self.order_symbols.pop(order_id, None)
+        return order
+
+    def match_bar(self, symbol, open_price, high, low, volume=float('inf')):
+        """
+        Match the order book of a symbol against a new bar, see OrderBook.match_bar()
+        """
+        book = self.books.get(symbol)
+        if book is None or len(book) == 0:
+            return []
+        return self._forget_filled(book.match_bar(open_price, high, low, volume))
+
+    def match_quote(self, symbol, bid, ask, bid_size=float('inf'), ask_size=float('inf')):
+        """
+        Match the order book of a symbol against a quote, see OrderBook.match_quote()
+        """
+        book = self.books.get(symbol)
+        if book is None or len(book) == 0:
+            return []
+        return self._forget_filled(book.match_quote(bid, ask, bid_size, ask_size))
+
+    def _forget_filled(self, fills):
+        for order, _, _ in fills:
+            if order.status == STATUS_FILLED:
+                self.order_symbols.pop(order.order_id, None)
+        return fills
@@ -9,10 +9,15 @@ Achieve including: position track, order management, profile analysis and risk m
 @version: 0.1
 """
 
+import numpy as np
 from abc import ABCMeta, abstractmethod
-from .constant import EVENT_FILL, EVENT_SIGNAL, ORDER_BUY, ORDER_SELL
-from .constant import SIGNAL_LONG, SIGNAL_SHORT, SIGNAL_EXIT
-from .event import OrderEvent
+from .constant import EVENT_FILL, EVENT_SIGNAL, EVENT_TARGET, EVENT_ORDER, ORDER_BUY, ORDER_SELL, MARKET_ORDER
+from .constant import SIGNAL_LONG, SIGNAL_SHORT, SIGNAL_EXIT, EVENT_BATCH_FILL, EVENT_CANCEL
+from .event import SignalEvent, OrderEvent, BatchOrderEvent
+from .account import FuturesAccount
+from .attribution import PnLAttribution
+from .data import trading_day, trading_day_record
+from ..utils.symbol import get_symbol_info
 
 
 class PortfolioHandler(object):
@@ -51,6 +56,106 @@ class PortfolioHandler(object):
         """
         raise NotImplementedError('function update_fill() is nor implemented!')
 
+    def update_target(self, event):
+        """
+        Generate new orders from TargetEvent
+        :param event: TargetEvent
+        :return:
+        """
+        raise NotImplementedError('function update_target() is nor implemented!')
+
+    def update_cancel(self, event):
+        """
+        Release the unfilled part of an order from CancelEvent
+        :param event: CancelEvent
+        :return:
+        """
+        pass
+
+    def flush_signals(self):
+        """
+        Generate orders from the signals held back in current timestamp
+        Called when the events queue of a timestamp is empty
+        :return: True if any order is sent
+        """
+        return False
+
+    def exit_all(self):
+        """
+        Close all the positions when backtest is over
+        An EXIT signal per symbol of symbol_list at current_datetime by default
+        """
+        for symbol in self.symbol_list:
+            self.update_signal(SignalEvent(symbol, self.current_datetime, SIGNAL_EXIT))
+
+
+class SignalCoalescer(object):
+    """
+    Signal coalescing stage between SignalEvent and order generation
+    Every strategy keeps its own target position, the latest signal of a strategy in a timestamp wins,
+    and the targets of all strategies are netted into one target position per symbol
+    """
+
+    def __init__(self, symbol_list, lot=1):
+        """
+        Constructor
+        :param symbol_list: symbol list
+        :param lot: future lot of a signal
+        """
+        self.symbol_index = {s: i for i, s in enumerate(symbol_list)}
+        self.lot = lot
+
+        self.strategy_targets = {}  # key: strategy_id value: target position array aligned with symbol list
+        self.netted_targets = {}  # strategy targets sent as orders, partly sent legs hold a fraction
+        self.pending = False
+
+    def add_signal(self, signal):
+        """
+        Hold back a signal until the timestamp is over
+        :param signal: SignalEvent object
+        """
+        targets = self.strategy_targets.get(signal.strategy_id)
+        if targets is None:
+            targets = np.zeros(len(self.symbol_index), dtype=np.int64)
+            self.strategy_targets[signal.strategy_id] = targets
+
+        i = self.symbol_index[signal.symbol]
+        if signal.signal_type == SIGNAL_LONG:
+            targets[i] = self.lot
+        elif signal.signal_type == SIGNAL_SHORT:
+            targets[i] = -self.lot
+        elif signal.signal_type == SIGNAL_EXIT:
+            targets[i] = 0
+        self.pending = True
+
+    def net_targets(self):
+        """
+        Net target positions of all the strategies
+        Changes are measured from the sent targets, call commit() with what is actually sent
+        :return: tuple (target position array aligned with symbol list,
+                 allocation list aligned with symbol list, element is dictionary key: strategy_id value: signed change)
+        """
+        self.pending = False
+        allocations = [{} for _ in self.symbol_index]
+        for strategy_id, targets in self.strategy_targets.items():
+            last = self.netted_targets.get(strategy_id)
+            delta = targets if last is None else targets - last
+            for i in np.flatnonzero(delta):
+                allocations[i][strategy_id] = delta[i]
+
+        return np.sum(list(self.strategy_targets.values()), axis=0), allocations
+
+    def commit(self, fractions):
+        """
+        Mark the netted targets as sent
+        :param fractions: array aligned with symbol list, sent share of the change of every symbol,
+                          1 for fully sent or crossed, 0 for rejected, between for reduced
+        """
+        for strategy_id, targets in self.strategy_targets.items():
+            last = self.netted_targets.get(strategy_id)
+            last = np.zeros(len(targets)) if last is None else last
+            self.netted_targets[strategy_id] = last + (targets - last) * fractions
+
 
 class BasicPortfolioHandler(PortfolioHandler):
     """
@@ -58,15 +163,18 @@ class BasicPortfolioHandler(PortfolioHandler):
     BasicPortfolio sends orders to Brokerage object
     """
 
-    # TODO: Risk Management or Position Management
+    # TODO: Position Management
 
-    def __init__(self, bars, events, start_date, initial_capital=1.0e5):
+    def __init__(self, bars, events, start_date, initial_capital=1.0e5, coalesce_signals=False,
+                 risk_manager=None):
         """
         Portfolio Initial Setting using Bars and Events Queue, including start date and initial capital
         :param bars: DataHandler object, current market data
         :param events: Event Queue object
         :param start_date: Portfolio start time
         :param initial_capital: Initial Capital
+        :param coalesce_signals: net all the signals per symbol per timestamp into one order
+        :param risk_manager: RiskManager object, pre-trade checks before orders are sent
         """
         self.bars = bars
         self.events = events
@@ -79,6 +187,14 @@ class BasicPortfolioHandler(PortfolioHandler):
         # TODO: LIST
         self.all_positions = self._construct_all_positions()  # dictionary list
         self.current_positions = {s: 0 for s in self.symbol_list}  # dictionary
+        self.symbol_index = {s: i for i, s in enumerate(self.symbol_list)}
+        self.position_vector = np.zeros(len(self.symbol_list), dtype=np.int64)  # aligned with symbol list
+        # orders sent but not yet filled or cancelled
+        self.working_vector = np.zeros(len(self.symbol_list), dtype=np.int64)  # signed, aligned with symbol list
+        self.working_orders = {}  # key: order_id value: [symbol index, signed unfilled quantity]
+
+        self.multiplier, margin_rate = self._construct_contracts()
+        self.multipliers = dict(zip(self.symbol_list, self.multiplier.tolist()))
 
         self.all_holdings = self._construct_all_holdings()  # dictionary list
         self.current_holdings = self._construct_current_holdings()  # dictionary
@@ -86,6 +202,21 @@ class BasicPortfolioHandler(PortfolioHandler):
         self.all_trades = []
         self.money_day_list = [self.initial_capital]
 
+        self.coalescer = SignalCoalescer(self.symbol_list) if coalesce_signals else None
+        self.attribution = PnLAttribution(self.symbol_list, self.multiplier)
+
+        self.risk_manager = risk_manager
+        if self.risk_manager is not None:
+            self.risk_manager.initialize(self.symbol_list, self.initial_capital, self.multiplier, margin_rate)
+
+    def _construct_contracts(self):
+        """
+        Contract parameters from symbol registry
+        :return: tuple (multiplier array, margin rate array or None), aligned with symbol list
+        """
+        infos = [get_symbol_info(s) for s in self.symbol_list]
+        return np.array([1.0 if info is None else info.multiplier for info in infos]), None
+
     def _construct_all_positions(self):
         """
         Construct position list, its element is dictionary - key: symbol value: 0
@@ -157,14 +288,19 @@ class BasicPortfolioHandler(PortfolioHandler):
         dh['total'] = self.current_holdings['cash']
         for s in self.symbol_list:
             # estimate holdings market value
-            market_value = self.current_positions[s] * bars[s][0][5]
+            market_value = self.current_positions[s] * bars[s][0][5] * self.multipliers[s]
             dh[s] = market_value
             dh['total'] += market_value
 
         self.all_holdings.append(dh)
 
+        prices = [bars[s][0][5] for s in self.symbol_list]
+        self.attribution.mark(self.current_datetime, prices)
+        if self.risk_manager is not None:
+            self.risk_manager.update_market(self.current_datetime, prices, dh['total'])
+
     # (1) Interactive with FillEvent object
-    # Achieve update_fill() via three below tool functions
+    # Achieve update_fill() via below tool functions
 
     def update_positions_from_fill(self, fill):
         """
@@ -176,6 +312,8 @@ class BasicPortfolioHandler(PortfolioHandler):
         fill_dir = 1 if fill.direction == ORDER_BUY else -1
 
         self.current_positions[fill.symbol] += fill_dir * fill.quantity
+        self.position_vector[self.symbol_index[fill.symbol]] += fill_dir * fill.quantity
+        self._reduce_working(fill.order_id, fill_dir * fill.quantity)
 
     def update_holdings_from_fill(self, fill):
         """
@@ -188,7 +326,7 @@ class BasicPortfolioHandler(PortfolioHandler):
 
         # fill_price = self.bars.get_latest_bars(fill.symbol)[0][5]  # close price
         fill_price = fill.fill_price
-        cost = fill_dir * fill_price * fill.quantity
+        cost = fill_dir * fill_price * fill.quantity * self.multipliers[fill.symbol]
 
         self.current_holdings[fill.symbol] += cost
         self.current_holdings['commission'] += fill.commission
@@ -212,22 +350,156 @@ class BasicPortfolioHandler(PortfolioHandler):
 
         self.all_trades.append(current_trade)
 
+    def update_attribution_from_fill(self, fill):
+        """
+        Update pnl attribution from FillEvent object
+        :param fill: FillEvent object
+        :return:
+        """
+        fill_dir = 1 if fill.direction == ORDER_BUY else -1
+        self.attribution.on_fill(fill.symbol, fill_dir * fill.quantity, fill.fill_price, fill.commission,
+                                 fill.strategy_id)
+
     def update_fill(self, event):
         """
         Update portfolio positions and holdings from FillEvent object
-        :param event: FillEvent object
+        :param event: FillEvent or BatchFillEvent object
         """
         if event.type == EVENT_FILL:
             self.update_positions_from_fill(event)
             self.update_holdings_from_fill(event)
             self.update_trades_from_fill(event)
+            self.update_attribution_from_fill(event)
+            if self.risk_manager is not None:
+                self.risk_manager.update_fill(event)
+        elif event.type == EVENT_BATCH_FILL:
+            self.update_batch_fill(event)
+
+    def update_batch_fill(self, fill):
+        """
+        Update portfolio positions and holdings from BatchFillEvent object in array operations
+        :param fill: BatchFillEvent object
+        """
+        index = np.array([self.symbol_index[s] for s in fill.symbols], dtype=np.int64)
+        quantities = fill.signed_quantities()
+
+        self.update_positions_from_batch_fill(index, quantities)
+        for order_id, quantity in zip(fill.order_ids, quantities.tolist()):
+            self._reduce_working(order_id, quantity)
+        self.update_holdings_from_batch_fill(fill, index, quantities)
+        self.all_trades.extend(
+            {'datetime': fill.time_index, 'symbol': s, 'exchange': fill.exchange, 'quantity': q, 'direction': d,
+             'fill_price': p, 'commission': c}
+            for s, q, d, p, c in zip(fill.symbols, fill.quantities.tolist(), fill.directions.tolist(),
+                                     fill.fill_prices.tolist(), fill.commissions.tolist()))
+        self.attribution.on_batch_fill(index, quantities, fill.fill_prices, fill.commissions, fill.strategy_ids)
+        if self.risk_manager is not None:
+            self.risk_manager.update_batch_fill(fill)
+
+    def update_positions_from_batch_fill(self, index, quantities):
+        """
+        Update positions from a batch of deals
+        :param index: symbol index array
+        :param quantities: signed deal quantity array
+        """
+        np.add.at(self.position_vector, index, quantities)
+        for i in np.unique(index):
+            self.current_positions[self.symbol_list[i]] = int(self.position_vector[i])
+
+    def update_holdings_from_batch_fill(self, fill, index, quantities):
+        """
+        Update holdings from a batch of deals
+        :param fill: BatchFillEvent object
+        :param index: symbol index array
+        :param quantities: signed deal quantity array
+        """
+        costs = quantities * fill.fill_prices * self.multiplier[index]
+        symbol_costs = np.bincount(index, costs, minlength=len(self.symbol_list))
+        for i in np.unique(index):
+            self.current_holdings[self.symbol_list[i]] += symbol_costs[i]
 
-    # (2) Interactive with SignalEvent object
+        commission = fill.commissions.sum()
+        self.current_holdings['commission'] += commission
+        self.current_holdings['cash'] -= costs.sum() + commission
+        self.current_holdings['total'] -= commission
+
+    # (2) Working orders: sent orders not yet filled or cancelled, new orders are netted against them
+
+    def _add_working(self, order_event):
+        """
+        Track the legs of a sent order
+        :param order_event: OrderEvent or BatchOrderEvent object
+        """
+        orders = [order_event] if order_event.type == EVENT_ORDER else order_event.orders()
+        for order in orders:
+            i = self.symbol_index[order.symbol]
+            quantity = int(order.quantity) if order.direction == ORDER_BUY else -int(order.quantity)
+            self.working_orders[order.order_id] = [i, quantity]
+            self.working_vector[i] += quantity
+
+    def _reduce_working(self, order_id, quantity):
+        """
+        Take a filled or cancelled quantity off a working order, orders not sent by the portfolio are ignored
+        :param order_id: order_id of the order
+        :param quantity: signed quantity
+        """
+        entry = self.working_orders.get(order_id)
+        if entry is None:
+            return
+        entry[1] -= quantity
+        self.working_vector[entry[0]] -= quantity
+        if entry[1] == 0:
+            del self.working_orders[order_id]
+
+    def update_cancel(self, event):
+        """
+        Release the unfilled part of an order from CancelEvent object
+        :param event: CancelEvent object
+        """
+        if event.type == EVENT_CANCEL and event.order_id in self.working_orders:
+            self._reduce_working(event.order_id, event.quantity if event.direction == ORDER_BUY else -event.quantity)
+            if self.risk_manager is not None:
+                # the order was accepted by risk manager when sent
+                self.risk_manager.cancel_order(event.symbol, event.quantity, event.direction)
+
+    # (3) Pre-trade risk check between order generation and emission
+
+    def _check_risk(self, order_event):
+        """
+        Check every order leg with risk manager
+        :param order_event: OrderEvent or BatchOrderEvent object
+        :return: checked order event, None if all rejected
+        """
+        if order_event.type == EVENT_ORDER:
+            return self.risk_manager.check_order(order_event)
+
+        orders = [order for order in map(self.risk_manager.check_order, order_event.orders()) if order is not None]
+        if not orders:
+            return None
+        return BatchOrderEvent([order.symbol for order in orders], order_event.order_type,
+                               np.array([order.quantity for order in orders]),
+                               np.array([order.direction for order in orders]),
+                               [order.strategy_id for order in orders], [order.order_id for order in orders])
+
+    def _send_order(self, order_event):
+        """
+        Send order event to events queue after risk check
+        :param order_event: OrderEvent or BatchOrderEvent object
+        :return: the order event sent, may be reduced by risk check, None if nothing is sent
+        """
+        if order_event is not None and self.risk_manager is not None:
+            order_event = self._check_risk(order_event)
+        if order_event is None:
+            return None
+        self._add_working(order_event)
+        self.events.put(order_event)
+        return order_event
+
+    # (4) Interactive with SignalEvent object
     # Achieve update_signal() via a tool function: _generate_order()
 
     def _generate_naive_order(self, signal):
         # TODO: the transferring from signal event to order event is too naive
-        # TODO: add risk management
         # TODO: order_type = 'LTD'
         """
 
@@ -240,24 +512,24 @@ class BasicPortfolioHandler(PortfolioHandler):
         direction = signal.signal_type
         mkt_quantity = 1  # future lot
 
-        cur_quantity = self.current_positions[symbol]
+        cur_quantity = self.current_positions[symbol] + self.working_vector[self.symbol_index[symbol]]
         order_type = 'MKT'
 
         if cur_quantity == 0:
             if direction == SIGNAL_LONG:
-                order = OrderEvent(symbol, order_type, mkt_quantity, ORDER_BUY)  # 开多仓
+                order = OrderEvent(symbol, order_type, mkt_quantity, ORDER_BUY, signal.strategy_id)  # 开多仓
             elif direction == SIGNAL_SHORT:
-                order = OrderEvent(symbol, order_type, mkt_quantity, ORDER_SELL)  # 开空仓
+                order = OrderEvent(symbol, order_type, mkt_quantity, ORDER_SELL, signal.strategy_id)  # 开空仓
         elif cur_quantity > 0:
             if direction == SIGNAL_SHORT:
-                order = OrderEvent(symbol, order_type, 2 * mkt_quantity, ORDER_SELL)  # 多翻空
+                order = OrderEvent(symbol, order_type, 2 * mkt_quantity, ORDER_SELL, signal.strategy_id)  # 多翻空
             elif direction == SIGNAL_EXIT:
-                order = OrderEvent(symbol, order_type, mkt_quantity, ORDER_SELL)  # 平多仓
+                order = OrderEvent(symbol, order_type, mkt_quantity, ORDER_SELL, signal.strategy_id)  # 平多仓
         elif cur_quantity < 0:
             if direction == SIGNAL_LONG:
-                order = OrderEvent(symbol, order_type, 2 * mkt_quantity, ORDER_BUY)  # 空翻多
+                order = OrderEvent(symbol, order_type, 2 * mkt_quantity, ORDER_BUY, signal.strategy_id)  # 空翻多
             elif direction == SIGNAL_EXIT:
-                order = OrderEvent(symbol, order_type, mkt_quantity, ORDER_BUY)  # 平空仓
+                order = OrderEvent(symbol, order_type, mkt_quantity, ORDER_BUY, signal.strategy_id)  # 平空仓
         else:
             order = None
 
@@ -269,5 +541,208 @@ class BasicPortfolioHandler(PortfolioHandler):
         :param event: SignalEvent object
         """
         if event.type == EVENT_SIGNAL:
-            order_event = self._generate_naive_order(event)
-            self.events.put(order_event)
+            if self.coalescer is not None:
+                self.coalescer.add_signal(event)
+                return
+            self._send_order(self._generate_naive_order(event))
+
+    def flush_signals(self):
+        """
+        Generate one batch order from the netted signals of current timestamp
+        :return: True if any order is sent
+        """
+        if self.coalescer is None or not self.coalescer.pending:
+            return False
+
+        targets, allocations = self.coalescer.net_targets()
+        self._cross_allocations(targets, allocations)
+
+        order = self._generate_batch_order(targets, allocations)
+        sent = self._send_order(order)
+
+        # netted targets of rejected or reduced legs are sent again with their allocations by later flushes
+        fractions = np.ones(len(self.symbol_list))
+        if order is not None:
+            index = [self.symbol_index[s] for s in order.symbols]
+            fractions[index] = 0.0
+            if sent is not None:
+                ordered = dict(zip(order.symbols, order.quantities))
+                for symbol, quantity in zip(sent.symbols, sent.quantities):
+                    fractions[self.symbol_index[symbol]] = quantity / float(ordered[symbol])
+        self.coalescer.commit(fractions)
+
+        return sent is not None
+
+    # (5) Interactive with TargetEvent object
+    # Achieve update_target() via a tool function: _generate_batch_order()
+
+    def _target_vector(self, targets):
+        """
+        Get target position array aligned with symbol list
+        :param targets: target position array, or dictionary key: symbol value: position
+        :return: target position array, symbol not in dictionary keeps current position and working orders
+        """
+        if isinstance(targets, dict):
+            vector = self.position_vector + self.working_vector
+            for symbol, target in targets.items():
+                vector[self.symbol_index[symbol]] = np.round(target)
+            return vector
+        return np.round(np.asarray(targets, dtype=np.float64)).astype(np.int64)
+
+    def _cross_allocations(self, targets, allocations):
+        """
+        Strategies crossing each other in a symbol need no order, book them at the latest price
+        :param targets: target position array aligned with symbol list
+        :param allocations: allocation list aligned with symbol list
+        """
+        for i in np.flatnonzero(targets == self.position_vector + self.working_vector):
+            if allocations[i]:
+                self.attribution.on_fill(self.symbol_list[i], 0, self.attribution.last_price[i], 0.0, allocations[i])
+
+    def _generate_batch_order(self, targets, strategy_id=None):
+        """
+        Compare target positions with current positions and working orders
+        :param targets: target position array aligned with symbol list
+        :param strategy_id: strategy_id of the targets, or strategy_id list aligned with symbol list
+        :return: BatchOrderEvent object, None if nothing to trade
+        """
+        diff = targets - self.position_vector - self.working_vector
+        legs = np.flatnonzero(diff)
+        if len(legs) == 0:
+            return None
+
+        if isinstance(strategy_id, list):
+            strategy_ids = [strategy_id[i] for i in legs]
+        else:
+            strategy_ids = [strategy_id] * len(legs)
+
+        return BatchOrderEvent([self.symbol_list[i] for i in legs], MARKET_ORDER, np.abs(diff[legs]),
+                               np.where(diff[legs] > 0, ORDER_BUY, ORDER_SELL), strategy_ids)
+
+    def update_target(self, event):
+        """
+        Generate a batch order via TargetEvent object
+        :param event: TargetEvent object
+        """
+        if event.type == EVENT_TARGET:
+            self._send_order(self._generate_batch_order(self._target_vector(event.targets), event.strategy_id))
+
+    def exit_all(self):
+        """
+        Generate a batch order to close all the positions, every strategy closes its own part
+        """
+        targets = np.zeros_like(self.position_vector)
+        allocations = self.attribution.exit_allocations()
+        self._cross_allocations(targets, allocations)
+
+        self._send_order(self._generate_batch_order(targets, allocations))
+
+
+class FuturesPortfolioHandler(BasicPortfolioHandler):
+    """
+    Futures Portfolio Class
+    Market value, margin and available cash are based on contract multiplier, margin rate and daily settlement
+    """
+
+    def __init__(self, bars, events, start_date, initial_capital=1.0e5, coalesce_signals=False,
+                 risk_manager=None, contract_specs=None):
+        """
+        Constructor
+        :param bars: DataHandler object, current market data
+        :param events: Event Queue object
+        :param start_date: Portfolio start time
+        :param initial_capital: Initial Capital
+        :param coalesce_signals: net all the signals per symbol per timestamp into one order
+        :param risk_manager: RiskManager object, pre-trade checks before orders are sent
+        :param contract_specs: dictionary, key: symbol value: ContractSpec
+        """
+        self.contract_specs = contract_specs
+        super(FuturesPortfolioHandler, self).__init__(bars, events, start_date, initial_capital, coalesce_signals,
+                                                      risk_manager)
+
+        # trading day of the symbol with the earliest night session
+        self.session_record = trading_day_record(self.symbol_list)
+        self.settle_date = None  # trading day of the last settlement, days since epoch
+
+        self.all_holdings[0]['margin'] = 0.0
+        self.current_holdings['margin'] = 0.0
+
+    def _construct_contracts(self):
+        """
+        Contract parameters from contract specs, see FuturesAccount
+        """
+        self.account = FuturesAccount(self.symbol_list, self.initial_capital, self.contract_specs)
+        return self.account.multiplier, self.account.margin_rate
+
+    def update_time_index(self):
+        """
+        Track the new holding market value with mark-to-market
+        Daily settlement is made at the first bar of a new trading day, a night session starts the next one
+        :return:
+        """
+        bars = [self.bars.get_latest_bars(s, n=1)[0] for s in self.symbol_list]
+        self.current_datetime = bars[0][1]
+
+        day = trading_day(self.current_datetime, self.session_record)
+        if self.settle_date is None:
+            self.settle_date = day
+        elif day != self.settle_date:
+            self.account.settle()
+            self.settle_date = day
+
+        equity, margin, available = self.account.mark_to_market([bar[5] for bar in bars])
+        self.attribution.mark(self.current_datetime, self.account.last_price)
+        if self.risk_manager is not None:
+            self.risk_manager.update_market(self.current_datetime, self.account.last_price, equity)
+
+        # update positions - dictionary
+        dp = dict(self.current_positions)
+        dp['datetime'] = self.current_datetime
+        self.all_positions.append(dp)
+
+        # update holdings - dictionary
+        dh = dict(zip(self.symbol_list, self.account.market_value.tolist()))
+        dh['datetime'] = self.current_datetime
+        dh['cash'] = available
+        dh['margin'] = margin
+        dh['commission'] = self.account.commission
+        dh['total'] = equity
+        self.all_holdings.append(dh)
+
+        self.current_holdings.update(dh)
+
+    def update_holdings_from_fill(self, fill):
+        """
+        Update account from FillEvent object
+        :param fill: FillEvent object
+        :return:
+        """
+        assert fill.direction in [ORDER_BUY, ORDER_SELL], AssertionError('fill direction error!')
+        fill_dir = 1 if fill.direction == ORDER_BUY else -1
+
+        self.account.apply_fill(fill.symbol, fill_dir * fill.quantity, fill.fill_price, fill.commission)
+
+        i = self.account.symbol_index[fill.symbol]
+        equity, margin, available = self.account.mark_to_market(self.account.last_price)
+
+        self.current_holdings[fill.symbol] = self.account.market_value[i]
+        self.current_holdings['commission'] = self.account.commission
+        self.current_holdings['margin'] = margin
+        self.current_holdings['cash'] = available
+        self.current_holdings['total'] = equity
+
+    def update_holdings_from_batch_fill(self, fill, index, quantities):
+        """
+        Update account from a batch of deals
+        :param fill: BatchFillEvent object
+        :param index: symbol index array
+        :param quantities: signed deal quantity array
+        """
+        self.account.apply_fills(index, quantities, fill.fill_prices, fill.commissions)
+        equity, margin, available = self.account.mark_to_market(self.account.last_price)
+
+        self.current_holdings.update(zip(self.symbol_list, self.account.market_value.tolist()))
+        self.current_holdings['commission'] = self.account.commission
+        self.current_holdings['margin'] = margin
+        self.current_holdings['cash'] = available
+        self.current_holdings['total'] = equity
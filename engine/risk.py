@@ -0,0 +1,217 @@
+# -*- coding: utf-8 -*-
+
+"""
+Risk Management Model
+Pre-trade checks between signal and order emission
+
+@author: Jesse J. Hsu
+@email: jessexu117@outlook.com
+@version: 0.1
+"""
+
+import math
+import numpy as np
+from abc import ABCMeta, abstractmethod
+
+from .constant import ORDER_BUY, ORDER_SELL
+from .data import trading_day, trading_day_record
+
+
+class RiskManager(object):
+    """
+    Risk manager abstract base class
+    """
+    __metaclass__ = ABCMeta
+
+    def initialize(self, symbol_list, initial_capital, multipliers=None, margin_rates=None):
+        """
+        Bind the risk manager to a portfolio
+        :param symbol_list: symbol list
+        :param initial_capital: initial capital
+        :param multipliers: contract multiplier array aligned with symbol list
+        :param margin_rates: margin rate array aligned with symbol list
+        """
+        pass
+
+    @abstractmethod
+    def check_order(self, order):
+        """
+        Check an order before it is sent to execution system
+        :param order: OrderEvent object
+        :return: the order, a reduced order or None if rejected
+        """
+        raise NotImplementedError('function check_order() is not implemented!')
+
+    def update_fill(self, fill):
+        """
+        Update exposure from FillEvent object
+        :param fill: FillEvent object
+        """
+        pass
+
+    def update_batch_fill(self, fill):
+        """
+        Update exposure from BatchFillEvent object
+        :param fill: BatchFillEvent object
+        """
+        for f in fill.fills():
+            self.update_fill(f)
+
+    def cancel_order(self, symbol, quantity, direction):
+        """
+        Remove the unfilled part of an accepted order
+        :param symbol:
+        :param quantity: unfilled quantity, negative when a replace adds quantity
+        :param direction: order direction, including BUY and SELL
+        """
+        pass
+
+    def update_market(self, datetime, prices, equity):
+        """
+        Update exposure from the latest market price
+        :param datetime: mark time
+        :param prices: latest price array aligned with symbol list
+        :param equity: portfolio total value
+        """
+        pass
+
+
+class BasicRiskManager(RiskManager):
+    """
+    Limits on position per symbol, gross/net exposure, margin and daily loss
+    Exposure aggregates are kept running, so an order check is constant-time whatever the number of symbols
+    Orders reducing a position always pass, orders increasing it are cut down to the limit or rejected
+    """
+
+    def __init__(self, max_position=None, max_gross_exposure=None, max_net_exposure=None,
+                 max_margin=None, daily_loss_limit=None):
+        """
+        Constructor, None for no limit
+        :param max_position: max lots per symbol, a number or dictionary key: symbol value: lots
+        :param max_gross_exposure: max sum of absolute notional value
+        :param max_net_exposure: max absolute sum of signed notional value
+        :param max_margin: max margin usage
+        :param daily_loss_limit: max loss of a trading day, new exposure is blocked after that
+        """
+        self.max_position = max_position
+        self.max_gross_exposure = max_gross_exposure
+        self.max_net_exposure = max_net_exposure
+        self.max_margin = max_margin
+        self.daily_loss_limit = daily_loss_limit
+
+        self.rejected = 0
+        self.reduced = 0
+
+    def initialize(self, symbol_list, initial_capital, multipliers=None, margin_rates=None):
+        n = len(symbol_list)
+        self.symbol_index = {s: i for i, s in enumerate(symbol_list)}
+
+        if isinstance(self.max_position, dict):
+            self.position_limit = np.array([self.max_position.get(s, np.inf) for s in symbol_list], dtype=np.float64)
+        else:
+            limit = np.inf if self.max_position is None else self.max_position
+            self.position_limit = np.full(n, limit, dtype=np.float64)
+
+        self.multiplier = np.ones(n) if multipliers is None else np.asarray(multipliers, dtype=np.float64)
+        self.margin_rate = np.ones(n) if margin_rates is None else np.asarray(margin_rates, dtype=np.float64)
+
+        self.committed = np.zeros(n)  # filled position and accepted orders
+        self.price = np.zeros(n)
+
+        self.gross_exposure = 0.0
+        self.net_exposure = 0.0
+        self.margin = 0.0
+
+        self.session_record = trading_day_record(symbol_list)  # a night session starts the next trading day
+        self.trading_date = None  # days since epoch
+        self.day_start_equity = initial_capital
+        self.loss_breached = False
+
+    def _commit(self, i, quantity):
+        """
+        Add an accepted order into running aggregates
+        :param i: symbol index
+        :param quantity: signed order quantity
+        """
+        notional = self.price[i] * self.multiplier[i]
+        c = self.committed[i]
+        self.gross_exposure += (abs(c + quantity) - abs(c)) * notional
+        self.net_exposure += quantity * notional
+        self.margin += (abs(c + quantity) - abs(c)) * notional * self.margin_rate[i]
+        self.committed[i] = c + quantity
+
+    def _position_cap(self, i, quantity):
+        """
+        Max absolute position after the order
+        :param i: symbol index
+        :param quantity: signed order quantity
+        :return: max absolute position
+        """
+        if self.loss_breached:
+            return 0.0
+
+        c = abs(self.committed[i])
+        cap = self.position_limit[i]
+        notional = self.price[i] * self.multiplier[i]
+        if notional > 0:
+            if self.max_gross_exposure is not None:
+                cap = min(cap, c + (self.max_gross_exposure - self.gross_exposure) / notional)
+            if self.max_margin is not None:
+                cap = min(cap, c + (self.max_margin - self.margin) / (notional * self.margin_rate[i]))
+        return cap
+
+    def check_order(self, order):
+        i = self.symbol_index[order.symbol]
+        quantity = order.quantity if order.direction == ORDER_BUY else -order.quantity
+        c = self.committed[i]
+        new = c + quantity
+
+        if abs(new) > abs(c) or new * c < 0:
+            cap = max(self._position_cap(i, quantity), 0.0)
+            new = max(min(new, cap), -cap)
+
+            notional = self.price[i] * self.multiplier[i]
+            if self.max_net_exposure is not None and notional > 0:
+                if quantity > 0:
+                    new = min(new, c + (self.max_net_exposure - self.net_exposure) / notional)
+                else:
+                    new = max(new, c - (self.max_net_exposure + self.net_exposure) / notional)
+
+            # integer lots, rounded towards the committed position
+            allowed = math.floor(new - c) if quantity > 0 else math.ceil(new - c)
+            if allowed * quantity <= 0:
+                self.rejected += 1
+                return None
+            if allowed != quantity:
+                self.reduced += 1
+                order.quantity = abs(allowed)
+                quantity = allowed
+
+        self._commit(i, quantity)
+        return order
+
+    def cancel_order(self, symbol, quantity, direction):
+        """
+        Remove the unfilled part of an accepted order from running aggregates
+        :param symbol:
+        :param quantity: unfilled quantity, negative when a replace adds quantity
+        :param direction: order direction, including BUY and SELL
+        """
+        assert direction in [ORDER_BUY, ORDER_SELL], AssertionError('order direction error!')
+        self._commit(self.symbol_index[symbol], -quantity if direction == ORDER_BUY else quantity)
+
+    def update_market(self, datetime, prices, equity):
+        self.price = np.asarray(prices, dtype=np.float64)
+
+        notional = self.committed * self.price * self.multiplier
+        self.gross_exposure = np.abs(notional).sum()
+        self.net_exposure = notional.sum()
+        self.margin = (np.abs(notional) * self.margin_rate).sum()
+
+        day = trading_day(datetime, self.session_record)
+        if day != self.trading_date:
+            self.trading_date = day
+            self.day_start_equity = equity
+            self.loss_breached = False
+        elif self.daily_loss_limit is not None and self.day_start_equity - equity > self.daily_loss_limit:
+            self.loss_breached = True
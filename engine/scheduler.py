@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+
+"""
+Timed Scheduler
+Actions due at a future time, released in timestamp order as the market data clock moves on
+
+@author: Jesse J. Hsu
+@email: jessexu117@outlook.com
+@version: 0.1
+"""
+
+import heapq
+import itertools
+
+
+class TimedScheduler(object):
+    """
+    Priority queue of timed actions
+    Actions due at the same time run in scheduling order, only due actions are touched when the clock moves
+    """
+
+    def __init__(self):
+        self.queue = []  # heap of (due time, seq, action, args)
+        self.seq = itertools.count()
+
+    def __len__(self):
+        return len(self.queue)
+
+    def schedule(self, time, action, *args):
+        """
+        Schedule an action
+        :param time: due time
+        :param action: callable
+        :param args: arguments of action
+        """
+        heapq.heappush(self.queue, (time, next(self.seq), action, args))
+
+    def next_time(self):
+        """
+        Due time of the earliest action, None if empty
+        """
+        return self.queue[0][0] if self.queue else None
+
+    def run_until(self, now):
+        """
+        Run all the actions due at or before now, including those scheduled by the actions themselves
+        :param now: market data clock
+        :return: number of actions run
+        """
+        n = 0
+        while self.queue and self.queue[0][0] <= now:
+            time, _, action, args = heapq.heappop(self.queue)
+            action(*args)
+            n += 1
+        return n
+
+    def run_all(self):
+        """
+        Run all the actions in timestamp order, including those scheduled by the actions themselves
+        :return: number of actions run
+        """
+        n = 0
+        while self.queue:
+            time, _, action, args = heapq.heappop(self.queue)
+            action(*args)
+            n += 1
+        return n
@@ -8,6 +8,7 @@ Slippage Model
 @version: 0.1
 """
 
+import numpy as np
 from abc import ABCMeta, abstractmethod
 
 
@@ -59,7 +60,37 @@ class FixedPercentSlippage(Slippage):
 class VolumeShareSlippage(Slippage):
     """
     Slippage model with volume of share
+    Fill quantity is limited to a share of bar volume, price impact grows with the square of the share
     """
 
-    def get_trade_price(self, price, direction):
-        pass
+    def __init__(self, volume_limit=0.025, price_impact=0.1):
+        """
+        Constructor
+        :param volume_limit: max share of bar volume to fill
+        :param price_impact: price impact coefficient
+        """
+        self.volume_limit = volume_limit
+        self.price_impact = price_impact
+
+    def get_fill_limit(self, volume):
+        """
+        Get the max fill quantity of a bar
+        :param volume: bar volume, number or array
+        :return: max fill quantity
+        """
+        return np.floor(np.asarray(volume) * self.volume_limit)
+
+    def get_trade_price(self, price, direction, volume_share=0.0):
+        """
+        Get the realized deal price with price impact
+        :param price: the price of signal, number or array
+        :param direction: 'BUY'/'SELL', or array of them
+        :param volume_share: fill quantity / bar volume, number or array
+        :return: deal price
+        """
+        sign = np.where(np.asarray(direction) == 'BUY', 1, -1)
+        return price * (1.0 + sign * self.price_impact * np.square(volume_share))
+
+    def __repr__(self):
+        return '{class_name}(volume_limit={limit}, price_impact={impact})'.format(
+            class_name=self.__class__.__name__, limit=self.volume_limit, impact=self.price_impact)
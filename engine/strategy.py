@@ -10,10 +10,12 @@ Market data by DataHandler -> Strategy -> Signal for Portfolio
 @version: 0.1 
 """
 
-import pandas as pd
+import numpy as np
 from abc import ABCMeta, abstractmethod
 
-from .event import SignalEvent
+from .constant import EVENT_BAR
+from .event import SignalEvent, TargetEvent
+from .indicator import SMA, LaneSMA
 
 
 class Strategy(object):
@@ -37,6 +39,73 @@ class Strategy(object):
         """
         raise NotImplementedError('function calculate_signals() is not implemented!')
 
+    def declare_indicators(self):
+        """
+        Indicators computed by DataHandler over the whole history before backtest,
+        read by bars.get_indicator(name, symbol) during backtest
+        :return: dictionary, key: indicator name value: function of BarArrays returning an array
+                 with shape (times, symbols), eg. {'ma': lambda bars: rolling_mean(bars.close, 10)}
+        """
+        return {}
+
+
+class CrossSectionalStrategy(Strategy):
+    """
+    Cross-sectional strategy abstract base class
+    calculate_cross_section() is called once per timestamp, after the bars of all the symbols arrive,
+    with array views of the timestamp slice and the rolling history
+    """
+    __metaclass__ = ABCMeta
+
+    def __init__(self, bars, portfolio, events, window=1, strategy_id=1):
+        """
+        Constructor
+        :param bars: DataHandler object with bar matrix, eg. CSVDataHandler
+        :param portfolio: Portfolio object
+        :param events: Event queue
+        :param window: bars of history
+        :param strategy_id: strategy_id of targets and signals
+        """
+        self.bars = bars
+        self.portfolio = portfolio
+        self.events = events
+        self.symbol_list = self.bars.symbol_list
+        self.window = window
+        self.strategy_id = strategy_id
+
+    def before_trading(self, event):
+        pass
+
+    def calculate_signals(self, event):
+        """
+        Call calculate_cross_section() at the bar of the last symbol, send its output
+        """
+        if event.type != EVENT_BAR or event.bar[0] != self.symbol_list[-1]:
+            return
+
+        output = self.calculate_cross_section(event.bar[1], self.bars.get_bar_slice(),
+                                              self.bars.get_history(self.window))
+        if output is None:
+            return
+        if isinstance(output, dict) or np.asarray(output).dtype.kind not in 'UO':
+            self.events.put(TargetEvent(event.bar[1], output, self.strategy_id))
+            return
+        for s, signal_type in zip(self.symbol_list, output):
+            if signal_type:
+                self.events.put(SignalEvent(s, event.bar[1], signal_type, self.strategy_id))
+
+    @abstractmethod
+    def calculate_cross_section(self, datetime, current, history):
+        """
+        Calculate targets or signals of all the symbols at once
+        :param datetime: timestamp
+        :param current: array view with shape (symbols, fields), fields: open, high, low, close, volume
+        :param history: array view with shape (window, symbols, fields), the last bar is current
+        :return: target position array aligned with symbol list, or signal array ('LONG'/'SHORT'/'EXIT',
+                 empty for no signal), None for nothing
+        """
+        raise NotImplementedError('function calculate_cross_section() is not implemented!')
+
 
 # example strategy：golden cross
 class MovingAverageCrossStrategy(Strategy):
@@ -44,19 +113,27 @@ class MovingAverageCrossStrategy(Strategy):
     移动双均线策略
     """
 
-    def __init__(self, bars, events, long_window=10, short_window=5):
+    def __init__(self, bars, portfolio, events, long_window=10, short_window=5):
         """
         初始化移动双均线策略
         参数：
         bars：DataHandler类的对象，属性和方法可以具体参考data模块
+        portfolio: Portfolio对象
         events: Event对象
         """
         self.bars = bars
         self.symbol_list = self.bars.symbol_list
+        self.symbol_index = {s: i for i, s in enumerate(self.symbol_list)}
         self.events = events
         self.long_window = long_window  # long tern MA
         self.short_window = short_window  # short term MA
 
+        # 流式均线，每根bar只更新当前品种，O(1)
+        n = len(self.symbol_list)
+        self.long_ma = SMA(long_window, n)
+        self.short_ma = SMA(short_window, n)
+        self.last_diff = np.full(n, np.nan)  # 上一根bar的短期均线 - 长期均线
+
         self.bought = self._calculate_initial_bought()
 
     def _calculate_initial_bought(self):
@@ -81,24 +158,91 @@ class MovingAverageCrossStrategy(Strategy):
         当短期均线（如5日线）上穿长期均线（如10日线），买入
         反之，卖出；不做空
         """
-        if event.type == 'MARKET':
-            for s in self.symbol_list:
-                bars = self.bars.get_latest_bars(s, N=self.long_window)  # 元组的列表
-                if bars is not None and bars != [] and len(bars) >= self.long_window:
-                    # 转换成DataFrame计算，代码量少一些，暂不考虑速度
-                    cols = ['symbol', 'datetime', 'open', 'high', 'low', 'close', 'volume']
-                    df = pd.DataFrame(bars, columns=cols)
-                    df['MA_long'] = df['close'].rolling(center=False, window=self.long_window, min_periods=1).mean()
-                    df['MA_short'] = df['close'].rolling(center=False, window=self.short_window,
-                                                         min_periods=1).mean()
-                    if df['MA_long'].iloc[-1] < df['MA_short'].iloc[-1] and df['MA_long'].iloc[-2] \
-                            > df['MA_short'].iloc[-2] and not self.bought[s]:
-                        signal = SignalEvent(bars[-1][0], bars[-1][1], 'LONG')
-                        self.events.put(signal)
-                        self.bought[s] = True
-
-                    elif df['MA_long'].iloc[-1] > df['MA_short'].iloc[-1] and df['MA_long'].iloc[-2] \
-                            < df['MA_short'].iloc[-2] and self.bought[s]:
-                        signal = SignalEvent(bars[-1][0], bars[-1][1], 'EXIT')
-                        self.events.put(signal)
-                        self.bought[s] = False
+        if event.type == EVENT_BAR:
+            s, dt, close = event.bar[0], event.bar[1], event.bar[5]
+            i = self.symbol_index[s]
+            diff = self.short_ma.update(i, close) - self.long_ma.update(i, close)
+            last_diff, self.last_diff[i] = self.last_diff[i], diff
+
+            if last_diff < 0 < diff and not self.bought[s]:
+                self.events.put(SignalEvent(s, dt, 'LONG'))
+                self.bought[s] = True
+
+            elif last_diff > 0 > diff and self.bought[s]:
+                self.events.put(SignalEvent(s, dt, 'EXIT'))
+                self.bought[s] = False
+
+
+class LaneStrategy(object):
+    """
+    Lane strategy abstract base class
+    One object runs K parameter sets (lanes), state is kept in arrays with shape (lanes, symbols),
+    calculate_targets() is called once per timestamp and updates all the lanes at once
+    """
+    __metaclass__ = ABCMeta
+
+    def __init__(self, bars, params):
+        """
+        Constructor
+        :param bars: DataHandler object with bar matrix, eg. CSVDataHandler
+        :param params: dictionary, key: parameter name value: parameter array of lanes
+        """
+        self.bars = bars
+        self.symbol_list = self.bars.symbol_list
+        self.params = params
+        self.lanes = len(next(iter(params.values())))
+
+    @abstractmethod
+    def calculate_targets(self, datetime, current):
+        """
+        Calculate target positions of all the lanes
+        :param datetime: timestamp
+        :param current: array view with shape (symbols, fields), fields: open, high, low, close, volume
+        :return: target position array with shape (lanes, symbols)
+        """
+        raise NotImplementedError('function calculate_targets() is not implemented!')
+
+
+class MovingAverageCrossLanes(LaneStrategy):
+    """
+    移动双均线策略的多参数版本，参数：long_window, short_window
+    """
+
+    def __init__(self, bars, params):
+        super(MovingAverageCrossLanes, self).__init__(bars, params)
+        n = len(self.symbol_list)
+        self.long_ma = LaneSMA(params['long_window'], n)
+        self.short_ma = LaneSMA(params['short_window'], n)
+        self.last_diff = np.full((self.lanes, n), np.nan)
+        self.targets = np.zeros((self.lanes, n))
+
+    def calculate_targets(self, datetime, current):
+        close = current[:, 3]
+        diff = self.short_ma.update(close) - self.long_ma.update(close)
+
+        self.targets[(self.last_diff < 0) & (diff > 0)] = 1
+        self.targets[(self.last_diff > 0) & (diff < 0)] = 0
+        self.last_diff = diff
+        return self.targets
+
+
+# example strategy：cross-sectional momentum
+class CrossSectionalMomentumStrategy(CrossSectionalStrategy):
+    """
+    横截面动量策略：每个时点做多过去window根bar涨幅最高的k个品种，做空涨幅最低的k个品种
+    """
+
+    def __init__(self, bars, portfolio, events, window=60, k=1, lot=1):
+        super(CrossSectionalMomentumStrategy, self).__init__(bars, portfolio, events, window)
+        self.k = k
+        self.lot = lot
+
+    def calculate_cross_section(self, datetime, current, history):
+        if len(history) < self.window:
+            return None
+        momentum = history[-1, :, 3] / history[0, :, 3] - 1.0
+        rank = np.argsort(momentum)
+        targets = np.zeros(len(self.symbol_list), dtype=np.int64)
+        targets[rank[-self.k:]] = self.lot
+        targets[rank[:self.k]] = -self.lot
+        return targets
@@ -0,0 +1,211 @@
+# -*- coding: utf-8 -*-
+
+"""
+Parameter Sweep
+Headless backtests of a parameter grid run across a process pool. Market data is parsed once in the parent
+and shared read only with the workers, copy-on-write or in shared memory. Results are streamed into a summary
+table as runs complete
+
+@author: Jesse J. Hsu
+@email: jessexu117@outlook.com
+@version: 0.1
+"""
+
+import logging
+import traceback
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+
+import pandas as pd
+
+from .backtest import Backtest
+from .data import CSVDataHandler, SharedCSVDataHandler, csv_data_cache, preload_csv_data, publish_bar_data, \
+    shared_bar_specs
+
+STATUS_OK = 'OK'
+STATUS_ERROR = 'ERROR'
+
+
+def _init_worker(frames, specs):
+    """
+    Worker initializer: quiet logging, and fill the csv data cache and shared bar specs when they are not inherited
+    by fork
+    :param frames: dictionary, key: file path value: DataFrame, None when inherited
+    :param specs: dictionary of published shared memory bar data, see shared_bar_specs, None when inherited
+    """
+    logging.disable(logging.INFO)
+    if frames:
+        csv_data_cache.update(frames)
+    if specs:
+        shared_bar_specs.update(specs)
+
+
+def run_backtest(task):
+    """
+    Run one headless backtest, errors are returned instead of raised
+    :param task: tuple (run id, Backtest argument dictionary, strategy parameter dictionary, keep equity curve)
+    :return: tuple (run id, status, metrics dictionary or error message)
+    """
+    run_id, config, params, keep_equity = task
+    try:
+        kwargs = dict(config)
+        kwargs.update(params)
+        backtest = Backtest(headless=True, **kwargs)
+        _, holdings = backtest.simulate_trading()
+        metrics = dict(backtest.metrics)
+        if keep_equity:
+            metrics['equity'] = holdings['total']
+        return run_id, STATUS_OK, metrics
+    except Exception:
+        return run_id, STATUS_ERROR, traceback.format_exc()
+
+
+class SweepRunner(object):
+    """
+    Process pool parameter sweep over Backtest
+    """
+
+    def __init__(self, data_dir, symbol_list, initial_capital, start_date, end_date, strategy, params,
+                 data_handler=CSVDataHandler, execution_handler=None, portfolio_handler=None,
+                 max_workers=None, retries=1, keep_equity=False, **backtest_params):
+        """
+        Constructor
+        :param data_dir:
+        :param symbol_list:
+        :param initial_capital:
+        :param start_date:
+        :param end_date:
+        :param strategy: Strategy class
+        :param params: list of strategy parameter dictionaries, see param_grid(), may also override Backtest
+                       parameters such as start_date and end_date
+        :param data_handler: DataHandler class, csv files are preloaded for CSVDataHandler, and published into
+                             shared memory for the sweep for SharedCSVDataHandler
+        :param execution_handler: ExecutionHandler class, default SimulatedExecutionHandler
+        :param portfolio_handler: PortfolioHandler class, default BasicPortfolioHandler
+        :param max_workers: number of worker processes, default cpu count
+        :param retries: times to rerun unfinished runs after a worker process dies
+        :param keep_equity: return the equity curve of every run, in the 'equity' column
+        :param backtest_params: other Backtest parameters, eg. commission_type, portfolio_params
+        """
+        from .execution import SimulatedExecutionHandler
+        from .portfolio import BasicPortfolioHandler
+
+        self.data_dir = data_dir
+        self.symbol_list = symbol_list
+        self.params = list(params)
+        self.max_workers = max_workers
+        self.retries = retries
+        self.keep_equity = keep_equity
+
+        self.config = dict(backtest_params)
+        self.config.update(data_dir=data_dir, symbol_list=symbol_list, initial_capital=initial_capital,
+                           heartbeat=0.0, start_date=start_date, end_date=end_date, data_handler=data_handler,
+                           execution_handler=execution_handler or SimulatedExecutionHandler,
+                           portfolio_handler=portfolio_handler or BasicPortfolioHandler, strategy=strategy)
+
+        self.results = {}  # key: run id value: summary row dictionary
+
+    def _context(self, shared):
+        """
+        Fork shares the parsed data with the workers copy-on-write, other start methods get it once per worker;
+        shared memory data is attached by name
+        """
+        if 'fork' in multiprocessing.get_all_start_methods():
+            return multiprocessing.get_context('fork'), None, None
+        if shared:
+            return multiprocessing.get_context(), None, dict(shared_bar_specs)
+        return multiprocessing.get_context(), dict(csv_data_cache), None
+
+    def _row(self, run_id, status, result):
+        row = dict(self.params[run_id])
+        row.update(run_id=run_id, status=status)
+        if status == STATUS_OK:
+            row.update(result)
+        else:
+            row.update(error=result)
+        return row
+
+    def _execute(self, executors, run_ids):
+        """
+        Run backtests, one executor per run or one shared executor
+        :return: generator of tuple (run id, summary row dictionary, None if the worker process died)
+        """
+        futures = {}
+        for k, run_id in enumerate(run_ids):
+            executor = executors[k % len(executors)]
+            futures[executor.submit(run_backtest, (run_id, self.config, self.params[run_id], self.keep_equity))] = run_id
+        for future in as_completed(futures):
+            try:
+                yield futures[future], self._row(*future.result())
+            except BrokenProcessPool:
+                yield futures[future], None
+
+    def iter_results(self):
+        """
+        Run the sweep, rows are yielded as runs complete
+        Finished rows are kept when a worker process dies; the unfinished runs are rerun up to retries times,
+        each in its own process, so a crashing parameter set cannot take others down again
+        :return: generator of summary row dictionaries
+        """
+        data_handler = self.config['data_handler']
+        shared = issubclass(data_handler, SharedCSVDataHandler)
+        store = publish_bar_data(self.data_dir, self.symbol_list) if shared else None
+        if data_handler is CSVDataHandler:
+            preload_csv_data(self.data_dir, self.symbol_list)
+        context, frames, specs = self._context(shared)
+        workers = self.max_workers or multiprocessing.cpu_count()
+
+        def pool(n):
+            return ProcessPoolExecutor(n, mp_context=context, initializer=_init_worker, initargs=(frames, specs))
+
+        try:
+            pending = [run_id for run_id in range(len(self.params)) if run_id not in self.results]
+            for attempt in range(self.retries + 1):
+                broken = []
+                # the first attempt shares one pool, reruns are isolated
+                if attempt == 0:
+                    batches = [pending]
+                else:
+                    batches = [pending[k:k + workers] for k in range(0, len(pending), workers)]
+                for batch in batches:
+                    executors = [pool(workers)] if attempt == 0 else [pool(1) for _ in batch]
+                    try:
+                        for run_id, row in self._execute(executors, batch):
+                            if row is None:
+                                broken.append(run_id)
+                                continue
+                            self.results[run_id] = row
+                            yield row
+                    finally:
+                        for executor in executors:
+                            executor.shutdown(wait=False, cancel_futures=True)
+                pending = sorted(broken)
+                if not pending:
+                    return
+
+            for run_id in pending:
+                row = self.results[run_id] = self._row(run_id, STATUS_ERROR, 'worker process died')
+                yield row
+        finally:
+            # the shared memory data lives as long as the sweep
+            if store is not None:
+                store.release()
+
+    def run(self, callback=None):
+        """
+        Run the sweep
+        :param callback: function called with every summary row as runs complete
+        :return: summary DataFrame, one row per parameter set in grid order
+        """
+        for row in self.iter_results():
+            if callback is not None:
+                callback(row)
+        return self.summary()
+
+    def summary(self):
+        """
+        Summary table of the finished runs
+        """
+        return pd.DataFrame([self.results[run_id] for run_id in sorted(self.results)]).set_index('run_id') \
+            if self.results else pd.DataFrame()
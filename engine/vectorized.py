@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+
+"""
+Vectorized Backtest
+Positions, fills, equity curve and metrics of a whole history computed in array operations,
+for fast pre-screening of strategy ideas. The event-driven Backtest stays the source of truth,
+check_conformance() runs both engines on the example strategy and compares the results
+
+@author: Jesse J. Hsu
+@email: jessexu117@outlook.com
+@version: 0.1
+"""
+
+from collections import namedtuple
+
+import numpy as np
+
+from .cost import CostTable
+from .indicator import rolling_mean
+from ..utils.symbol import get_symbol_info
+
+
+VectorizedResult = namedtuple('VectorizedResult', ('positions', 'trades', 'fill_prices', 'commissions', 'equity',
+                                                   'metrics'))
+
+
+def signals_to_targets(signals, lot=1):
+    """
+    Target positions from a signal array, as the basic portfolio handles LONG, SHORT and EXIT signals
+    :param signals: array with shape (times, symbols), 1 for LONG, -1 for SHORT, 0 for EXIT, NaN for no signal
+    :param lot: future lot of a signal
+    :return: target position array with shape (times, symbols)
+    """
+    signals = np.asarray(signals, dtype=np.float64)
+    rows = np.where(np.isnan(signals), 0, np.arange(len(signals))[:, None])
+    np.maximum.accumulate(rows, axis=0, out=rows)
+    targets = signals[rows, np.arange(signals.shape[1])]
+    return np.nan_to_num(targets) * lot
+
+
+def performance(equity, periods=252 * 4 * 60):
+    """
+    Metrics of an equity curve, same as Backtest._output_performance()
+    :param equity: equity array
+    :param periods: backtest time scale, period = 252 (day) or 252*4*60 (minute)
+    :return: dictionary, key: 'return', 'sharpe', 'max_drawdown'
+    """
+    returns = np.diff(equity) / equity[:-1]
+    curve = equity / equity[0]
+    drawdown = curve / np.maximum.accumulate(curve) - 1
+    std = returns.std()
+    return {'return': curve[-1] - 1,
+            'sharpe': np.sqrt(periods) * returns.mean() / std if std > 0 else np.nan,
+            'max_drawdown': drawdown.min()}
+
+
+class VectorizedBacktest(object):
+    """
+    Vectorized backtest engine
+    Follows SimulatedExecutionHandler and BasicPortfolioHandler: orders are filled at the close of the signal bar
+    with the same cost table, holdings of a bar are marked before the fills of the bar, and all the positions are
+    closed at the last bar
+    """
+
+    def __init__(self, symbol_list, initial_capital, commission_type='default', slippage_type='fixed',
+                 cost_config=None, periods=252 * 4 * 60):
+        """
+        Constructor
+        :param symbol_list: symbol list
+        :param initial_capital: initial capital
+        :param commission_type: commission model, zero or default
+        :param slippage_type: slippage model, fixed or zero
+        :param cost_config: commission and slippage parameters, see CostTable
+        :param periods: backtest time scale of metrics
+        """
+        self.symbol_list = list(symbol_list)
+        self.initial_capital = initial_capital
+        self.cost_table = CostTable(self.symbol_list, cost_config, commission_type, slippage_type)
+        self.periods = periods
+
+        infos = [get_symbol_info(s) for s in self.symbol_list]
+        self.multiplier = np.array([1.0 if info is None else info.multiplier for info in infos])
+
+    def run(self, close, targets=None, signals=None, lot=1):
+        """
+        Run the backtest
+        :param close: close price array with shape (times, symbols)
+        :param targets: target position array with shape (times, symbols), reached at the close of the bar
+        :param signals: signal array instead of targets, see signals_to_targets()
+        :param lot: future lot of a signal
+        :return: VectorizedResult, positions with shape (times, symbols), equity with shape (times,),
+                 trades, fill prices and commissions with shape (times + 1, symbols), the last row is the close out
+        """
+        assert (targets is None) != (signals is None), AssertionError('either targets or signals is required!')
+        close = np.asarray(close, dtype=np.float64)
+        if targets is None:
+            targets = signals_to_targets(signals, lot)
+        positions = np.round(np.asarray(targets, dtype=np.float64))
+        assert positions.shape == close.shape, AssertionError('targets shape error!')
+
+        # the close out is an extra row of trades at the last close
+        trades = np.diff(positions, axis=0, prepend=0.0, append=0.0)
+        prices = np.vstack([close, close[-1:]])
+
+        index = np.broadcast_to(np.arange(len(self.symbol_list)), trades.shape)
+        quantities = np.abs(trades)
+        fill_prices, commissions = self.cost_table.fill_batch(index, prices, quantities, np.sign(trades))
+        commissions = np.where(quantities > 0, commissions, 0.0)
+
+        # cash after the fills of every bar
+        cash = self.initial_capital - np.cumsum((trades * fill_prices * self.multiplier).sum(axis=1) +
+                                                commissions.sum(axis=1))
+
+        # holdings of a bar: cash and positions before its fills, marked at its close
+        equity = np.empty(len(close))
+        equity[0] = self.initial_capital
+        equity[1:] = cash[:-2] + (positions[:-1] * close[1:] * self.multiplier).sum(axis=1)
+        equity[-1] = cash[-1]
+
+        metrics = performance(np.r_[self.initial_capital, equity], self.periods)
+        metrics.update(trades=int(np.count_nonzero(trades)), commission=commissions.sum())
+        return VectorizedResult(positions, trades, fill_prices, commissions, equity, metrics)
+
+
+def moving_average_cross_signals(close, long_window=10, short_window=5):
+    """
+    Signals of MovingAverageCrossStrategy: LONG when the short MA crosses above the long MA, EXIT when below
+    :param close: close price array with shape (times, symbols)
+    :return: signal array, see signals_to_targets()
+    """
+    diff = rolling_mean(close, short_window) - rolling_mean(close, long_window)
+    last_diff = np.full_like(diff, np.nan)
+    last_diff[1:] = diff[:-1]
+
+    signals = np.full_like(diff, np.nan)
+    signals[(last_diff < 0) & (diff > 0)] = 1.0
+    signals[(last_diff > 0) & (diff < 0)] = 0.0
+    return signals
+
+
+def check_conformance(data_dir, symbol_list, start_date, end_date, initial_capital=1.0e6, long_window=10,
+                      short_window=5, commission_type='default', slippage_type='fixed'):
+    """
+    Conformance check of the vectorized engine with the event-driven Backtest on MovingAverageCrossStrategy
+    :return: tuple (event-driven equity array, vectorized equity array), AssertionError raised on mismatch
+    """
+    from .backtest import Backtest
+    from .data import CSVDataHandler
+    from .execution import SimulatedExecutionHandler
+    from .portfolio import BasicPortfolioHandler
+    from .strategy import MovingAverageCrossStrategy
+
+    backtest = Backtest(data_dir, symbol_list, initial_capital, 0.0, start_date, end_date, CSVDataHandler,
+                        SimulatedExecutionHandler, BasicPortfolioHandler, MovingAverageCrossStrategy,
+                        commission_type=commission_type, slippage_type=slippage_type,
+                        long_window=long_window, short_window=short_window)
+    _, holdings = backtest.simulate_trading()
+    expected = holdings['total'].values[1:]
+
+    close = backtest.data_handler.bar_arrays.close
+    engine = VectorizedBacktest(symbol_list, initial_capital, commission_type, slippage_type)
+    result = engine.run(close, signals=moving_average_cross_signals(close, long_window, short_window))
+
+    assert len(expected) == len(result.equity), AssertionError('equity length mismatch!')
+    assert np.allclose(expected, result.equity), AssertionError('equity mismatch!')
+    assert len(backtest.portfolio_handler.all_trades) == result.metrics['trades'], AssertionError('trades mismatch!')
+    return expected, result.equity
@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+
+"""
+Walk-Forward Analysis
+The bar index is split into rolling (or anchored) in-sample and out-of-sample windows; every in-sample window
+is optimized over a parameter grid, the best parameters are tested out of sample, and the out-of-sample
+equity curves are stitched. All the windows run in parallel in a process pool
+
+@author: Jesse J. Hsu
+@email: jessexu117@outlook.com
+@version: 0.1
+"""
+
+import queue
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from .data import CSVDataHandler, preload_csv_data
+from .sweep import SweepRunner, STATUS_OK
+
+WalkForwardResult = namedtuple('WalkForwardResult', ('windows', 'equity'))
+
+
+class WalkForward(object):
+    """
+    Walk-forward driver over Backtest
+    Data is parsed once; windows are bar index ranges of the loaded data, every window backtest slices the
+    cached data by the datetimes of its bounds instead of reading files again
+    """
+
+    def __init__(self, data_dir, symbol_list, initial_capital, start_date, end_date, strategy, params,
+                 train_bars, test_bars, step=None, anchored=False, objective='sharpe', max_workers=None,
+                 **backtest_params):
+        """
+        Constructor
+        :param data_dir:
+        :param symbol_list:
+        :param initial_capital:
+        :param start_date:
+        :param end_date:
+        :param strategy: Strategy class
+        :param params: list of strategy parameter dictionaries to optimize in sample, see param_grid()
+        :param train_bars: bars of an in-sample window
+        :param test_bars: bars of an out-of-sample window
+        :param step: bars between windows, default test_bars; at least test_bars, so out-of-sample windows
+                     do not overlap in the stitched equity curve
+        :param anchored: in-sample windows all start at the first bar
+        :param objective: in-sample metric to maximize
+        :param max_workers: number of worker processes
+        :param backtest_params: other SweepRunner and Backtest parameters
+        """
+        assert train_bars > 0 and test_bars > 0, AssertionError('window size error!')
+        assert step is None or step >= test_bars, AssertionError('window step less than test bars!')
+        self.data_dir = data_dir
+        self.symbol_list = symbol_list
+        self.initial_capital = initial_capital
+        self.start_date = start_date
+        self.end_date = end_date
+        self.strategy = strategy
+        self.params = list(params)
+        self.train_bars = train_bars
+        self.test_bars = test_bars
+        self.step = step or test_bars
+        self.anchored = anchored
+        self.objective = objective
+        self.max_workers = max_workers
+        self.backtest_params = backtest_params
+
+        data_handler = backtest_params.get('data_handler', CSVDataHandler)
+        if data_handler is CSVDataHandler:
+            preload_csv_data(data_dir, symbol_list)
+        handler = data_handler(queue.Queue(), symbol_list, start_date, end_date, data_dir)
+        self.index = handler.bar_arrays.datetime
+
+    def windows(self):
+        """
+        Window bounds by bar index
+        :return: list of tuple (train start, train end, test start, test end), end excluded
+        """
+        windows = []
+        start = 0
+        while start + self.train_bars < len(self.index):
+            train_end = start + self.train_bars
+            windows.append((0 if self.anchored else start, train_end, train_end,
+                            min(train_end + self.test_bars, len(self.index))))
+            start += self.step
+        return windows
+
+    def _dates(self, begin, end):
+        """
+        Backtest date range of bar index range [begin, end)
+        """
+        return {'start_date': self.index[begin].to_pydatetime(), 'end_date': self.index[end - 1].to_pydatetime()}
+
+    def _runner(self, params, keep_equity=False):
+        return SweepRunner(self.data_dir, self.symbol_list, self.initial_capital, self.start_date, self.end_date,
+                           self.strategy, params, max_workers=self.max_workers, keep_equity=keep_equity,
+                           **self.backtest_params)
+
+    def run(self):
+        """
+        Optimize every in-sample window and test the best parameters out of sample
+        :return: WalkForwardResult, windows is a DataFrame with one row per window,
+                 equity is the stitched out-of-sample equity Series
+        """
+        windows = self.windows()
+        assert windows, AssertionError('not enough bars for a window!')
+
+        # in sample: every parameter set of every window in one pool
+        tasks = []
+        for w, (train_start, train_end, _, _) in enumerate(windows):
+            for k, p in enumerate(self.params):
+                task = dict(p)
+                task.update(self._dates(train_start, train_end))
+                tasks.append((w, k, task))
+        in_sample = self._runner([task for _, _, task in tasks]).run()
+
+        best = {}
+        for (w, k, _), (_, row) in zip(tasks, in_sample.iterrows()):
+            score = row.get(self.objective, np.nan) if row['status'] == STATUS_OK else np.nan
+            if not np.isnan(score) and (w not in best or score > best[w][1]):
+                best[w] = (k, score)
+
+        # out of sample: the best parameter set of every window in one pool
+        tested = sorted(best)
+        tests = []
+        for w in tested:
+            task = dict(self.params[best[w][0]])
+            task.update(self._dates(windows[w][2], windows[w][3]))
+            tests.append(task)
+        out_sample = self._runner(tests, keep_equity=True).run() if tests else pd.DataFrame()
+
+        rows, curves = [], []
+        value = float(self.initial_capital)
+        for w, (train_start, train_end, test_start, test_end) in enumerate(windows):
+            row = {'window': w, 'train_start': self.index[train_start], 'train_end': self.index[train_end - 1],
+                   'test_start': self.index[test_start], 'test_end': self.index[test_end - 1]}
+            if w in best:
+                k, score = best[w]
+                result = out_sample.iloc[tested.index(w)]
+                row.update(self.params[k])
+                row.update(in_sample_score=score, status=result['status'])
+                if result['status'] == STATUS_OK:
+                    row.update({'oos_' + key: result[key] for key in ('return', 'sharpe', 'max_drawdown', 'fills')})
+                    # chain the window curve onto the end of the previous one
+                    curve = result['equity'] / self.initial_capital * value
+                    value = curve.iloc[-1]
+                    curves.append(curve)
+            rows.append(row)
+
+        equity = pd.concat(curves) if curves else pd.Series(dtype=np.float64)
+        return WalkForwardResult(pd.DataFrame(rows).set_index('window'), equity)
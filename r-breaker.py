@@ -21,17 +21,12 @@ R-Breaker交易系统：
 """
 
 import os
+import numpy as np
 from datetime import *
 
-try:
-    from WindPy import *
-except ImportError:
-    pass
-else:
-    w.start()
-    w.isconnected()
-
 from gquant import SignalEvent, Strategy, CSVDataHandler, SimulatedExecutionHandler, Backtest, BasicPortfolioHandler
+from gquant.engine.kernels import rbreaker_positions
+from gquant.engine.data import trading_days
 
 
 class RBreaker(Strategy):
@@ -47,7 +42,6 @@ class RBreaker(Strategy):
     trading_today = True
 
     lst_dominant = []
-    price_list = []
     trade_count = 0
     current_position = {}
 
@@ -74,21 +68,6 @@ class RBreaker(Strategy):
         self.trend = True
         self.revert = False
 
-        self._data_preprocessor()
-
-    def _data_preprocessor(self):
-        """
-        
-        :return: 
-        """
-        lst_date1 = self.bars.start_date - timedelta(days=1)
-        lst_date2 = self.bars.end_date - timedelta(days=1)
-        data = w.wsd(self.future, "close,high,low", lst_date1, lst_date2)
-
-        self.close_lst = data.Data[0]
-        self.high_lst = data.Data[1]
-        self.low_lst = data.Data[2]
-
         self.day_first_capital = self.portfolio.current_holdings['total']
 
         self.current_position = {s: 0 for s in self.symbol_list}
@@ -132,24 +111,22 @@ class RBreaker(Strategy):
 
             return True
 
-    def before_trading(self):
+    def before_trading(self, event):
         """
 
         :return:
         """
-        # 用于临时储存当天的价格序列
-        self.price_list = []
-
         # 初始化每天交易次数
         self.trade_count = 0
 
-        # 获取前一个交易日K线数据
-        close = self.close_lst.pop(0)
-        high = self.high_lst.pop(0)
-        low = self.low_lst.pop(0)
+        # 获取前一个交易日K线数据，首个交易日没有前日数据，不交易
+        session = self.bars.get_session(self.future)
+        close = session.prev_close
+        high = session.prev_high
+        low = session.prev_low
 
         # 判断前日波幅
-        self.trading_today = False if high - low < self.swing_threshold else True
+        self.trading_today = False if np.isnan(close) or high - low < self.swing_threshold else True
 
         # 计算六个价位
         self.bsetup = low - self.f1 * (high - close)  # 观察买入价
@@ -192,9 +169,10 @@ class RBreaker(Strategy):
         if bar[1].hour < 15:
             lst_price = bar[5]
 
-            self.price_list.append(lst_price)
-            day_high = max(self.price_list)
-            day_low = min(self.price_list)
+            # 日内最高价和最低价
+            session = self.bars.get_session(self.future)
+            day_high = session.high
+            day_low = session.low
 
             # 判断是否空仓
             flat_condition = (position == 0)
@@ -263,6 +241,47 @@ class RBreaker(Strategy):
                 print('止损')
 
 
+class RBreakerKernel(Strategy):
+    """
+    R-Breaker via kernel: target positions of the whole history are computed at load time by
+    rbreaker_positions(), compiled by numba when installed. No stop loss, as it depends on the account
+    """
+
+    def __init__(self, bars, portfolio, events, f1=0.35, f2=0.07, f3=0.25, swing_threshold=0, trade_per_day=5,
+                 trend=True, revert=False):
+        self.bars = bars
+        self.symbol_list = self.bars.symbol_list
+        self.portfolio = portfolio
+        self.events = events
+
+        self.params = (f1, f2, f3, swing_threshold, trade_per_day, trend, revert)
+        self.position = {s: 0 for s in self.symbol_list}
+
+    def declare_indicators(self):
+        return {'rbreaker': self._positions}
+
+    def _positions(self, bars):
+        # sessions are trading days, as get_session() of RBreaker
+        hours = bars.datetime.hour.values
+        return np.stack([rbreaker_positions(trading_days(bars.datetime.values, self.bars.get_symbol_info(s)), hours,
+                                            bars.high[:, k], bars.low[:, k], bars.close[:, k], *self.params)
+                         for k, s in enumerate(self.symbol_list)], axis=1)
+
+    def before_trading(self, event):
+        pass
+
+    def calculate_signals(self, event):
+        symbol = event.bar[0]
+        target = self.bars.get_indicator('rbreaker', symbol)
+        if target == self.position[symbol]:
+            return
+        if self.position[symbol] != 0:
+            self.events.put(SignalEvent(symbol, event.bar[1], 'EXIT'))
+        if target != 0:
+            self.events.put(SignalEvent(symbol, event.bar[1], 'LONG' if target > 0 else 'SHORT'))
+        self.position[symbol] = target
+
+
 if __name__ == '__main__':
     csv_dir = os.path.join(os.path.dirname(os.getcwd()), 'r-breaker')
     # print(csv_dir)
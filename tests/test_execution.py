@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+
+"""
+Tests of the simulated execution handlers
+"""
+
+import logging
+import queue
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from gquant.engine.backtest import Backtest
+from gquant.engine.constant import MARKET_ORDER, ORDER_BUY, ORDER_SELL
+from gquant.engine.data import CSVTickDataHandler
+from gquant.engine.event import OrderEvent, TargetEvent
+from gquant.engine.execution import AsyncExecutionHandler, TickExecutionHandler, VolumeShareExecutionHandler
+from gquant.engine.portfolio import BasicPortfolioHandler
+from gquant.engine.strategy import Strategy
+
+
+@pytest.fixture(autouse=True)
+def no_logging():
+    logging.disable(logging.INFO)
+    yield
+    logging.disable(logging.NOTSET)
+
+
+class BuyOnce(Strategy):
+    """
+    Target a long position at the first tick
+    """
+
+    def __init__(self, bars, portfolio, events, quantity=10):
+        self.events = events
+        self.quantity = quantity
+        self.sent = False
+
+    def before_trading(self, event):
+        pass
+
+    def calculate_signals(self, event):
+        if not self.sent:
+            self.sent = True
+            self.events.put(TargetEvent(event.datetime, {event.symbol: self.quantity}))
+
+
+def test_tick_close_out_beyond_quote_size(tmp_path):
+    times = pd.date_range('2017-01-04 09:00:00', periods=20, freq='15s', name='datetime')
+    bid = 100.0 + np.arange(20)
+    pd.DataFrame({'bid': bid, 'ask': bid + 1, 'bid_size': 3, 'ask_size': 3, 'last': bid, 'volume': 3},
+                 index=times).to_csv(str(tmp_path / 'RU.SHF.csv'))
+
+    backtest = Backtest(str(tmp_path), ['RU.SHF'], 1.0e6, 0.0, datetime(2017, 1, 4), datetime(2017, 1, 5),
+                        CSVTickDataHandler, TickExecutionHandler, BasicPortfolioHandler, BuyOnce,
+                        commission_type='zero', headless=True, quantity=10)
+    _, holdings = backtest.simulate_trading()
+    portfolio = backtest.portfolio_handler
+
+    # the first tick sets the initial quote, 10 lots are bought at 3 per quote from the second one,
+    # then closed out at once beyond the size of the last quote
+    assert portfolio.position_vector.tolist() == [0]
+    assert not portfolio.working_orders
+    assert backtest.trade_record()['quantity'].tolist() == [3, 3, 3, 1, 10]
+    assert backtest.metrics['orders'] == 2 and backtest.metrics['fills'] == 5
+    cost = 102 * 3 + 103 * 3 + 104 * 3 + 105 * 1
+    assert holdings['total'].iloc[-1] == pytest.approx(1.0e6 + (10 * bid[-1] - cost) * portfolio.multiplier[0])
+
+
+def test_async_partial_fills():
+    class Bars(object):
+        symbol_list = ['RU.SHF']
+
+        @staticmethod
+        def get_latest_bars(symbol, n=1):
+            return [('RU.SHF', datetime(2017, 1, 4, 9), 100.0, 100.0, 100.0, 100.0, 10)]
+
+    events = queue.Queue()
+    handler = AsyncExecutionHandler(Bars(), events, slippage_type='zero', commission_type='zero',
+                                    server_params={'fill_size': 2, 'drop_every': 3})
+    try:
+        order = OrderEvent('RU.SHF', MARKET_ORDER, 5, ORDER_BUY)
+        handler.execute_order(order)
+        assert handler.wait_all()
+    finally:
+        handler.close()
+
+    fills = [events.get() for _ in range(events.qsize())]
+    assert [fill.quantity for fill in fills] == [2, 2, 1]
+    assert all(fill.order_id == order.order_id for fill in fills)
+
+
+def test_volume_share_fifo():
+    class Bars(object):
+        symbol_list = ['RU.SHF', 'RB.SHF']
+        volume = {'RU.SHF': 50, 'RB.SHF': 30}
+
+        def get_latest_bars(self, symbol, n=1):
+            return [(symbol, datetime(2017, 1, 4, 9), 100.0, 100.0, 100.0, 100.0, self.volume[symbol])]
+
+    events = queue.Queue()
+    handler = VolumeShareExecutionHandler(Bars(), events, slippage_type='zero', commission_type='zero',
+                                          volume_limit=0.1)
+    handler.execute_order(OrderEvent('RU.SHF', MARKET_ORDER, 3, ORDER_BUY, order_id=1))
+    handler.execute_order(OrderEvent('RB.SHF', MARKET_ORDER, 2, ORDER_BUY, order_id=2))
+    handler.execute_order(OrderEvent('RU.SHF', MARKET_ORDER, 4, ORDER_SELL, order_id=3))
+    handler.execute_order(OrderEvent('RU.SHF', MARKET_ORDER, 1, ORDER_BUY, order_id=4))
+
+    # 5 lots of RU.SHF per bar are allocated to the earliest orders first, RB.SHF is limited to 3 lots
+    handler.update_market()
+    fill = events.get(block=False)
+    assert fill.order_ids == [1, 2, 3]
+    assert fill.quantities.tolist() == [3, 2, 2]
+
+    handler.update_market()
+    fill = events.get(block=False)
+    assert fill.order_ids == [3, 4]
+    assert fill.quantities.tolist() == [2, 1]
+    assert len(handler.work_order_id) == 0 and events.empty()
@@ -0,0 +1,23 @@
+# -*- coding: utf-8 -*-
+
+"""
+Tests of the indicators and the indicator cache
+"""
+
+import sys
+
+import numpy as np
+
+from gquant.engine.indicator import IndicatorCache
+
+
+def test_cache_sizeof_arrays():
+    owner = np.zeros(1000)
+    view = owner[:500]
+    assert IndicatorCache._sizeof(owner) == sys.getsizeof(owner)
+    assert IndicatorCache._sizeof(view) == view.nbytes + sys.getsizeof(view)
+
+    cache = IndicatorCache(max_bytes=10 ** 6)
+    cache.put('owner', owner)
+    cache.put('view', view)
+    assert cache.nbytes == sys.getsizeof(owner) + view.nbytes + sys.getsizeof(view)
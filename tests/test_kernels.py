@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+
+"""
+Tests of the kernels, both the compiled kernels and their pure Python source
+"""
+
+import numpy as np
+import pytest
+
+from gquant.engine.kernels import NUMBA_AVAILABLE, python_func, check_kernels
+from gquant.engine.kernels import apply_fills_loop, mark_to_market_loop, rbreaker_positions
+
+compiled = pytest.mark.skipif(not NUMBA_AVAILABLE, reason='numba is not installed')
+
+
+def kernel_funcs(func):
+    return [pytest.param(python_func(func), id='python'), pytest.param(func, id='numba', marks=compiled)]
+
+
+def rbreaker_bars(closes, highs=None, lows=None, hours=None):
+    """
+    A prior session with high 110, low 90 and close 100, then the given bars in the next session
+    Levels: bsetup 86.5, ssetup 113.5, benter 99.3, senter 100.7, bbreak 120.25, sbreak 79.75
+    """
+    n = len(closes)
+    closes = np.array([105.0, 100.0] + list(closes))
+    highs = np.array([110.0, 100.0] + list(closes[2:] if highs is None else highs))
+    lows = np.array([95.0, 90.0] + list(closes[2:] if lows is None else lows))
+    hours = np.array([9, 10] + list(range(9, 9 + n) if hours is None else hours))
+    days = np.array([0, 0] + [1] * n)
+    return days, hours, highs, lows, closes
+
+
+@pytest.mark.parametrize('func', kernel_funcs(rbreaker_positions))
+def test_rbreaker_trend_exit(func):
+    # above bbreak: long, the next bar is above 0.98 * sbreak: exit, up to trade_per_day trades
+    positions = func(*rbreaker_bars([121.0] * 6), 0.35, 0.07, 0.25, 0.0, 5, True, False)
+    assert positions.tolist() == [0, 0, 1, 0, 1, 0, 0, 0]
+
+    # below sbreak: short, the next bar is below 0.98 * bbreak: exit
+    positions = func(*rbreaker_bars([79.0, 79.0]), 0.35, 0.07, 0.25, 0.0, 5, True, False)
+    assert positions.tolist() == [0, 0, -1, 0]
+
+
+@pytest.mark.parametrize('func', kernel_funcs(rbreaker_positions))
+def test_rbreaker_revert(func):
+    # session high above ssetup, then close below senter: short
+    positions = func(*rbreaker_bars([112.0, 100.0, 100.5], highs=[114.0, 112.0, 101.0]),
+                     0.35, 0.07, 0.25, 0.0, 5, False, True)
+    assert positions.tolist() == [0, 0, 0, -1, -1]
+
+
+@pytest.mark.parametrize('func', kernel_funcs(rbreaker_positions))
+def test_rbreaker_filters(func):
+    # closed from 15:00
+    positions = func(*rbreaker_bars([121.0, 121.0], hours=[14, 15]), 0.35, 0.07, 0.25, 0.0, 1, True, False)
+    assert positions.tolist() == [0, 0, 0, 0]
+    positions = func(*rbreaker_bars([121.0, 121.0], hours=[14, 15]), 0.35, 0.07, 0.25, 0.0, 5, True, False)
+    assert positions.tolist() == [0, 0, 1, 0]
+    # prior swing 20 below swing threshold
+    positions = func(*rbreaker_bars([121.0, 79.0]), 0.35, 0.07, 0.25, 30.0, 5, True, True)
+    assert not positions.any()
+
+
+@pytest.mark.parametrize('func', kernel_funcs(apply_fills_loop))
+def test_apply_fills_loop(func):
+    position, basis = np.zeros(2), np.zeros(2)
+    realized = func(position, basis, np.array([10.0, 5.0]), np.array([0, 1, 0, 0]),
+                    np.array([2.0, -1.0, 2.0, -5.0]), np.array([100.0, 50.0, 103.0, 110.0]))
+    assert np.allclose(realized, [0.0, 0.0, 0.0, 340.0])
+    assert np.allclose(position, [-1.0, -1.0])
+    assert np.allclose(basis, [110.0, 50.0])
+
+
+@pytest.mark.parametrize('func', kernel_funcs(mark_to_market_loop))
+def test_mark_to_market_loop(func):
+    market_value, unrealized, margin = np.zeros(2), np.zeros(2), np.zeros(2)
+    totals = func(np.array([2.0, -1.0]), np.array([100.0, 50.0]), np.array([101.0, 48.0]), np.array([10.0, 5.0]),
+                  np.array([0.1, 0.2]), market_value, unrealized, margin)
+    assert np.allclose(totals, (30.0, 250.0))
+    assert np.allclose(market_value, [2020.0, -240.0])
+    assert np.allclose(unrealized, [20.0, 10.0])
+    assert np.allclose(margin, [202.0, 48.0])
+
+
+def test_check_kernels():
+    assert check_kernels(n=1000, seed=1)
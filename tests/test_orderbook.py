@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+
+"""
+Tests of the order book: price levels, lazy cancel, replace, stop triggers and quote matching
+"""
+
+from gquant.engine.constant import ORDER_BUY, ORDER_SELL, LIMITED_ORDER, STOP_ORDER
+from gquant.engine.constant import STATUS_ACTIVE, STATUS_PARTIAL, STATUS_FILLED, STATUS_CANCELLED
+from gquant.engine.orderbook import Order, OrderBook, SimulatedExchange
+
+
+def limit(order_id, direction, quantity, price):
+    return Order(order_id, 'RU.SHF', LIMITED_ORDER, direction, quantity, price)
+
+
+def fill_list(fills):
+    return [(order.order_id, quantity, price) for order, quantity, price in fills]
+
+
+def test_best_price_and_fifo():
+    book = OrderBook('RU.SHF')
+    book.add(limit(1, ORDER_BUY, 2, 100))
+    book.add(limit(2, ORDER_BUY, 2, 102))
+    book.add(limit(3, ORDER_BUY, 2, 102))
+    book.add(limit(4, ORDER_BUY, 2, 101))
+    assert book.best_bid() == 102
+
+    # best level first, earliest order first within a level
+    fills = book.match_bar(103, 103, 100, volume=5)
+    assert fill_list(fills) == [(2, 2, 102), (3, 2, 102), (4, 1, 101)]
+    assert book.best_bid() == 101
+    assert book.orders[4].status == STATUS_PARTIAL
+    assert 2 not in book.orders and 3 not in book.orders
+
+
+def test_open_through_limit():
+    book = OrderBook('RU.SHF')
+    book.add(limit(1, ORDER_SELL, 1, 100))
+    assert fill_list(book.match_bar(103, 104, 102)) == [(1, 1, 103)]
+
+
+def test_lazy_cancel():
+    book = OrderBook('RU.SHF')
+    book.add(limit(1, ORDER_SELL, 3, 101))
+    book.add(limit(2, ORDER_SELL, 3, 100))
+    book.add(limit(3, ORDER_SELL, 3, 100))
+
+    order = book.cancel(2)
+    assert order.status == STATUS_CANCELLED
+    assert book.cancel(2) is None
+    assert book.best_ask() == 100
+    assert book.ask_levels[100].quantity == 3
+
+    book.cancel(3)
+    # the empty level is dropped on the next best price lookup
+    assert book.best_ask() == 101
+    assert 100 not in book.ask_levels
+    assert fill_list(book.match_bar(100, 101, 99)) == [(1, 3, 101)]
+    assert len(book) == 0
+
+
+def test_replace_priority():
+    book = OrderBook('RU.SHF')
+    book.add(limit(1, ORDER_BUY, 4, 100))
+    book.add(limit(2, ORDER_BUY, 4, 100))
+
+    # reducing quantity keeps the queue priority
+    order = book.replace(1, quantity=2)
+    assert order is book.orders[1] and order.quantity == 2
+    assert book.bid_levels[100].quantity == 6
+    assert fill_list(book.match_bar(100, 100, 100, volume=1)) == [(1, 1, 100)]
+
+    # adding quantity loses it, the filled part and the status are kept
+    order = book.replace(1, quantity=5)
+    assert order.filled == 1 and order.status == STATUS_PARTIAL
+    assert book.bid_levels[100].quantity == 8
+    assert fill_list(book.match_bar(100, 100, 100, volume=5)) == [(2, 4, 100), (1, 1, 100)]
+
+    # changing price moves it to the new level
+    order = book.replace(1, price=99)
+    assert book.best_bid() == 99 and order.remaining == 3
+
+    # reducing to the filled part cancels it
+    assert book.replace(1, quantity=2) is None
+    assert len(book) == 0
+
+
+def test_stop_triggers():
+    book = OrderBook('RU.SHF')
+    book.add(Order(1, 'RU.SHF', STOP_ORDER, ORDER_BUY, 1, 105))
+    book.add(Order(2, 'RU.SHF', STOP_ORDER, ORDER_SELL, 1, 95))
+    book.add(Order(3, 'RU.SHF', STOP_ORDER, ORDER_SELL, 1, 90))
+
+    assert book.match_bar(100, 104, 96) == []
+    # filled at the stop price, or at the open when gapping through
+    assert fill_list(book.match_bar(100, 106, 99)) == [(1, 1, 105)]
+    assert fill_list(book.match_bar(93, 94, 92)) == [(2, 1, 93)]
+    assert list(book.orders) == [3]
+
+    # by quote, a triggered stop rests as a market order
+    fills = book.match_quote(90, 91, bid_size=0)
+    assert fills == [] and book.best_ask() == float('-inf')
+    assert fill_list(book.match_quote(89, 90, bid_size=1)) == [(3, 1, 89)]
+
+
+def test_match_quote_size_sharing():
+    book = OrderBook('RU.SHF')
+    book.add(limit(1, ORDER_BUY, 3, 101))
+    book.add(limit(2, ORDER_BUY, 3, 102))
+    book.add(limit(3, ORDER_BUY, 3, 100))
+    book.add(limit(4, ORDER_SELL, 2, 99))
+
+    # the ask size is shared by the crossing buy orders, best price first, at the ask price
+    fills = book.match_quote(99, 101, bid_size=1, ask_size=4)
+    assert fill_list(fills) == [(2, 3, 101), (1, 1, 101), (4, 1, 99)]
+    assert book.orders[1].remaining == 2 and book.orders[4].remaining == 1
+    assert book.orders[3].status == STATUS_ACTIVE
+
+
+def test_exchange_order_symbols():
+    exchange = SimulatedExchange()
+    exchange.submit(limit(1, ORDER_BUY, 1, 100))
+    exchange.submit(limit(2, ORDER_BUY, 2, 100))
+    exchange.submit(limit(3, ORDER_BUY, 1, 100))
+
+    fills = exchange.match_bar('RU.SHF', 100, 100, 100, volume=2)
+    assert fills[0][0].status == STATUS_FILLED
+    assert exchange.order(1) is None and 1 not in exchange.order_symbols
+    assert exchange.order(2).remaining == 1
+
+    assert exchange.replace(2, quantity=1) is None
+    assert 2 not in exchange.order_symbols
+    assert exchange.cancel(3).status == STATUS_CANCELLED
+    assert exchange.order_symbols == {}
+    assert exchange.match_bar('RU.SHF', 100, 100, 100) == []
@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+
+"""
+Tests of the signal coalescer
+"""
+
+from datetime import datetime
+
+import numpy as np
+
+from gquant.engine.constant import SIGNAL_LONG, SIGNAL_SHORT, SIGNAL_EXIT
+from gquant.engine.event import SignalEvent
+from gquant.engine.portfolio import SignalCoalescer
+
+SYMBOLS = ['RU.SHF', 'RB.SHF']
+T = datetime(2017, 1, 4, 9)
+
+
+def test_netting():
+    coalescer = SignalCoalescer(SYMBOLS, lot=2)
+    coalescer.add_signal(SignalEvent('RU.SHF', T, SIGNAL_LONG, strategy_id=1))
+    coalescer.add_signal(SignalEvent('RU.SHF', T, SIGNAL_SHORT, strategy_id=2))
+    coalescer.add_signal(SignalEvent('RB.SHF', T, SIGNAL_SHORT, strategy_id=1))
+    # the latest signal of a strategy in a timestamp wins
+    coalescer.add_signal(SignalEvent('RB.SHF', T, SIGNAL_LONG, strategy_id=1))
+    assert coalescer.pending
+
+    target, allocations = coalescer.net_targets()
+    assert not coalescer.pending
+    assert target.tolist() == [0, 2]
+    assert allocations == [{1: 2, 2: -2}, {1: 2}]
+
+
+def test_commit_fractions():
+    coalescer = SignalCoalescer(SYMBOLS, lot=4)
+    coalescer.add_signal(SignalEvent('RU.SHF', T, SIGNAL_LONG, strategy_id=1))
+    coalescer.add_signal(SignalEvent('RB.SHF', T, SIGNAL_SHORT, strategy_id=1))
+    coalescer.net_targets()
+
+    # RU.SHF reduced to a half, RB.SHF rejected
+    coalescer.commit(np.array([0.5, 0.0]))
+    assert coalescer.netted_targets[1].tolist() == [2, 0]
+
+    # unchanged targets measure the change from the sent part
+    _, allocations = coalescer.net_targets()
+    assert allocations == [{1: 2}, {1: -4}]
+
+    coalescer.commit(np.ones(2))
+    coalescer.add_signal(SignalEvent('RU.SHF', T, SIGNAL_EXIT, strategy_id=1))
+    target, allocations = coalescer.net_targets()
+    assert target.tolist() == [0, -4]
+    assert allocations == [{1: -4}, {}]
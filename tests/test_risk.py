@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+
+"""
+Tests of the pre-trade checks of the basic risk manager
+"""
+
+from datetime import datetime
+
+from gquant.engine.constant import MARKET_ORDER, ORDER_BUY, ORDER_SELL
+from gquant.engine.event import OrderEvent
+from gquant.engine.risk import BasicRiskManager
+
+SYMBOLS = ['RU.SHF', 'RB.SHF']
+
+
+def risk_manager(prices=(100.0, 10.0), **limits):
+    manager = BasicRiskManager(**limits)
+    manager.initialize(SYMBOLS, 1.0e6, multipliers=[10, 10], margin_rates=[0.1, 0.1])
+    manager.update_market(datetime(2017, 1, 4, 9), list(prices), 1.0e6)
+    return manager
+
+
+def order(symbol, quantity, direction):
+    return OrderEvent(symbol, MARKET_ORDER, quantity, direction)
+
+
+def test_position_cap():
+    manager = risk_manager(max_position={'RU.SHF': 5})
+    assert manager.check_order(order('RU.SHF', 3, ORDER_BUY)).quantity == 3
+    assert manager.check_order(order('RU.SHF', 4, ORDER_BUY)).quantity == 2
+    assert manager.check_order(order('RU.SHF', 1, ORDER_BUY)) is None
+    assert manager.rejected == 1 and manager.reduced == 1
+
+    # reducing orders always pass, reversing is capped on the other side
+    assert manager.check_order(order('RU.SHF', 12, ORDER_SELL)).quantity == 10
+    assert manager.committed.tolist() == [-5, 0]
+    # symbols without a limit are not capped
+    assert manager.check_order(order('RB.SHF', 100, ORDER_BUY)).quantity == 100
+
+
+def test_exposure_rounding():
+    # gross notional of RU.SHF is 1000 per lot, 2500 leaves room for 2.5 lots
+    manager = risk_manager(max_gross_exposure=2500)
+    assert manager.check_order(order('RU.SHF', 5, ORDER_BUY)).quantity == 2
+    assert manager.gross_exposure == 2000
+
+    manager = risk_manager(max_net_exposure=2500)
+    assert manager.check_order(order('RU.SHF', 5, ORDER_SELL)).quantity == 2
+    assert manager.check_order(order('RB.SHF', 10, ORDER_SELL)).quantity == 5
+    assert manager.net_exposure == -2500
+
+    # margin is 100 per lot of RU.SHF
+    manager = risk_manager(max_margin=350)
+    assert manager.check_order(order('RU.SHF', 5, ORDER_BUY)).quantity == 3
+    assert manager.check_order(order('RU.SHF', 1, ORDER_BUY)) is None
+
+
+def test_cancel_releases_exposure():
+    manager = risk_manager(max_gross_exposure=2000)
+    assert manager.check_order(order('RU.SHF', 2, ORDER_BUY)).quantity == 2
+    assert manager.check_order(order('RU.SHF', 1, ORDER_BUY)) is None
+    manager.cancel_order('RU.SHF', 1, ORDER_BUY)
+    assert manager.check_order(order('RU.SHF', 1, ORDER_BUY)).quantity == 1
+
+
+def test_daily_loss_limit():
+    manager = risk_manager(daily_loss_limit=1000)
+    manager.update_market(datetime(2017, 1, 4, 10), [100.0, 10.0], 1.0e6 - 1500)
+    assert manager.check_order(order('RU.SHF', 1, ORDER_BUY)) is None
+    # the limit is reset on the next trading day
+    manager.update_market(datetime(2017, 1, 5, 9), [100.0, 10.0], 1.0e6 - 1500)
+    assert manager.check_order(order('RU.SHF', 1, ORDER_BUY)).quantity == 1
@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+
+"""
+Conformance tests of the vectorized engine with the event-driven Backtest
+"""
+
+import logging
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from gquant.engine.vectorized import check_conformance
+
+SYMBOLS = ['RU.SHF', 'RB.SHF', 'I.DCE']
+START_DATE = datetime(2017, 1, 4)
+END_DATE = datetime(2017, 1, 7)
+
+
+def write_bars(data_dir, symbol_list, seed=0):
+    """
+    Random walk minute bars of three trading days, one csv file per symbol
+    """
+    rng = np.random.RandomState(seed)
+    times = pd.DatetimeIndex([t for day in ('2017-01-04', '2017-01-05', '2017-01-06')
+                              for start, end in (('09:00', '11:29'), ('13:30', '14:59'))
+                              for t in pd.date_range('%s %s' % (day, start), '%s %s' % (day, end), freq='min')],
+                             name='datetime')
+    for k, s in enumerate(symbol_list):
+        close = 1000.0 * (k + 1) + rng.randn(len(times)).cumsum()
+        open_price = np.r_[close[0], close[:-1]]
+        frame = pd.DataFrame({'open': open_price,
+                              'high': np.maximum(open_price, close) + rng.uniform(0, 1, len(times)),
+                              'low': np.minimum(open_price, close) - rng.uniform(0, 1, len(times)),
+                              'close': close, 'volume': rng.randint(1, 500, len(times))}, index=times)
+        frame.to_csv(str(data_dir / ('%s.csv' % s)))
+
+
+@pytest.mark.parametrize('symbol_list', [SYMBOLS[:1], SYMBOLS], ids=['1 symbol', '3 symbols'])
+@pytest.mark.parametrize('commission_type, slippage_type', [('default', 'fixed'), ('zero', 'zero')],
+                         ids=['costs', 'no costs'])
+def test_conformance(tmp_path, symbol_list, commission_type, slippage_type):
+    logging.disable(logging.INFO)
+    try:
+        write_bars(tmp_path, symbol_list)
+        expected, equity = check_conformance(str(tmp_path), symbol_list, START_DATE, END_DATE,
+                                             commission_type=commission_type, slippage_type=slippage_type)
+    finally:
+        logging.disable(logging.NOTSET)
+    assert len(expected) == len(equity) > 0
+    assert np.allclose(expected, equity)
+    if commission_type == 'zero':
+        assert not np.allclose(equity, equity[0])  # trades happened
@@ -4,18 +4,109 @@
 判断投资品对应的金融市场，股票：上海交易所、深圳交易所
                      商品期货：上海期货交易所、大连商品交易所、郑州商品交易所
                      金融衍生品：中国金融期货交易所
+品种信息（交易所、合约乘数、最小变动价位、保证金率、手续费、交易时段）从 contracts.csv 读取一次，
+按代码前缀建立字典树，以最长前缀匹配品种
 
 @author: Jesse J. Hsu
 @version: 0.1
 """
 
+import csv
+import os
+from collections import namedtuple
+from datetime import time
+
+CONTRACT_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'contracts.csv')
+UNKNOWN_EXCHANGE = 'Unknown Exchange'
+
+SymbolRecord = namedtuple('SymbolRecord', ('product', 'exchange', 'name', 'multiplier', 'tick_size', 'margin_rate',
+                                           'commission', 'commission_rate', 'min_commission', 'sessions'))
+
+
+def _parse_sessions(text):
+    """'0900-1015|2100-0100' -> ((time(9, 0), time(10, 15)), (time(21, 0), time(1, 0)))"""
+    sessions = []
+    for session in text.split('|'):
+        start, end = session.split('-')
+        sessions.append((time(int(start[:2]), int(start[2:])), time(int(end[:2]), int(end[2:]))))
+    return tuple(sessions)
+
+
+class _TrieNode(object):
+    __slots__ = ('children', 'record')
+
+    def __init__(self):
+        self.children = {}
+        self.record = None
+
+
+class SymbolRegistry(object):
+    """
+    品种信息登记表
+    字母品种代码需要完整匹配（其后不能再跟字母），避免铁矿石 I 遮蔽 IF、豆一 A 遮蔽 AG
+    数字股票代码按最长前缀匹配，如 '132' 为SH，'13' 为SZ
+    """
+
+    def __init__(self, path=CONTRACT_FILE):
+        self.root = _TrieNode()
+        self.cache = {}
+
+        with open(path, encoding='utf-8') as f:
+            for row in csv.DictReader(f):
+                self.add(SymbolRecord(row['product'], row['exchange'], row['name'],
+                                      float(row['multiplier']), float(row['tick_size']), float(row['margin_rate']),
+                                      row['commission'], float(row['commission_rate']),
+                                      float(row['min_commission']), _parse_sessions(row['sessions'])))
+
+    def add(self, record):
+        """登记品种，覆盖同名品种"""
+        node = self.root
+        for char in record.product.upper():
+            node = node.children.setdefault(char, _TrieNode())
+        node.record = record
+        self.cache.clear()
+
+    def resolve(self, symbol):
+        """最长前缀匹配品种信息，未知品种返回 None"""
+        try:
+            return self.cache[symbol]
+        except KeyError:
+            pass
+
+        code = symbol.upper()
+        node, record = self.root, None
+        for i, char in enumerate(code):
+            node = node.children.get(char)
+            if node is None:
+                break
+            if node.record is not None and not (char.isalpha() and code[i + 1:i + 2].isalpha()):
+                record = node.record
+
+        self.cache[symbol] = record
+        return record
+
+
+_registry = None
+
+
+def get_registry():
+    """全局品种登记表，首次调用时加载"""
+    global _registry
+    if _registry is None:
+        _registry = SymbolRegistry()
+    return _registry
+
+
+def get_symbol_info(symbol):
+    """品种信息 SymbolRecord，未知品种返回 None"""
+    return get_registry().resolve(symbol)
+
 
 def get_exchange(symbol):
     """判断ID对应的证券市场
-    匹配规则
-    ['50', '51', '60', '90', '110'] 为SH
-    ['00', '13', '18', '15', '16', '18', '20', '30', '39', '115'] 为SZ
-    ['5', '6', '9'] 开头的为SH， 其余为SZ
+    匹配规则（见 contracts.csv）
+    ['50', '51', '60', '90', '110', '113', '132', '204'] 开头的为SH
+    ['00', '13', '15', '16', '18', '20', '30', '39', '115', '1318'] 开头的为SZ
 
     上期(SQ)：铜（CU）、铝（AL）、锌（ZN）、天胶（RU） 燃油（FU）、黄金（AU）、螺纹钢（RB）、线材（WR）、白银（AG）、沥青（BU）、
             燃料油（FU）、沪铅（PB）、热轧卷板（HC）
@@ -25,19 +116,17 @@ def get_exchange(symbol):
             硅锰（SM）、白糖（SR）、PTA（TA）、强麦（WH）、动力煤（ZC）
     中金(ZJ)：股指期货（IF）、国债（TF）
     """
-    # assert type(stock_code) is str, 'symbol code need str type'
-    if symbol.startswith(('50', '51', '60', '90', '110', '113', '132', '204')):
-        return 'SH.EX'
-    elif symbol.startswith(('00', '13', '18', '15', '16', '18', '20', '30', '39', '115', '1318')):
-        return 'SZ.EX'
-
-    elif symbol.startswith(('AG', 'AL', 'AU', 'BU', 'CU', 'FU', 'HC', 'PB', 'RB', 'RU', 'WR', 'ZN')):
-        return 'SQ.EX'
-    elif symbol.startswith(('A', 'B', 'BB', 'C', 'FB', 'I', 'J', 'JD', 'JM', 'L', 'M', 'P', 'PP', 'V', 'Y')):
-        return 'DS.EX'
-    elif symbol.startswith(('CF', 'FG', 'JR', 'LR', 'MA', 'OI', 'PM', 'RI', 'RM', 'SF', 'SM', 'SR', 'TA', 'WH', 'ZC')):
-        return 'ZS.EX'
-    elif symbol.startswith(('IF', 'TF')):
-        return 'ZJ.EX'
-    else:
-        return 'Unknown Exchange'
+    record = get_symbol_info(symbol)
+    return UNKNOWN_EXCHANGE if record is None else record.exchange
+
+
+def get_product(symbol):
+    """品种代码，如 'RU.SHF' -> 'RU', 'rb1801' -> 'RB'；未知品种取代码开头的字母"""
+    record = get_symbol_info(symbol)
+    if record is not None:
+        return record.product
+
+    i = 0
+    while i < len(symbol) and symbol[i].isalpha():
+        i += 1
+    return symbol[:i].upper()